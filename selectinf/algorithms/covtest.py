@@ -54,7 +54,9 @@ def covtest(X, Y, sigma=1, exact=True,
         the exponential approximation.
 
     covariance : np.array (optional)
-        If None, defaults to identity.
+        If None, defaults to identity. A `structured_covariance`
+        such as `scalar_covariance(n)` avoids forming an (n,n) matrix,
+        in which case `con.covariance` is used through its `dot` method.
 
     Returns
     -------
@@ -60,6 +60,8 @@ class forward_step(object):
 
         covariance : ndarray (optional)
             Covariance matrix of errors. Defaults to np.identity(n).
+            A `structured_covariance` such as `scalar_covariance(n, sigma**2)`
+            avoids forming (n,n) matrices.
 
         Returns
         -------
@@ -428,16 +430,16 @@ class forward_step(object):
             intervals = []
 
         if saturated:
-            for i in range(LSfunc.shape[0]):
-                if self.variables[i] in which_var:
-                    if alternative == 'onesided':
-                        _alt = {1:'greater',
-                                -1:'less'}[self.signs[i]]
-                    else:
-                        _alt = 'twosided'
-                    pivots.append((self.variables[i],
-                                   con.pivot(LSfunc[i], self.Y,
-                                             alternative=_alt)))
+            keep = [i for i in range(LSfunc.shape[0]) if self.variables[i] in which_var]
+            if alternative == 'onesided':
+                _alt = [{1:'greater',
+                         -1:'less'}[self.signs[i]] for i in keep]
+            else:
+                _alt = 'twosided'
+            if keep:
+                pvalues = con.pivot_many(LSfunc[keep], self.Y,
+                                         alternative=_alt)
+                pivots.extend([(self.variables[i], pvalue) for i, pvalue in zip(keep, pvalues)])
                   
         else:
             sigma_known = self.covariance is not None
@@ -465,8 +467,7 @@ class forward_step(object):
                                                      how_often=10,
                                                      UMPU=False,
                                                      use_random_directions=False,
-                                                     tilt=np.dot(conditional_law.covariance, 
-                                                                 eta))
+                                                     tilt=conditional_law.covariance.dot(eta))
 
                         lower_lim, upper_lim = family.equal_tailed_interval(observed_func, 1 - coverage)
 
@@ -474,8 +475,8 @@ class forward_step(object):
                         # to the natural parameter as below
                         # exercise: justify this!
 
-                        lower_lim_final = np.dot(eta, np.dot(conditional_law.covariance, eta)) * lower_lim
-                        upper_lim_final = np.dot(eta, np.dot(conditional_law.covariance, eta)) * upper_lim
+                        lower_lim_final = np.dot(eta, conditional_law.covariance.dot(eta)) * lower_lim
+                        upper_lim_final = np.dot(eta, conditional_law.covariance.dot(eta)) * upper_lim
 
                         intervals.append((self.variables[i], (lower_lim_final, upper_lim_final)))
                     else: # we do not really need to tilt just for p-values
@@ -565,7 +566,7 @@ def info_crit_stop(Y, X, sigma, cost=2,
 
     new_con = stack_con(FS.constraints(), constraints(new_linear_part,
                                                       new_offset))
-    new_con.covariance[:] = sigma**2 * np.identity(n)
+    new_con.covariance = sigma**2 * np.identity(n)
     FS._constraints = new_con
     FS.active = FS.variables[:-1]
     return FS
@@ -761,12 +762,13 @@ def mcmc_test(fs_obj, step, variable=None,
         adjusted_direction = X[:,variable]
 
     chain_test = gaussian_hit_and_run(con_test, new_Y, nstep=nstep)
-    test_stat = lambda y: -np.fabs(adjusted_direction.dot(y))
+    test_stat = lambda y: -np.fabs(y.dot(adjusted_direction))
 
     if method == 'parallel':
         rank = parallel_test(chain_test,
                              new_Y,
-                             test_stat)
+                             test_stat,
+                             vectorized=True)
     else:
         rank = serial_test(chain_test,
                            new_Y,
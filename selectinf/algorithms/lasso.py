@@ -33,6 +33,7 @@ from .debiased_lasso import (debiasing_matrix,
 from ..constraints.affine import (constraints, 
                                   selection_interval,
                                   interval_constraints,
+                                  interval_from_bounds,
                                   sample_from_constraints,
                                   gibbs_test,
                                   stack)
@@ -222,7 +223,7 @@ class lasso(object):
                                                         _full_offset,
                                                         covariance=_cov_AA)
                     else:
-                        self._constraints.covariance[:] = _cov_AA
+                        self._constraints.covariance = _cov_AA
 
                     if not self._constraints(_beta_bar):
                         warnings.warn('constraints of KKT conditions on one-step estimator ' +
@@ -285,16 +286,34 @@ class lasso(object):
         result = []
         C = self.constraints
         if C is not None:
-            _cov = C.covariance.copy()
-            C.covariance = _cov * dispersion
+
+            # the covariance and its cached factors
+            # are restored exactly after inference
+
+            _cov = C.covariance
+            _factors = [(attr, getattr(C, attr)) for attr in ['_sqrt_cov', '_sqrt_inv', '_rowspace']
+                        if hasattr(C, attr)]
+            C.scale_covariance(dispersion)
             one_step = self.onestep_estimator
+            _alt = {"onesided": 'greater',
+                    'twosided': "twosided"}[alternative]
+
+            # truncation bounds for all active variables at once
+
+            etas = np.diag(self.active_signs).astype(float)
+            all_bounds = C.bounds_many(etas, one_step)
+            if C.linear_part.shape[0] > 0:  # there were some constraints
+                pvals = C.pivot_many(etas, 
+                                     one_step, 
+                                     null_value=truth, 
+                                     alternative=_alt,
+                                     bounds=all_bounds)
+
             for i in range(one_step.shape[0]):
-                eta = np.zeros_like(one_step)
-                eta[i] = self.active_signs[i]
-                _alt = {"onesided": 'greater',
-                        'twosided': "twosided"}[alternative]
+                eta = etas[i]
+                _bounds = np.array([B[i] for B in all_bounds])
                 if C.linear_part.shape[0] > 0:  # there were some constraints
-                    _pval = C.pivot(eta, one_step, null_value=truth[i], alternative=_alt)
+                    _pval = pvals[i]
                 else:
                     obs = (eta * one_step).sum()
                     sd = np.sqrt((eta * C.covariance.dot(eta)))
@@ -305,9 +324,9 @@ class lasso(object):
                 if compute_intervals:
                     if C.linear_part.shape[0] > 0:  # there were some constraints
                         try:
-                            _interval = C.interval(eta,
-                                                   one_step,
-                                                   alpha=alpha)
+                            _interval = interval_from_bounds(*_bounds,
+                                                             alpha=alpha,
+                                                             UMAU=False)
                         except OverflowError:
                             _interval = (-np.inf, np.inf)
                         _interval = sorted([_interval[0] * self.active_signs[i],
@@ -317,7 +336,6 @@ class lasso(object):
                                      obs + ndist.ppf(1 - alpha / 2) * sd)
                 else:
                     _interval = [np.nan, np.nan]
-                _bounds = np.array(C.bounds(eta, one_step))
                 sd = _bounds[-1]
                 lower_trunc, est, upper_trunc = sorted(_bounds[:3] * self.active_signs[i])
 
@@ -331,6 +349,8 @@ class lasso(object):
                                upper_trunc,
                                sd))
             C.covariance = _cov
+            for attr, value in _factors:
+                setattr(C, attr, value)
             
         df = pd.DataFrame(index=self.active,
                           data=dict([(n, d) for n, d in zip(['variable',
@@ -1343,7 +1363,7 @@ def _data_carving_deprec(X, y,
             cov[:s, s:] = inv_info_E
             cov[s:, s:] = inv_info_E1
 
-            con.covariance[:] = cov * sigma ** 2
+            con.covariance = cov * sigma ** 2
 
             # for the conditional law
             # we will change the linear function for each coefficient
@@ -1372,7 +1392,7 @@ def _data_carving_deprec(X, y,
             cov[:s, s:] = 0
             cov[s:, s:] = np.identity(n - splitn)
 
-            con.covariance[:] = cov * sigma ** 2
+            con.covariance = cov * sigma ** 2
 
             conditional_linear = np.zeros((s, s + n - splitn))
             conditional_linear[:, :s] = np.linalg.pinv(inv_info_E1)
@@ -1661,7 +1681,7 @@ def additive_noise(X,
         cov = np.zeros((s_obs + 1, s_obs + 1))
         cov[0, 0] = scale ** 2 * sigma ** 2
         cov[1:, 1:] = Cov_E * gamma ** 2 * np.outer(L.active_signs, L.active_signs)
-        con.covariance[:] = cov
+        con.covariance = cov
         initial = np.zeros(s_obs + 1)
         initial[0] = beta_E[j]
         initial[1:] = -X_Ei.dot(y_star - y) * L.active_signs
@@ -7,6 +7,7 @@ from ...tests.flags import SET_SEED, SMALL_SAMPLES
 from ..lasso import lasso
 from ..covtest import covtest, selected_covtest
 from ...constraints.affine import gibbs_test
+from ...constraints.covariance import scalar_covariance
 from ...tests.decorators import set_sampling_params_iftrue, set_seed_iftrue
 
 @set_seed_iftrue(SET_SEED)
@@ -32,6 +33,25 @@ def test_covtest(nsim=None, ndraw=8000, burnin=2000):
 
     return pval
 
+@set_seed_iftrue(True)
+def test_covtest_structured():
+
+    n, p = 30, 50
+    X = np.random.standard_normal((n,p)) + np.random.standard_normal(n)[:,None]
+    X /= X.std(0)[None,:]
+    Y = np.random.standard_normal(n) * 1.5 
+
+    # a structured covariance is opt-in and gives the same test
+
+    for exact in [True, False]:
+        con, pval = covtest(X, Y, sigma=1.5, exact=exact)[:2]
+        assert isinstance(con.covariance, np.ndarray)
+        con_s, pval_s = covtest(X, Y, sigma=1.5, exact=exact,
+                                covariance=scalar_covariance(n))[:2]
+        np.testing.assert_allclose(pval, pval_s)
+        np.testing.assert_allclose(np.dot(con.covariance, Y), 
+                                   con_s.covariance.dot(Y))
+
 @set_seed_iftrue(SET_SEED)
 @set_sampling_params_iftrue(SMALL_SAMPLES, nsim=5, ndraw=10, burnin=20)
 def test_tilting(nsim=100, ndraw=50000, burnin=10000):
@@ -14,19 +14,29 @@ and `post selection LASSO`_.
 
 from warnings import warn
 from copy import copy
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 import numpy as np
 
 from ..distributions.pvalue import truncnorm_cdf, norm_interval
 from ..truncated.gaussian import truncated_gaussian, truncated_gaussian_old
 from ..sampling.api import (sample_truncnorm_white, 
+                            sample_truncnorm_white_many,
                             sample_truncnorm_white_sphere,
                             sample_truncnorm_white_ball)
 from ..distributions.chain import (reversible_markov_chain,
                                    parallel_test,
-                                   serial_test)
+                                   serial_test,
+                                   split_rhat)
+
+try:
+    from ..sampling.hmc import sample_truncnorm_white_hmc
+    have_hmc = True
+except ImportError:
+    have_hmc = False
 
 from .estimation import optimal_tilt
+from .covariance import structured_covariance
 
 from ..distributions.discrete_family import discrete_family
 from mpmath import mp
@@ -91,6 +101,9 @@ class constraints(object):
         covariance : np.float((p,p))
             Covariance matrix of Gaussian distribution to be 
             truncated. Defaults to `np.identity(self.dim)`.
+            May also be a `structured_covariance`, such as
+            `scalar_covariance`, in which case no `(p,p)`
+            matrices are formed.
 
         mean : np.float(p)
             Mean vector of Gaussian distribution to be 
@@ -137,6 +150,45 @@ class constraints(object):
         """
         return r"""$$Z \sim N(\mu,\Sigma) | AZ \leq b$$"""
 
+    @property
+    def covariance(self):
+        return self._covariance
+
+    @covariance.setter
+    def covariance(self, covariance):
+        """
+        Reassigning the covariance (including in place
+        updates such as `con.covariance *= sigma**2`)
+        discards the factors cached by `covariance_factors`.
+        Slice assignment such as `con.covariance[:] = cov` does not
+        reach this setter and needs `covariance_factors(force=True)`.
+        """
+        self._covariance = covariance
+        for attr in ['_sqrt_cov', '_sqrt_inv', '_rowspace']:
+            if hasattr(self, attr):
+                delattr(self, attr)
+
+    def scale_covariance(self, scale):
+        """
+        Multiply `self.covariance` by a positive scalar,
+        rescaling the cached factors instead of discarding them.
+
+        Parameters
+        ----------
+
+        scale : float
+            Multiplier of the covariance, such as a dispersion.
+
+        """
+        factors = None
+        if hasattr(self, '_sqrt_cov') and isinstance(self._sqrt_cov, np.ndarray):
+            factors = (self._sqrt_cov * np.sqrt(scale),
+                       self._sqrt_inv / np.sqrt(scale),
+                       self._rowspace)
+        self.covariance = self.covariance * scale
+        if factors is not None:
+            self._sqrt_cov, self._sqrt_inv, self._rowspace = factors
+
     def __copy__(self):
         r"""
         A copy of the constraints.
@@ -149,9 +201,9 @@ class constraints(object):
                           covariance=copy(self.covariance),
                           rank=self.rank)
         if hasattr(self, "_sqrt_cov"):
-            con._sqrt_cov = self._sqrt_cov.copy()
-            con._sqrt_inv = self._sqrt_inv.copy()
-            con._rowspace = self._rowspace.copy()
+            con._sqrt_cov = copy(self._sqrt_cov)
+            con._sqrt_inv = copy(self._sqrt_inv)
+            con._rowspace = copy(self._rowspace)
         return con
 
     def __call__(self, Y, tol=1.e-3):
@@ -219,11 +271,18 @@ class constraints(object):
 
         if M2.shape:
             M2i = np.linalg.pinv(M2)
-            delta_cov = M1.dot(M2i.dot(M1.T))
             delta_mean = M1.dot(M2i.dot(C.dot(self.mean) - d))
+            if not isinstance(S, structured_covariance):
+                delta_cov = M1.dot(M2i.dot(M1.T))
         else:
-            delta_cov = np.multiply.outer(M1, M1) / M2
             delta_mean = M1 * (C.dot(self.mean) - d) / M2
+            if not isinstance(S, structured_covariance):
+                delta_cov = np.multiply.outer(M1, M1) / M2
+
+        if isinstance(S, structured_covariance):
+            conditional_cov = S.conditional(C)
+        else:
+            conditional_cov = S - delta_cov
 
         if rank is None:
             if len(linear_part.shape) == 2:
@@ -233,7 +292,7 @@ class constraints(object):
 
         return constraints(self.linear_part,
                            self.offset,
-                           covariance=self.covariance - delta_cov,
+                           covariance=conditional_cov,
                            mean=self.mean - delta_mean,
                            rank=self.rank - rank)
 
@@ -387,31 +446,186 @@ class constraints(object):
             alpha=alpha,
             UMAU=UMAU)
 
-    def covariance_factors(self, force=True):
+    def bounds_many(self, directions, Y):
+        r"""
+        Compute `self.bounds` for each row of `directions`
+        with one matrix-matrix product with the constraints.
+
+        Parameters
+        ----------
+
+        directions: np.float((k,p))
+            Directions $\eta_i$ as rows.
+
+        Y : np.float
+            A realization of $N(\mu,\Sigma)$ where 
+            $\Sigma$ is `self.covariance`.
+
+        Returns
+        -------
+
+        L : np.float(k)
+            Lower truncation bounds.
+
+        Z : np.float(k)
+            The observed $\eta_i^TY$
+
+        U : np.float(k)
+            Upper truncation bounds.
+
+        S : np.float(k)
+            Standard deviations of $\eta_i^TY$.
+
+        """
+        return interval_constraints_many(self.linear_part,
+                                         self.offset,
+                                         self.covariance,
+                                         Y,
+                                         directions)
+
+    def pivot_many(self,
+                   directions,
+                   Y,
+                   null_value=None,
+                   alternative='greater',
+                   bounds=None):
+        r"""
+        Compute `self.pivot` for each row of `directions`.
+
+        Parameters
+        ----------
+
+        directions: np.float((k,p))
+            Directions $\eta_i$ as rows.
+
+        Y : np.float
+            A realization of $N(0,\Sigma)$ where 
+            $\Sigma$ is `self.covariance`.
+
+        null_value : np.float(k) (optional)
+            Null values of $\eta_i^T\mu$, defaults to
+            `directions.dot(self.mean)`.
+
+        alternative : str or sequence of str
+            One of ['greater', 'less', 'twosided'], possibly
+            one for each direction.
+
+        bounds : tuple (optional)
+            Output of `self.bounds_many(directions, Y)`, if
+            already computed.
+
+        Returns
+        -------
+
+        P : np.float(k)
+            $p$-values of corresponding tests.
+
+        """
+
+        k = directions.shape[0]
+        if isinstance(alternative, str):
+            alternative = [alternative] * k
+        for alt in alternative:
+            if alt not in ['greater', 'less', 'twosided']:
+                raise ValueError("alternative should be one of ['greater', 'less', 'twosided']")
+
+        if bounds is None:
+            bounds = self.bounds_many(directions, Y)
+        L, Z, U, S = bounds
+
+        if null_value is None:
+            meanZ = directions.dot(self.mean)
+        else:
+            meanZ = np.asarray(null_value) * np.ones(k)
+
+        P = np.array([truncnorm_cdf((z - m) / s, (l - m) / s, (u - m) / s)
+                      for l, z, u, s, m in zip(L, Z, U, S, meanZ)])
+
+        pvalues = np.zeros(k)
+        for i, alt in enumerate(alternative):
+            if alt == 'greater':
+                pvalues[i] = 1 - P[i]
+            elif alt == 'less':
+                pvalues[i] = P[i]
+            else:
+                pvalues[i] = max(2 * min(P[i], 1 - P[i]), 0)
+        return pvalues
+
+    def interval_many(self, 
+                      directions,
+                      Y,
+                      alpha=0.05,
+                      UMAU=False,
+                      bounds=None):
+        r"""
+        Compute `self.interval` for each row of `directions`.
+
+        Parameters
+        ----------
+
+        directions: np.float((k,p))
+            Directions $\eta_i$ as rows.
+
+        Y : np.float
+            A realization of $N(0,\Sigma)$ where 
+            $\Sigma$ is `self.covariance`.
+
+        alpha : float
+            What level of confidence?
+
+        UMAU : bool
+            Use the UMAU intervals?
+
+        bounds : tuple (optional)
+            Output of `self.bounds_many(directions, Y)`, if
+            already computed.
+
+        Returns
+        -------
+
+        intervals : np.float((k,2))
+            Selection intervals.
+
+        """
+        if bounds is None:
+            bounds = self.bounds_many(directions, Y)
+        return np.array([interval_from_bounds(l, v, u, s, alpha=alpha, UMAU=UMAU)
+                         for l, v, u, s in zip(*bounds)])
+
+    def covariance_factors(self, force=False):
         """
         Factor `self.covariance`,
         finding a possibly non-square square-root.
 
+        The factors are cached until `self.covariance`
+        is reassigned.
+
         Parameters
         ----------
 
         force : bool
             If True, force a recomputation of
-            the covariance. If not, assumes that
-            covariance has not changed.
+            the factors, e.g. after modifying
+            entries of `self.covariance` in place.
 
         """
         if not hasattr(self, "_sqrt_cov") or force:
 
-            # original matrix is np.dot(U, (D**2 * U).T)
+            if isinstance(self.covariance, structured_covariance):
+                (self._sqrt_cov,
+                 self._sqrt_inv,
+                 self._rowspace) = self.covariance.factors()
+            else:
 
-            U, D = np.linalg.svd(self.covariance)[:2]
-            D = np.sqrt(D[:self.rank])
-            U = U[:,:self.rank]
-        
-            self._sqrt_cov = U * D[None,:]
-            self._sqrt_inv = (U / D[None,:]).T
-            self._rowspace = U
+                # original matrix is np.dot(U, (D**2 * U).T)
+
+                U, D = np.linalg.svd(self.covariance)[:2]
+                D = np.sqrt(D[:self.rank])
+                U = U[:,:self.rank]
+
+                self._sqrt_cov = U * D[None,:]
+                self._sqrt_inv = (U / D[None,:]).T
+                self._rowspace = U
 
         return self._sqrt_cov, self._sqrt_inv, self._rowspace
 
@@ -456,7 +670,10 @@ class constraints(object):
         """
         sqrt_cov, sqrt_inv = self.covariance_factors()[:2]
 
-        new_A = self.linear_part.dot(sqrt_cov)
+        if isinstance(sqrt_cov, np.ndarray):
+            new_A = self.linear_part.dot(sqrt_cov)
+        else:
+            new_A = sqrt_cov.T.dot(self.linear_part.T).T
         den = np.sqrt((new_A**2).sum(1))
         new_b = self.offset - self.linear_part.dot(self.mean)
         new_con = constraints(new_A / den[:,None], new_b / den)
@@ -613,6 +830,83 @@ def interval_constraints(support_directions,
 
     return lower_bound, V, upper_bound, sigma
 
+def interval_constraints_many(support_directions, 
+                              support_offsets,
+                              covariance,
+                              observed_data, 
+                              directions,
+                              tol = 1.e-4):
+    r"""
+    Compute `interval_constraints` for each row of `directions`.
+
+    The products $A\Sigma\eta_i$ for all directions
+    are formed with one matrix-matrix product.
+
+    Parameters
+    ----------
+
+    support_directions : np.float
+         Matrix specifying constraint, $A$.
+
+    support_offsets : np.float
+         Offset in constraint, $b$.
+
+    covariance : np.float
+         Covariance matrix of `observed_data`.
+
+    observed_data : np.float
+         Observations.
+
+    directions : np.float((k,p))
+         Directions of interest $\eta_i$ as rows.
+
+    tol : float
+         Relative tolerance parameter for deciding 
+         sign of $Az-b$.
+
+    Returns
+    -------
+
+    lower_bound : np.float(k)
+
+    V : np.float(k)
+         The observed $\eta_i^TZ$.
+
+    upper_bound : np.float(k)
+
+    sigma : np.float(k)
+         Standard deviations of $\eta_i^TZ$.
+
+    """
+
+    # shorthand
+    A, b, S, X, H = (support_directions,
+                     support_offsets,
+                     covariance,
+                     observed_data,
+                     np.atleast_2d(directions))
+
+    U = A.dot(X) - b
+    if not np.all(U  < tol * np.fabs(U).max(initial=0)) and WARNINGS:
+        warn('constraints not satisfied: %s' % repr(U))
+
+    SH = S.dot(H.T)
+    sigma = np.sqrt((H.T * SH).sum(0))
+    alpha = A.dot(SH) / sigma[None,:]**2
+    V = H.dot(X)
+
+    # as in `interval_constraints`, coordinates with alpha == 0
+    # are never used in upper_bound or lower_bound
+
+    zero_coords = alpha == 0
+    RHS = (-U[:,None] + V[None,:] * alpha) / (alpha + zero_coords)
+
+    scale = tol * np.fabs(alpha).max(0, initial=0)
+    upper_bound = np.where(alpha > scale[None,:], RHS, np.inf).min(0, initial=np.inf)
+    lower_bound = np.where(alpha < -scale[None,:], RHS, -np.inf).max(0, initial=-np.inf)
+
+    return lower_bound, V, upper_bound, sigma
+
 def selection_interval(support_directions, 
                        support_offsets,
                        covariance,
@@ -671,6 +965,48 @@ def selection_interval(support_directions,
         direction_of_interest,
         tol=tol)
 
+    return interval_from_bounds(lower_bound,
+                                V,
+                                upper_bound,
+                                sigma,
+                                alpha=alpha,
+                                UMAU=UMAU)
+
+def interval_from_bounds(lower_bound,
+                         V,
+                         upper_bound,
+                         sigma,
+                         alpha=0.05,
+                         UMAU=True):
+    """
+    Confidence interval for $\eta^T\mu$ from the
+    output of `interval_constraints`.
+
+    Parameters
+    ----------
+
+    lower_bound : float
+
+    V : float
+         The observed $\eta^TZ$.
+
+    upper_bound : float
+
+    sigma : float
+         Standard deviation of $\eta^TZ$.
+
+    alpha : float
+         What level of confidence?
+
+    UMAU : bool
+         Use the UMAU interval, or twosided pivot.
+
+    Returns
+    -------
+
+    selection_interval : (float, float)
+
+    """
     truncated = truncated_gaussian_old([(lower_bound, upper_bound)], scale=sigma)
     if UMAU:
         _selection_interval = truncated.UMAU_interval(V, alpha)
@@ -688,9 +1024,14 @@ def sample_from_constraints(con,
                             white=False,
                             use_constraint_directions=True,
                             use_random_directions=True,
-                            accept_reject_params=()):
+                            accept_reject_params=(),
+                            nchains=1,
+                            n_jobs=1,
+                            executor='thread',
+                            return_stats=False,
+                            method='hit_and_run'):
     r"""
-    Use Gibbs sampler to simulate from `con`.
+    Use Gibbs sampler (or exact HMC) to simulate from `con`.
 
     Parameters
     ----------
@@ -698,7 +1039,8 @@ def sample_from_constraints(con,
     con : `selection.affine.constraints`_
 
     Y : np.float
-        Point satisfying the constraint.
+        Point satisfying the constraint, or one such
+        point per chain as an array of shape `(nchains, n)`.
 
     direction_of_interest : np.float (optional)
         Which projection is of most interest?
@@ -728,80 +1070,260 @@ def sample_from_constraints(con,
         If not () should be a tuple (num_trial, min_accept, num_draw).
         In this case, we first try num_trial accept-reject samples,
         if at least min_accept of them succeed, we just draw num_draw
-        accept_reject samples.
+        accept_reject samples, sizing later batches from the observed
+        acceptance rate. If that rate falls below min_accept / num_trial
+        we fall back to MCMC.
+
+    nchains : int (optional)
+        Number of independent chains, each started
+        at `Y` (or its row of `Y`) and run for `burnin` steps 
+        before contributing its share of the `ndraw` draws,
+        see `chain_sizes`. Each chain has its own
+        seed, drawn from `np.random`.
+
+    n_jobs : int (optional)
+        Number of workers running the chains.
+
+    executor : str (optional)
+        One of ['thread', 'process']. The hit-and-run
+        kernel releases the GIL, so threads avoid
+        copying the constraints to worker processes.
+
+    return_stats : bool (optional)
+        If True, also return a dict with the fraction of steps
+        in which each chain moved ('move_rate') and the split
+        R-hat of each coordinate across chains ('rhat').
+
+    method : str (optional)
+        One of ['hit_and_run', 'hmc']. If 'hmc', draws are made
+        by exact Hamiltonian Monte Carlo (Pakman and Paninski, 2014),
+        which mixes much better when the whitened constraints
+        are highly correlated. Requires the `selectinf.sampling.hmc`
+        extension; `direction_of_interest`, `how_often` and the
+        choice of directions are then ignored.
 
     Returns
     -------
 
     Z : np.float((ndraw, n))
-        Sample from the Gaussian distribution conditioned on the constraints.
+        Sample from the Gaussian distribution conditioned on the constraints,
+        the draws of each chain in turn.
         
     """
 
+    if method not in ['hit_and_run', 'hmc']:
+        raise ValueError("method should be one of ['hit_and_run', 'hmc']")
+    if method == 'hmc' and not have_hmc:
+        raise ValueError("method='hmc' requires the compiled extension `selectinf.sampling.hmc`")
+
+    Y = np.asarray(Y)
+    if Y.ndim == 2 and Y.shape[0] != nchains:
+        raise ValueError('Y should have one row per chain')
+
     if direction_of_interest is None:
-        direction_of_interest = np.random.standard_normal(Y.shape)
+        direction_of_interest = np.random.standard_normal(Y.shape[-1])
     if how_often < 0:
         how_often = ndraw + burnin
 
     DEBUG = False
     if not white:
         inverse_map, forward_map, white_con = con.whiten()
-        white_Y = forward_map(Y)
+        if Y.ndim == 2:
+            white_Y = np.array([forward_map(y) for y in Y])
+        else:
+            white_Y = forward_map(Y)
         white_direction_of_interest = forward_map(con.covariance.dot(direction_of_interest))
         if DEBUG:
             print (white_direction_of_interest * white_Y).sum(), (Y * direction_of_interest).sum(), 'white'
     else:
         white_con = con
         inverse_map = lambda V: V
+        white_Y = Y
+        white_direction_of_interest = direction_of_interest
 
-    # try 100 draws of accept reject
-    # if we get more than 50 good draws, then just return a smaller sample
-    # of size (burnin+ndraw)/5
+    # starting point of each chain
+
+    if white_Y.ndim == 2:
+        white_starts = list(white_Y)
+    else:
+        white_starts = [white_Y] * nchains
 
+    # try num_trial draws of accept reject
+    # if at least min_accept are good, draw num_draw by accept reject,
+    # otherwise fall back to MCMC
+
+    white_samples = None
     if accept_reject_params: 
-        use_hit_and_run = False
         num_trial, min_accept, num_draw = accept_reject_params
-
-        def _accept_reject(sample_size, linear_part, offset):
-            Z_sample = np.random.standard_normal((100, linear_part.shape[1]))
-            constraint_satisfied = (Z_sample.dot(linear_part.T) - 
-                                    offset[None,:]).max(1) < 0
-            return Z_sample[constraint_satisfied]
-
-        Z_sample = _accept_reject(100, 
-                                  white_con.linear_part,
-                                  white_con.offset)
-
-        if Z_sample.shape[0] >= min_accept:
-            while True:
-                Z_sample = np.vstack([Z_sample,
-                                      _accept_reject(num_draw / 5,
-                                                     white_con.linear_part,
-                                                     white_con.offset)])
-                if Z_sample.shape[0] > num_draw:
-                    break
-            white_samples = Z_sample
+        white_samples = _accept_reject_white(white_con.linear_part,
+                                             white_con.offset,
+                                             num_trial,
+                                             min_accept,
+                                             num_draw)
+    use_mcmc = white_samples is None
+
+    chains = None
+    if use_mcmc:
+        if nchains == 1 and method == 'hmc':
+            white_samples = sample_truncnorm_white_hmc(
+                white_con.linear_part,
+                white_con.offset,
+                white_starts[0],
+                ndraw=ndraw,
+                burnin=burnin,
+                sigma=1.)
+            chains = [white_samples]
+        elif nchains == 1:
+            white_samples = sample_truncnorm_white(  
+                white_con.linear_part,
+                white_con.offset,
+                white_starts[0], 
+                white_direction_of_interest,
+                how_often=how_often,
+                ndraw=ndraw, 
+                burnin=burnin,
+                sigma=1.,
+                use_constraint_directions=use_constraint_directions,
+                use_random_directions=use_random_directions)
+            chains = [white_samples]
         else:
-            use_hit_and_run = True
-    else:
-        use_hit_and_run = True
-
-    if use_hit_and_run:
-        white_samples = sample_truncnorm_white(  
-            white_con.linear_part,
-            white_con.offset,
-            white_Y, 
-            white_direction_of_interest,
-            how_often=how_often,
-            ndraw=ndraw, 
-            burnin=burnin,
-            sigma=1.,
-            use_constraint_directions=use_constraint_directions,
-            use_random_directions=use_random_directions)
+            # split ndraw among chains, whitening was done once above
+
+            seeds = np.random.randint(0, 2**31 - 1, size=nchains)
+            chain_args = [(white_con.linear_part,
+                           white_con.offset,
+                           start,
+                           white_direction_of_interest,
+                           min(how_often, n + burnin),
+                           n,
+                           burnin,
+                           use_constraint_directions,
+                           use_random_directions,
+                           method,
+                           seed) for n, start, seed in zip(chain_sizes(ndraw, nchains),
+                                                           white_starts,
+                                                           seeds)]
+
+            if n_jobs == 1:
+                chains = [_sample_chain(args) for args in chain_args]
+            else:
+                if executor not in ['process', 'thread']:
+                    raise ValueError("executor should be one of ['process', 'thread']")
+                pool = {'process':ProcessPoolExecutor,
+                        'thread':ThreadPoolExecutor}[executor]
+                with pool(max_workers=n_jobs) as _executor:
+                    chains = list(_executor.map(_sample_chain, chain_args))
+            white_samples = np.vstack(chains)
 
     Z = inverse_map(white_samples.T).T
+    if return_stats:
+        stats = {}
+        if chains is not None:
+            stats['move_rate'] = np.array([np.mean(np.any(np.diff(chain, axis=0) != 0, 1))
+                                           for chain in chains])
+            length = min([chain.shape[0] for chain in chains])
+            stats['rhat'] = split_rhat(np.array([inverse_map(chain[:length].T).T
+                                                 for chain in chains]))
+        return Z, stats
     return Z
 
+def chain_sizes(ndraw, nchains):
+    """
+    Number of the `ndraw` draws made by each of
+    the `nchains` chains of `sample_from_constraints`.
+    """
+    return [ndraw // nchains + (i < ndraw % nchains) for i in range(nchains)]
+
+def _accept_reject_white(linear_part,
+                         offset,
+                         num_trial,
+                         min_accept,
+                         num_draw,
+                         max_batch=2**22):
+    """
+    Draw `num_draw` samples from $N(0,I)$ restricted
+    to `linear_part.dot(Z) < offset` by accept reject.
+
+    The acceptance rate is estimated from `num_trial` trial
+    draws and each batch is sized from the current estimate
+    so that `num_draw` is usually reached in one batch.
+    Returns None if the estimated acceptance rate is
+    below `min_accept / num_trial`. Batches are capped
+    at `max_batch` entries.
+    """
+
+    nvar = linear_part.shape[1]
+    min_rate = min_accept / float(num_trial)
+    samples = np.empty((num_draw, nvar))
+
+    def _accept_reject(sample_size):
+        Z_sample = np.random.standard_normal((sample_size, nvar))
+        constraint_satisfied = (Z_sample.dot(linear_part.T) - 
+                                offset[None,:]).max(1) < 0
+        return Z_sample[constraint_satisfied]
+
+    count, num_proposed = 0, 0
+    sample_size = num_trial
+    while True:
+        Z_sample = _accept_reject(sample_size)
+        num_proposed += sample_size
+
+        keep = min(Z_sample.shape[0], num_draw - count)
+        samples[count:count+keep] = Z_sample[:keep]
+        count += keep
+        if count == num_draw:
+            return samples
+
+        # all accepted draws so far have been kept
+
+        accept_rate = count / float(num_proposed)
+        if accept_rate < min_rate or accept_rate == 0:
+            return None
+
+        # aim 10% above the expected number of proposals needed
+
+        sample_size = int(1.1 * (num_draw - count) / accept_rate) + 1
+        sample_size = max(min(sample_size, max_batch // max(nvar, 1)), 1)
+
+def _sample_chain(args):
+    """
+    Run one chain of `sample_truncnorm_white` (or
+    `sample_truncnorm_white_hmc`) with its own seed.
+    Both samplers release the GIL, so chains in a thread pool
+    run concurrently.
+    """
+    (linear_part,
+     offset,
+     initial,
+     direction,
+     how_often,
+     ndraw,
+     burnin,
+     use_constraint_directions,
+     use_random_directions,
+     method,
+     seed) = args
+
+    if method == 'hmc':
+        return sample_truncnorm_white_hmc(linear_part,
+                                          offset,
+                                          initial,
+                                          ndraw=ndraw,
+                                          burnin=burnin,
+                                          sigma=1.,
+                                          random_state=np.random.RandomState(seed))
+    return sample_truncnorm_white(linear_part,
+                                  offset,
+                                  initial,
+                                  direction,
+                                  how_often=how_often,
+                                  ndraw=ndraw,
+                                  burnin=burnin,
+                                  sigma=1.,
+                                  use_constraint_directions=use_constraint_directions,
+                                  use_random_directions=use_random_directions,
+                                  random_state=np.random.RandomState(seed))
+
 def sample_from_sphere(con, 
                        Y,
                        direction_of_interest=None,
@@ -857,12 +1379,23 @@ def sample_from_sphere(con,
         how_often = ndraw + burnin
 
     if not white:
+
+        # a conditioned `structured_covariance` is whitened into a
+        # larger space than its rank, random directions would
+        # change the Mahalanobis radius of the sample
+
+        if (isinstance(con.covariance, structured_covariance) and
+            con.covariance.rank < con.dim and use_random_directions):
+            raise ValueError('random directions are not supported for a rank deficient ' + 
+                             '`structured_covariance`, set use_random_directions=False')
         inverse_map, forward_map, white = con.whiten()
         white_Y = forward_map(Y)
         white_direction_of_interest = forward_map(direction_of_interest)
     else:
         white = con
         inverse_map = lambda V: V
+        white_Y = Y
+        white_direction_of_interest = direction_of_interest
 
     white_samples, weights = sample_truncnorm_white_sphere(white.linear_part,
                                                            white.offset,
@@ -1084,6 +1617,184 @@ def gibbs_test(affine_con, Y, direction_of_interest,
 # make sure nose does not try to test this function
 gibbs_test.__test__ = False
 
+def gibbs_test_many(affine_con, Y, directions,
+                    how_often=-1,
+                    ndraw=5000,
+                    burnin=2000,
+                    alternative='twosided',
+                    UMPU=False,
+                    sigma_known=False,
+                    alpha=0.05,
+                    use_constraint_directions=False,
+                    use_random_directions=True,
+                    accept_reject_params=(100, 15, 2000),
+                    chunk_size=None):
+    """
+    A Monte Carlo significance test for each of several
+    linear functions of `con.mean`, all computed from 
+    one chain sampling `affine_con`.
+
+    The constraints are whitened once and the chain is run
+    in chunks continuing from the last draw of the previous 
+    chunk. Chunks cycle through `directions` as the direction 
+    used every `how_often` steps. Only the projections 
+    of the draws onto `directions` are kept.
+
+    Parameters
+    ----------
+
+    affine_con : `selection.affine.constraints`_
+
+    Y : np.float
+        Point satisfying the constraint.
+
+    directions: np.float((k,n))
+        Linear functions of `con.mean` of interest as rows.
+
+    how_often : int (optional)
+        How often should the sampler make a move along the
+        direction of the current chunk?
+        If negative, defaults to ndraw+burnin (so it will never be used).
+
+    ndraw : int (optional)
+        Defaults to 5000.
+
+    burnin : int (optional)
+        Defaults to 2000.
+
+    alternative : str or sequence of str
+        One of ['greater', 'less', 'twosided'], possibly
+        one for each direction.
+
+    UMPU : bool
+        Perform the UMPU test?
+
+    sigma_known : bool
+        Is $\sigma$ assumed known?
+
+    alpha : 
+        Level for UMPU test.
+
+    use_constraint_directions : bool (optional)
+        Use the directions formed by the constraints as in
+        the Gibbs scheme?
+
+    use_random_directions : bool (optional)
+        Use additional random directions in
+        the Gibbs scheme?
+
+    accept_reject_params : tuple
+        If not () should be a tuple (num_trial, min_accept, num_draw),
+        see `gibbs_test`. Only used if `sigma_known`; accepted
+        draws count towards `ndraw`.
+
+    chunk_size : int (optional)
+        Number of draws per chunk, defaults to
+        spreading `ndraw` evenly over `directions`.
+
+    Returns
+    -------
+
+    pvalues : np.float(k)
+        P-values (using importance weights), or decisions 
+        of the UMPU tests.
+
+    suff_statistics : np.float((ndraw, k))
+        Projections of the sample onto `directions`.
+
+    weights : np.float(ndraw)
+        Importance weights for the sample.
+
+    """
+
+    H = np.atleast_2d(directions)
+    k = H.shape[0]
+    if isinstance(alternative, str):
+        alternative = [alternative] * k
+    for alt in alternative:
+        if alt not in ['greater', 'less', 'twosided']:
+            raise ValueError("expecting alternative to be in ['greater', 'less', 'twosided']")
+
+    if chunk_size is None:
+        chunk_size = int(np.ceil(ndraw / k))
+
+    if (not sigma_known and
+        isinstance(affine_con.covariance, structured_covariance) and
+        affine_con.covariance.rank < affine_con.dim and use_random_directions):
+        raise ValueError('random directions are not supported for a rank deficient ' + 
+                         '`structured_covariance`, set use_random_directions=False')
+
+    # whiten once, then $\eta^TZ = (L^T\eta)^Tz + \eta^T\mu$
+    # for white draws $z$ with $L$ the square root of the covariance
+
+    _, forward_map, white_con = affine_con.whiten()
+    sqrt_cov = affine_con.covariance_factors()[0]
+    white_H = sqrt_cov.T.dot(H.T)
+    offset_H = H.dot(affine_con.mean)
+
+    state = forward_map(Y)
+    statistics, weights = [], []
+    remaining, count = ndraw, 0
+    while remaining > 0:
+        bias_direction = white_H[:, count % k]
+        nchunk = min(chunk_size, remaining)
+        if how_often < 0:
+            chunk_how_often = nchunk + burnin
+        else:
+            chunk_how_often = how_often
+        if not sigma_known:
+            Z, W = sample_from_sphere(white_con,
+                                      state,
+                                      bias_direction,
+                                      how_often=chunk_how_often,
+                                      ndraw=nchunk,
+                                      burnin=burnin,
+                                      use_constraint_directions=use_constraint_directions,
+                                      use_random_directions=use_random_directions,
+                                      white=True)
+        else:
+            Z = sample_from_constraints(white_con,
+                                        state,
+                                        bias_direction,
+                                        how_often=chunk_how_often,
+                                        ndraw=nchunk,
+                                        burnin=burnin,
+                                        white=True,
+                                        use_constraint_directions=\
+                                            use_constraint_directions,
+                                        use_random_directions=\
+                                            use_random_directions,
+                                        accept_reject_params=accept_reject_params)[:remaining]
+            W = np.ones(Z.shape[0])
+        statistics.append(Z.dot(white_H) + offset_H[None,:])
+        weights.append(W)
+        state = Z[-1]
+        remaining -= Z.shape[0]
+        burnin = 0
+        count += 1
+
+    suff_statistics = np.vstack(statistics)
+    W = np.hstack(weights)
+    observed = H.dot(Y)
+
+    pvalues = []
+    for j in range(k):
+        T, obs = suff_statistics[:,j], observed[j]
+        if alternative[j] == 'greater':
+            pvalue = (W*(T >= obs)).sum() / W.sum()
+        elif alternative[j] == 'less':
+            pvalue = (W*(T <= obs)).sum() / W.sum()
+        elif not UMPU:
+            pvalue = (W*(T <= obs)).sum() / W.sum()
+            pvalue = max(2 * min(pvalue, 1 - pvalue), 0)
+        else:
+            pvalue = discrete_family(T, W).two_sided_test(0, obs, alpha=alpha)
+        pvalues.append(pvalue)
+
+    return np.array(pvalues), suff_statistics, W
+
+gibbs_test_many.__test__ = False
+
 class gaussian_hit_and_run(reversible_markov_chain):
 
     def __init__(self, constraints, state, nstep=1):
@@ -1103,28 +1814,57 @@ class gaussian_hit_and_run(reversible_markov_chain):
 
         self.nstep = nstep
 
-        # unused in code but needs to be specified
-        # for `sample_truncnorm_white`
-
-        self._bias_direction = np.ones_like(self._white_state)
-
     def step(self):
 
-        white_con = self._white_con
+        # the same random-scan kernel as `forward_steps`
+        # so that backward and forward steps of
+        # the parallel test share one reversible kernel
 
-        white_samples = sample_truncnorm_white(  
+        white_con = self._white_con
+        white_samples = sample_truncnorm_white_many(
             white_con.linear_part,
             white_con.offset,
-            self._white_state, 
-            self._bias_direction,
-            how_often=-1,
-            ndraw=self.nstep, 
-            burnin=0,
+            self._white_state,
+            nsample=1,
+            nstep=self.nstep,
             sigma=1.,
-            use_constraint_directions=True,
-            use_random_directions=False)
+            use_constraint_directions=True)
 
-        self._white_state = white_samples[-1]
+        self._white_state = white_samples[0]
 
         self._state = self._inverse_map(self._white_state)
         return self._state
+
+    def set_state(self, state):
+        self._state = state
+        self._white_state = self._forward_map(state)
+
+    state = property(reversible_markov_chain.get_state, set_state)
+
+    def forward_steps(self, nsample):
+        """
+        Take `nsample` independent steps from the current
+        state, advancing all copies at once.
+
+        Parameters
+        ----------
+
+        nsample : int
+            How many forward steps to take?
+
+        Returns
+        -------
+
+        states : np.float((nsample, n))
+
+        """
+        white_con = self._white_con
+        white_samples = sample_truncnorm_white_many(
+            white_con.linear_part,
+            white_con.offset,
+            self._white_state,
+            nsample=nsample,
+            nstep=self.nstep,
+            sigma=1.,
+            use_constraint_directions=True)
+        return self._inverse_map(white_samples.T).T
@@ -1 +1,4 @@
 from .affine import constraints as affine_constraints
+from .covariance import (scalar_covariance,
+                         diagonal_covariance,
+                         lowrank_covariance)
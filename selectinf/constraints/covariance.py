@@ -0,0 +1,250 @@
+r"""
+Structured covariance matrices for affine constraints.
+
+A covariance $\Sigma$ of an $n$-dimensional Gaussian is stored
+implicitly as
+
+.. math::
+
+     \Sigma = L P L^T, \qquad L = \text{diag}(a) + GH^T, \qquad P = I - QQ^T
+
+with $G, H$ of shape `(n,k)` and $Q$ of shape `(n,j)` having orthonormal
+columns. This covers $\sigma^2 I$, diagonal and low-rank plus diagonal
+covariances, as well as their conditional covariances given
+linear equalities, for which $Q$ grows by one column per equality.
+
+Products with $\Sigma$, whitening and conditioning cost
+$O(n(k+j)^2)$ instead of the $O(n^3)$ of forming and
+factoring $\Sigma$. The methods used by `constraints`
+mirror those of `np.ndarray`.
+"""
+
+import numpy as np
+
+class structured_covariance(object):
+
+    r"""
+    The covariance $LPL^T$ described above.
+    """
+
+    def __init__(self, diag_sqrt, left=None, right=None, nullspace=None):
+        """
+        Parameters
+        ----------
+
+        diag_sqrt : np.float(n)
+            Positive diagonal $a$ of $L$.
+
+        left : np.float((n,k)) (optional)
+            Low-rank factor $G$ of $L$.
+
+        right : np.float((n,k)) (optional)
+            Low-rank factor $H$ of $L$.
+
+        nullspace : np.float((n,j)) (optional)
+            Orthonormal $Q$ spanning the directions
+            in the white space removed by conditioning.
+
+        """
+        self.diag_sqrt = np.asarray(diag_sqrt, float)
+        n = self.diag_sqrt.shape[0]
+        if left is None:
+            left = right = np.zeros((n, 0))
+        if nullspace is None:
+            nullspace = np.zeros((n, 0))
+        self.left, self.right, self.nullspace = left, right, nullspace
+        self.shape = (n, n)
+
+        # Woodbury core for solving with $L$
+
+        self._core = np.linalg.inv(np.identity(self.left.shape[1]) +
+                                   self.right.T.dot(self.left / self.diag_sqrt[:,None]))
+
+    @property
+    def T(self):
+        return self
+
+    @property
+    def rank(self):
+        return self.shape[0] - self.nullspace.shape[1]
+
+    def dot(self, arg):
+        arg = np.asarray(arg)
+        return self._L(self._project(self._LT(arg)))
+
+    def __mul__(self, scale):
+        return structured_covariance(self.diag_sqrt * np.sqrt(scale),
+                                     self.left * np.sqrt(scale),
+                                     self.right,
+                                     self.nullspace)
+
+    __rmul__ = __mul__
+
+    def conditional(self, linear_part):
+        r"""
+        Covariance conditional on the value
+        of `linear_part.dot(Z)`, i.e.
+
+        .. math::
+
+             \Sigma - \Sigma C^T(C\Sigma C^T)^{\dagger}C\Sigma
+
+        Parameters
+        ----------
+
+        linear_part : np.float((k,n))
+            Linear part of equality constraint, $C$ above.
+
+        Returns
+        -------
+
+        conditional_cov : `structured_covariance`
+
+        """
+        C = np.atleast_2d(linear_part)
+        B = self._project(self._LT(C.T))
+        U, D = np.linalg.svd(B, full_matrices=False)[:2]
+        keep = D > max(B.shape) * np.finfo(float).eps * np.max(D, initial=0)
+        return structured_covariance(self.diag_sqrt,
+                                     self.left,
+                                     self.right,
+                                     np.hstack([self.nullspace, U[:,keep]]))
+
+    def factors(self):
+        """
+        Factors as used by `constraints.covariance_factors`.
+
+        Returns
+        -------
+
+        sqrt_cov : $LP$ satisfying `sqrt_cov.dot(sqrt_cov.T) = self`
+
+        sqrt_inv : $PL^{-1}$, a left inverse of `sqrt_cov` on its range
+
+        rowspace : orthogonal projection onto the range of `self`
+
+        """
+        sqrt_cov = _linear_operator(self.shape,
+                                    lambda arg: self._L(self._project(arg)),
+                                    lambda arg: self._project(self._LT(arg)))
+        sqrt_inv = _linear_operator(self.shape,
+                                    lambda arg: self._project(self._Linv(arg)),
+                                    lambda arg: self._LTinv(self._project(arg)))
+
+        # the range of $LPL^T$ is orthogonal to $L^{-T}Q$
+
+        Q = self.nullspace
+        if Q.shape[1] > 0:
+            R = np.linalg.qr(self._LTinv(Q))[0]
+        else:
+            R = Q
+        projection = lambda arg: arg - R.dot(R.T.dot(arg))
+        rowspace = _linear_operator(self.shape, projection, projection)
+        return sqrt_cov, sqrt_inv, rowspace
+
+    # Private methods
+
+    def _L(self, arg):
+        return _rowscale(self.diag_sqrt, arg) + self.left.dot(self.right.T.dot(arg))
+
+    def _LT(self, arg):
+        return _rowscale(self.diag_sqrt, arg) + self.right.dot(self.left.T.dot(arg))
+
+    def _Linv(self, arg):
+        arg = _rowscale(1. / self.diag_sqrt, arg)
+        return arg - _rowscale(1. / self.diag_sqrt,
+                               self.left.dot(self._core.dot(self.right.T.dot(arg))))
+
+    def _LTinv(self, arg):
+        arg = _rowscale(1. / self.diag_sqrt, arg)
+        return arg - _rowscale(1. / self.diag_sqrt,
+                               self.right.dot(self._core.T.dot(self.left.T.dot(arg))))
+
+    def _project(self, arg):
+        Q = self.nullspace
+        return arg - Q.dot(Q.T.dot(arg))
+
+class scalar_covariance(structured_covariance):
+
+    r"""
+    The covariance $\sigma^2 I$.
+    """
+
+    def __init__(self, dim, scale=1.):
+        """
+        Parameters
+        ----------
+
+        dim : int
+            Dimension $n$.
+
+        scale : float
+            The variance $\sigma^2$.
+
+        """
+        structured_covariance.__init__(self, np.sqrt(scale) * np.ones(dim))
+
+class diagonal_covariance(structured_covariance):
+
+    r"""
+    The covariance $\text{diag}(d)$.
+    """
+
+    def __init__(self, diag):
+        """
+        Parameters
+        ----------
+
+        diag : np.float(n)
+            Positive variances $d$.
+
+        """
+        structured_covariance.__init__(self, np.sqrt(diag))
+
+class lowrank_covariance(structured_covariance):
+
+    r"""
+    The covariance $\text{diag}(d) + FF^T$.
+    """
+
+    def __init__(self, diag, factor):
+        r"""
+        Parameters
+        ----------
+
+        diag : np.float(n)
+            Positive variances $d$.
+
+        factor : np.float((n,k))
+            Low-rank factor $F$.
+
+        Notes
+        -----
+
+        With $D^{-1/2}F = USV^T$ a square root is
+        $D^{1/2}(I + U((I+S^2)^{1/2} - I)U^T)$.
+
+        """
+        diag_sqrt = np.sqrt(diag)
+        factor = np.asarray(factor).reshape((diag_sqrt.shape[0], -1))
+        U, S = np.linalg.svd(factor / diag_sqrt[:,None], full_matrices=False)[:2]
+        structured_covariance.__init__(self,
+                                       diag_sqrt,
+                                       diag_sqrt[:,None] * U * (np.sqrt(1 + S**2) - 1)[None,:],
+                                       U)
+
+class _linear_operator(object):
+
+    def __init__(self, shape, matvec, rmatvec):
+        self.shape = shape
+        self._matvec, self._rmatvec = matvec, rmatvec
+
+    @property
+    def T(self):
+        return _linear_operator(self.shape[::-1], self._rmatvec, self._matvec)
+
+    def dot(self, arg):
+        return self._matvec(np.asarray(arg))
+
+def _rowscale(scale, arg):
+    return scale.reshape((-1,) + (1,) * (arg.ndim - 1)) * arg
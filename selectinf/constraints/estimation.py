@@ -521,8 +521,7 @@ class optimal_tilt(rr.smooth_atom):
                                           eta.reshape((-1,1))])
 
         sqrt_inv = affine_con.covariance_factors()[1]
-        Si = np.dot(sqrt_inv.T, sqrt_inv)
-        self.Q = np.dot(design.T, np.dot(Si, design))
+        self.Q = np.dot(design.T, sqrt_inv.T.dot(sqrt_inv.dot(design)))
 
         gamma = affine_con.mean
 
@@ -7,6 +7,12 @@ from ..truncated.api import truncated_chi, truncated_chi2, truncated_F
 from .intervals import intervals
 from .base import constraints as base_constraints
 
+try:
+    from ..sampling.hmc import quad_sampler
+    have_hmc = True
+except ImportError:
+    have_hmc = False
+
 class constraints(base_constraints):
 
     r"""
@@ -310,7 +316,34 @@ class constraints(base_constraints):
 
     
 
-    def sample(self, n_sample, initial_point):
+    def sample(self, n_sample, initial_point, method='hmc'):
+        """
+        Sample from $N(0,I)$ restricted to the constraints.
+
+        Parameters
+        ----------
+
+        n_sample : int
+            How many samples should we return?
+
+        initial_point : np.float
+            Point satisfying the constraints.
+
+        method : str
+            Only 'hmc' (exact Hamiltonian Monte Carlo) is
+            available for quadratic constraints.
+
+        Returns
+        -------
+
+        samples : [np.float((p,1))]
+        """
+
+        if method != 'hmc':
+            raise ValueError("method should be 'hmc'")
+        if not have_hmc:
+            raise ValueError("method='hmc' requires the compiled extension `selectinf.sampling.hmc`")
+
         initial_point = initial_point.reshape(-1)
         quad = self.quad_part
         quad_lin = self.lin_part
@@ -318,7 +351,6 @@ class constraints(base_constraints):
         lin = np.array([]).reshape((0,0))
         offset_lin = np.array([])
 
-        # this import does not exist
         samples = quad_sampler(n_sample,
                                initial_point,
                                quad,
@@ -168,6 +168,158 @@ def test_sampling():
     nt.assert_true(np.linalg.norm(np.einsum('ij,ik->ijk', V, V).mean(0) - 
                                   np.outer(V.mean(0), V.mean(0)) - S) < 0.01)
 
+@set_seed_iftrue(SET_SEED)
+def test_multiple_chains():
+    """
+    Chains split the draws and are reproducible
+    regardless of the number of workers
+    """
+    C = AC.constraints(np.identity(3), np.inf*np.ones(3))
+    C.mean = np.array([3,4,5.2])
+    W = np.random.standard_normal((5,3))
+    C.covariance = np.dot(W.T, W) / 30.
+
+    state = np.random.get_state()
+    V1, stats = AC.sample_from_constraints(C, np.zeros(3), ndraw=20001, nchains=4, return_stats=True)
+    np.random.set_state(state)
+    V2 = AC.sample_from_constraints(C, np.zeros(3), ndraw=20001, nchains=4, n_jobs=2)
+
+    nt.assert_equal(V1.shape, (20001, 3))
+    np.testing.assert_allclose(V1, V2)
+    nt.assert_equal(stats['move_rate'].shape, (4,))
+    nt.assert_true(np.all(stats['rhat'] < 1.1))
+    nt.assert_true(np.linalg.norm(V1.mean(0)-C.mean) < 0.05)
+
+@set_seed_iftrue(SET_SEED)
+def test_chain_starts():
+    """
+    Each chain can start from its own point
+    """
+    C = AC.constraints(np.identity(3), np.ones(3))
+    Y = np.zeros(3)
+
+    state = np.random.get_state()
+    V1 = AC.sample_from_constraints(C, Y, ndraw=1001, burnin=10, nchains=3)
+    np.random.set_state(state)
+    V2 = AC.sample_from_constraints(C, np.array([Y] * 3), ndraw=1001, burnin=10, nchains=3)
+    np.testing.assert_allclose(V1, V2)
+
+    nt.assert_equal(AC.chain_sizes(1001, 3), [334, 334, 333])
+    nt.assert_raises(ValueError, AC.sample_from_constraints, C, np.array([Y] * 2), 
+                     ndraw=10, nchains=3)
+
+@set_seed_iftrue(SET_SEED)
+def test_accept_reject():
+    """
+    Accept reject returns exactly num_draw samples
+    or falls back to hit and run
+    """
+    C = AC.constraints(-np.identity(5)[:2], np.zeros(2))
+    Y = np.ones(5)
+
+    Z = AC.sample_from_constraints(C, Y, ndraw=100, burnin=10, 
+                                   accept_reject_params=(200, 30, 3000))
+    nt.assert_equal(Z.shape, (3000, 5))
+    nt.assert_true(np.all(Z[:,:2] > 0))
+
+    # acceptance rate of 1/32 is below 30/200
+
+    C = AC.constraints(-np.identity(5), np.zeros(5))
+    Z = AC.sample_from_constraints(C, Y, ndraw=100, burnin=10, 
+                                   accept_reject_params=(200, 30, 3000))
+    nt.assert_equal(Z.shape, (100, 5))
+    nt.assert_true(np.all(Z > 0))
+
+@dec.skipif(not AC.have_hmc, msg="HMC extension not built")
+@set_seed_iftrue(SET_SEED)
+def test_hmc_sampling():
+    """
+    Exact HMC draws satisfy the constraints and
+    agree with hit-and-run
+    """
+    C = AC.constraints(np.vstack([-np.identity(3), np.ones((1,3))]), np.array([0,0,0,4.]))
+    C.mean = np.array([1,2,-1.])
+    W = np.random.standard_normal((5,3))
+    C.covariance = np.dot(W.T, W) / 5.
+    Y = np.ones(3)
+
+    Z_hmc = AC.sample_from_constraints(C, Y, ndraw=20000, burnin=100, method='hmc')
+    Z_hr = AC.sample_from_constraints(C, Y, ndraw=20000, burnin=1000)
+
+    nt.assert_equal(Z_hmc.shape, (20000, 3))
+    nt.assert_true(np.all(Z_hmc.dot(C.linear_part.T) <= C.offset + 1.e-8))
+    nt.assert_true(np.linalg.norm(Z_hmc.mean(0) - Z_hr.mean(0)) < 0.1)
+
+@set_seed_iftrue(SET_SEED)
+def test_covariance_factors_cache():
+    """
+    Covariance factors are cached until the covariance is reassigned
+    """
+    W = np.random.standard_normal((6,4))
+    C = AC.constraints(-np.identity(4), np.zeros(4), covariance=W.T.dot(W))
+
+    sqrt_cov = C.covariance_factors()[0]
+    nt.assert_true(C.covariance_factors()[0] is sqrt_cov)
+    np.testing.assert_allclose(sqrt_cov.dot(sqrt_cov.T), C.covariance)
+
+    C.covariance *= 4
+    sqrt_cov = C.covariance_factors()[0]
+    np.testing.assert_allclose(sqrt_cov.dot(sqrt_cov.T), C.covariance)
+
+    C.scale_covariance(0.25)
+    sqrt_cov, sqrt_inv = C.covariance_factors()[:2]
+    np.testing.assert_allclose(sqrt_cov.dot(sqrt_cov.T), W.T.dot(W))
+    np.testing.assert_allclose(sqrt_inv.dot(sqrt_cov), np.identity(4), atol=1.e-10)
+
+@set_seed_iftrue(SET_SEED)
+def test_bounds_many():
+    """
+    Batched bounds, pivots and intervals agree with
+    those computed one direction at a time
+    """
+    A, b = np.random.standard_normal((8,30)), 2 * np.ones(8)
+    W = np.random.standard_normal((30,30))
+    con = AC.constraints(A, b, covariance=W.dot(W.T) / 30)
+    Y = np.zeros(30)
+    H = np.random.standard_normal((5,30))
+
+    bounds = con.bounds_many(H, Y)
+    np.testing.assert_allclose(np.array(bounds),
+                               np.array([con.bounds(h, Y) for h in H]).T)
+
+    alternatives = ['greater', 'less', 'twosided', 'twosided', 'less']
+    np.testing.assert_allclose(con.pivot_many(H, Y, alternative=alternatives, bounds=bounds),
+                               [con.pivot(h, Y, alternative=alt) for h, alt in zip(H, alternatives)])
+    np.testing.assert_allclose(con.interval_many(H, Y, bounds=bounds),
+                               [con.interval(h, Y) for h in H])
+
+@set_seed_iftrue(SET_SEED)
+def test_gibbs_test_many():
+    """
+    One chain for several directions: the projections
+    have the right law when the constraints do not bind
+    and the p-values are computed from them
+    """
+    A, b = np.random.standard_normal((6,10)), 100 * np.ones(6)
+    con = AC.constraints(A, b)
+    Y = np.zeros(10)
+    H = np.random.standard_normal((3,10))
+
+    for sigma_known in [True, False]:
+        pvalues, T, W = AC.gibbs_test_many(con, Y, H,
+                                           ndraw=20000,
+                                           burnin=1000,
+                                           how_often=10,
+                                           alternative='greater',
+                                           sigma_known=sigma_known)
+        nt.assert_equal(T.shape, (20000, 3))
+        nt.assert_equal(W.shape, (20000,))
+        np.testing.assert_allclose(pvalues, (W[:,None] * (T >= 0)).sum(0) / W.sum())
+
+    pvalues, T, W = AC.gibbs_test_many(con, Y, H, ndraw=20000, burnin=1000, sigma_known=True)
+    np.testing.assert_allclose(T.std(0), np.sqrt((H**2).sum(1)), rtol=0.05)
+    nt.assert_true(np.all(np.fabs(T.mean(0)) < 0.1 * T.std(0)))
+
 @set_seed_iftrue(SET_SEED)
 @dec.skipif(True, msg="optimal tilt undefined -- need to implement softmax version")
 def test_optimal_tilt():
@@ -0,0 +1,69 @@
+from __future__ import absolute_import, print_function
+
+import numpy as np
+import nose.tools as nt
+
+from .. import affine as AC
+from ..covariance import (scalar_covariance,
+                          diagonal_covariance,
+                          lowrank_covariance)
+from ...tests.flags import SET_SEED
+from ...tests.decorators import set_seed_iftrue
+
+def _instances(n):
+    diag = np.random.uniform(1, 2, n)
+    factor = np.random.standard_normal((n, 3))
+    return [(scalar_covariance(n, 2.), 2 * np.identity(n)),
+            (diagonal_covariance(diag), np.diag(diag)),
+            (lowrank_covariance(diag, factor), np.diag(diag) + factor.dot(factor.T))]
+
+@set_seed_iftrue(SET_SEED)
+def test_structured_covariance(n=30):
+    """
+    Products, conditioning and factors agree with the dense matrices
+    """
+    I = np.identity(n)
+    C = np.random.standard_normal((4, n))
+    for S, dense in _instances(n):
+        np.testing.assert_allclose(S.dot(I), dense, atol=1.e-10)
+        np.testing.assert_allclose((S * 3).dot(I), 3 * dense, atol=1.e-10)
+
+        M1 = dense.dot(C.T)
+        conditional = dense - M1.dot(np.linalg.inv(C.dot(M1))).dot(M1.T)
+        S_cond = S.conditional(C)
+        nt.assert_equal(S_cond.rank, n - 4)
+        np.testing.assert_allclose(S_cond.dot(I), conditional, atol=1.e-10)
+
+        sqrt_cov, sqrt_inv, rowspace = S_cond.factors()
+        L = sqrt_cov.dot(I)
+        np.testing.assert_allclose(L.dot(L.T), conditional, atol=1.e-10)
+        np.testing.assert_allclose(L.dot(sqrt_inv.dot(conditional)), conditional, atol=1.e-10)
+        np.testing.assert_allclose(rowspace.dot(conditional), conditional, atol=1.e-10)
+
+@set_seed_iftrue(SET_SEED)
+def test_structured_constraints(n=30):
+    """
+    Bounds and conditional constraints match those
+    with a dense covariance and samples satisfy the constraints
+    """
+    A = np.random.standard_normal((5, n))
+    b = 3 * np.ones(5)
+    C = np.random.standard_normal((2, n))
+    Y = np.zeros(n)
+    eta = np.random.standard_normal(n)
+
+    for S, dense in _instances(n):
+        con_S = AC.constraints(A, b, covariance=S)
+        con_dense = AC.constraints(A, b, covariance=dense)
+        np.testing.assert_allclose(con_S.bounds(eta, Y), con_dense.bounds(eta, Y))
+
+        cond_S = con_S.conditional(C, C.dot(Y))
+        cond_dense = con_dense.conditional(C, C.dot(Y))
+        np.testing.assert_allclose(cond_S.bounds(eta, Y), cond_dense.bounds(eta, Y))
+
+        Z = AC.sample_from_constraints(cond_S, Y, ndraw=500, burnin=100)
+        nt.assert_true(np.fabs(Z.dot(C.T)).max() < 1.e-8)
+        nt.assert_true((Z.dot(A.T) - b).max() < 1.e-8)
+
+        con_S.covariance *= 4
+        np.testing.assert_allclose(con_S.solve(eta), np.linalg.solve(4 * dense, eta))
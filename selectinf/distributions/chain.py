@@ -4,6 +4,9 @@ Monte Carlo Significance Tests.
 
 .. _besag_clifford: http://www.jstor.org/stable/pdf/2336623.pdf
 
+Also includes convergence diagnostics (split R-hat, effective
+sample size) for samples from several chains.
+
 """
 
 import numpy as np
@@ -23,6 +26,42 @@ class markov_chain(object):
     def forward_step(self):
         raise NotImplementedError('abstract method')
 
+    # Several independent forward steps from the current state.
+    # Subclasses that can advance many copies at once
+    # should override this.
+
+    def forward_steps(self, nsample):
+        """
+        Take `nsample` independent forward steps,
+        each started from the current state.
+
+        Parameters
+        ----------
+
+        nsample : int
+            How many forward steps to take?
+
+        Returns
+        -------
+
+        states : sequence
+            The `nsample` resulting states.
+
+        Notes
+        -----
+
+        The attribute `chain.state` is unchanged
+        after running.
+
+        """
+        initial_state = self.state
+        states = []
+        for _ in range(nsample):
+            self.forward_step()
+            states.append(self.state)
+            self.state = initial_state
+        return states
+
     # Some Markov chains can run in time-reversed direction.
     # Not all subclasses need this method implemented
 
@@ -75,7 +114,8 @@ class reversible_markov_chain(markov_chain):
         """
         return self.step()
 
-def parallel_test(reversible_chain, null_state, test_statistic, ndraw=20):
+def parallel_test(reversible_chain, null_state, test_statistic, ndraw=20,
+                  vectorized=False):
     """
 
     Besag and Clifford's parallel test for reversible
@@ -103,6 +143,11 @@ def parallel_test(reversible_chain, null_state, test_statistic, ndraw=20):
         How many total draws of the chain should be made?
         Includes `null_state` as one of these draws.
 
+    vectorized : bool
+        If True, `test_statistic` is called once on all of the
+        states returned by `chain.forward_steps` and should
+        return an array of `ndraw-1` values.
+
     Returns
     -------
 
@@ -123,27 +168,20 @@ def parallel_test(reversible_chain, null_state, test_statistic, ndraw=20):
 
     observed = test_statistic(null_state)
 
-    results = []
-
     old_state, chain.state = chain.state, null_state
     
-    intermed_state = chain.backward_step()
-    
-    for _ in range(ndraw-1):
-
-        # take a step from intermediate state
-        chain.forward_step()
-
-        # compute the test statistic
-        results.append(test_statistic(chain.state))
+    # take `ndraw-1` forward steps from the intermediate state
 
-        # reset the state to the intermediate state
-        chain.state = intermed_state
+    chain.backward_step()
+    states = chain.forward_steps(ndraw-1)
 
-    results = sorted(results)
+    if vectorized:
+        results = np.asarray(test_statistic(states))
+    else:
+        results = np.array([test_statistic(state) for state in states])
 
-    rank = np.sum([r < observed for r in results]) 
-    ties = np.sum([observed == r for r in results]) 
+    rank = np.sum(results < observed)
+    ties = np.sum(results == observed)
     
     possible_ranks = range(rank, rank + ties + 1)
     final_rank = np.random.choice(possible_ranks)
@@ -248,3 +286,76 @@ def serial_test(reversible_chain, null_state, test_statistic, ndraw=20):
 
 # make sure nose does not try to test this function
 serial_test.__test__ = False
+
+def split_rhat(samples):
+    """
+    Split R-hat of Gelman et al. for each coordinate.
+
+    Parameters
+    ----------
+
+    samples : ndarray
+        Shape (nchain, ndraw, d).
+
+    Returns
+    -------
+
+    rhat : ndarray
+        Shape (d,). Values near 1 indicate the
+        chains have mixed.
+
+    """
+    samples = np.asarray(samples)
+    half = samples.shape[1] // 2
+    split = np.concatenate([samples[:,:half], samples[:,half:2*half]], 0)
+
+    within = split.var(1, ddof=1).mean(0)
+    between = half * split.mean(1).var(0, ddof=1)
+    var_plus = (half - 1.) / half * within + between / half
+    return np.sqrt(var_plus / within)
+
+def effective_sample_size(samples):
+    """
+    Effective sample size for each coordinate, pooling
+    autocorrelations across chains and truncating their sum
+    by Geyer's initial positive sequence.
+
+    Parameters
+    ----------
+
+    samples : ndarray
+        Shape (nchain, ndraw, d).
+
+    Returns
+    -------
+
+    ess : ndarray
+        Shape (d,).
+
+    """
+    samples = np.asarray(samples)
+    nchain, ndraw, d = samples.shape
+
+    # autocovariances of each chain by FFT
+
+    centered = samples - samples.mean(1)[:,None]
+    nfft = 2**int(np.ceil(np.log2(2 * ndraw)))
+    transform = np.fft.rfft(centered, n=nfft, axis=1)
+    acov = np.fft.irfft(transform * np.conj(transform), n=nfft, axis=1)[:,:ndraw] / ndraw
+
+    within = acov[:,0].mean(0) * ndraw / (ndraw - 1.)
+    var_plus = within * (ndraw - 1.) / ndraw
+    if nchain > 1:
+        var_plus += samples.mean(1).var(0, ddof=1)
+    rho = 1 - (within[None,:] - acov.mean(0)) / var_plus[None,:]
+    rho[0] = 1
+
+    npair = ndraw // 2
+    pairs = rho[0:2*npair:2] + rho[1:2*npair:2]
+    ess = np.zeros(d)
+    for j in range(d):
+        negative = np.nonzero(pairs[:,j] < 0)[0]
+        k = negative[0] if negative.shape[0] > 0 else npair
+        tau = max(-1 + 2 * pairs[:k,j].sum(), 1. / np.log10(nchain * ndraw))
+        ess[j] = nchain * ndraw / tau
+    return ess
@@ -1,5 +1,7 @@
 import numpy as np
+from scipy.stats import chisquare
 
+from ...tests.decorators import set_seed_iftrue
 from ..chain import parallel_test, serial_test
 from ...constraints.affine import constraints, gaussian_hit_and_run
 
@@ -36,3 +38,67 @@ def test_gaussian_chain():
                          ndraw=20)
 
     return parallel, serial
+
+def test_forward_steps():
+
+    n = 30
+
+    A = np.eye(n)[:3]
+    b = np.ones(A.shape[0])
+
+    con = constraints(A, b)
+    state = np.random.standard_normal(n)
+    state[:3] = 0
+
+    gaussian_chain = gaussian_hit_and_run(con, state, nstep=100)
+
+    # independent copies all satisfy the constraints
+    # and leave the chain where it was
+
+    states = gaussian_chain.forward_steps(500)
+    np.testing.assert_equal(states.shape, (500, n))
+    np.testing.assert_array_less(states.dot(A.T).max(0), b + 1.e-8)
+    np.testing.assert_allclose(gaussian_chain.state, state)
+    np.testing.assert_allclose(states[:,3:].std(0).mean(), 1, rtol=0.1)
+
+    test_statistic = lambda z: z.dot(np.ones(n))
+
+    rank = parallel_test(gaussian_chain, 
+                         gaussian_chain.state,
+                         test_statistic,
+                         ndraw=20,
+                         vectorized=True)
+    assert 0 <= rank <= 19
+    np.testing.assert_allclose(gaussian_chain.state, state)
+
+@set_seed_iftrue(True)
+def test_parallel_uniform(nsim=400, ndraw=20):
+
+    n = 10
+
+    A = np.eye(n)[:3]
+    b = np.ones(A.shape[0])
+
+    con = constraints(A, b)
+    state = np.zeros(n)
+    gaussian_chain = gaussian_hit_and_run(con, state, nstep=10)
+
+    test_statistic = lambda z: z.dot(np.ones(n))
+
+    # null states drawn exactly from the truncated Gaussian
+    # give ranks uniform on 0, ..., ndraw-1
+
+    ranks = []
+    for _ in range(nsim):
+        null_state = np.random.standard_normal(n)
+        while np.any(A.dot(null_state) > b):
+            null_state[:3] = np.random.standard_normal(3)
+        ranks.append(parallel_test(gaussian_chain,
+                                   null_state,
+                                   test_statistic,
+                                   ndraw=ndraw,
+                                   vectorized=True))
+    ranks = np.array(ranks)
+
+    counts = np.bincount(ranks * 4 // ndraw, minlength=4)
+    assert chisquare(counts).pvalue > 1.e-3
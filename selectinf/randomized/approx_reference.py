@@ -1,9 +1,13 @@
 from __future__ import division, print_function
 
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
 import numpy as np, pandas as pd
 from scipy.interpolate import interp1d
 
-from .selective_MLE_utils import solve_barrier_affine as solve_barrier_affine_C
+from .barrier import (solve_barrier_affine_batch,
+                      solve_barrier_affine_path)
 from ..distributions.discrete_family import discrete_family
 
 class approximate_grid_inference(object):
@@ -13,7 +17,12 @@ class approximate_grid_inference(object):
                  observed_target,
                  target_cov,
                  target_score_cov,
-                 solve_args={'tol':1.e-12}):
+                 solve_args={'tol':1.e-12},
+                 continuation=False,
+                 n_jobs=1,
+                 executor='thread',
+                 grid_tol=None,
+                 level=0.9):
 
         """
         Produce p-values and confidence intervals for targets
@@ -38,9 +47,49 @@ class approximate_grid_inference(object):
         solve_args : dict, optional
             Arguments passed to solver.
 
+        continuation : bool, optional
+            If True, solve the barrier problems on each grid
+            by walking outward from the observed target,
+            warm-starting each solve from its neighbour's solution.
+            Iteration counts are stored in `self.solve_iterations`.
+
+        n_jobs : int, optional
+            Number of workers used to construct the
+            family for each target. If -1, use all CPUs.
+            Results do not depend on `n_jobs`.
+
+        executor : str, optional
+            One of ['thread', 'process']: the kind of
+            pool used when `n_jobs` is not 1.
+
+        grid_tol : float, optional
+            If not None, replace the fixed grid of 40 points
+            by an adaptive one for each target: starting from
+            11 points, the grid is extended until the
+            weight at its ends is below `grid_tol`
+            relative to its maximum, and intervals are bisected
+            while quadratic interpolation misses the midpoint's
+            log-reference enough to change the relative mass
+            of the neighbouring half intervals by more
+            than `grid_tol`. Weights are those of the
+            reference density tilted to the observed target
+            and to the current endpoints of the interval at `level`,
+            so the tails that determine the interval are resolved.
+
+        level : float, optional
+            Confidence level whose intervals guide adaptive grids.
+
         """
 
+        if executor not in ['thread', 'process']:
+            raise ValueError("executor should be one of ['thread', 'process']")
+
         self.solve_args = solve_args
+        self.continuation = continuation
+        self.n_jobs = n_jobs
+        self.executor = executor
+        self.grid_tol = grid_tol
+        self.level = level
 
         result, inverse_info = query.selective_MLE(observed_target,
                                                    target_cov,
@@ -48,12 +97,12 @@ class approximate_grid_inference(object):
                                                    solve_args=solve_args)[:2]
         mle = result['MLE']
         
-        self.linear_part = query.sampler.affine_con.linear_part
+        self.linear_part = query.sampler.barrier_linear_part
         self.offset = query.sampler.affine_con.offset
 
         self.logdens_linear = query.sampler.logdens_transform[0]
         self.cond_mean = query.cond_mean
-        self.prec_opt = np.linalg.inv(query.cond_cov)
+        self.prec_opt = query.sampler.cond_factorization.precision
         self.cond_cov = query.cond_cov
 
         self.observed_target = observed_target
@@ -64,7 +113,10 @@ class approximate_grid_inference(object):
 
         self.ntarget = ntarget = target_cov.shape[0]
         _scale = 4 * np.sqrt(np.diag(inverse_info))
-        ngrid = 40
+        if grid_tol is None:
+            ngrid = 40
+        else:
+            ngrid = 11
 
         scale_ = 4 * np.max(np.sqrt(np.diag(inverse_info)))
 
@@ -122,7 +174,8 @@ class approximate_grid_inference(object):
                              observed_target,
                              target_cov,
                              target_score_cov,
-                             grid):
+                             grid,
+                             return_iterations=False):
 
         """
         Approximate the log of the reference density on a grid.
@@ -134,73 +187,255 @@ class approximate_grid_inference(object):
         prec_target = np.linalg.inv(target_cov)
         target_lin = - self.logdens_linear.dot(target_score_cov.T.dot(prec_target))
 
-        ref_hat = []
-        solver = solve_barrier_affine_C
-        for k in range(grid.shape[0]):
-            # in the usual D = N + Gamma theta.hat,
-            # target_lin is "something" times Gamma,
-            # where "something" comes from implied Gaussian
-            # cond_mean is "something" times D
-            # Gamma is target_score_cov.T.dot(prec_target)
-            
-            cond_mean_grid = (target_lin.dot(np.atleast_1d(grid[k] - observed_target)) + 
-                              self.cond_mean)
-            conjugate_arg = self.prec_opt.dot(cond_mean_grid)
+        # in the usual D = N + Gamma theta.hat,
+        # target_lin is "something" times Gamma,
+        # where "something" comes from implied Gaussian
+        # cond_mean is "something" times D
+        # Gamma is target_score_cov.T.dot(prec_target)
+
+        # all grid points share the precision and constraints,
+        # so solve the barrier problems as one batch
+
+        cond_mean_grid = (np.subtract.outer(grid, observed_target).dot(target_lin.T) +
+                          self.cond_mean[None,:])
+        conjugate_arg = cond_mean_grid.dot(self.prec_opt)
+
+        if self.continuation:
+            # walk the sorted grid outward from the observed target
+            order = np.argsort(grid)
+            start = np.argmin(np.fabs(grid[order] - observed_target[0]))
+            val, _, _, niter = solve_barrier_affine_path(conjugate_arg[order],
+                                                         self.prec_opt,
+                                                         self.init_soln,
+                                                         self.linear_part,
+                                                         self.offset,
+                                                         start=start,
+                                                         return_iterations=True,
+                                                         **self.solve_args)
+            val[order], niter[order] = val.copy(), niter.copy()
+        else:
+            val, _, _, niter = solve_barrier_affine_batch(conjugate_arg,
+                                                          self.prec_opt,
+                                                          self.init_soln,
+                                                          self.linear_part,
+                                                          self.offset,
+                                                          return_iterations=True,
+                                                          **self.solve_args)
+
+        ref_hat = -val - np.sum(conjugate_arg.dot(self.cond_cov) * conjugate_arg, 1) / 2.
+
+        if return_iterations:
+            return np.asarray(ref_hat), niter
+        return np.asarray(ref_hat)
 
-            val, _, _ = solver(conjugate_arg,
-                               self.prec_opt,
-                               self.init_soln,
-                               self.linear_part,
-                               self.offset,
-                               **self.solve_args)
+    def _construct_families(self):
 
-            ref_hat.append(-val - (conjugate_arg.T.dot(self.cond_cov).dot(conjugate_arg) / 2.))
+        # the families for different targets are independent,
+        # `executor.map` returns them in order of target
 
-        return np.asarray(ref_hat)
+        n_jobs = self.n_jobs
+        if n_jobs == -1:
+            n_jobs = os.cpu_count() or 1
 
-    def _construct_families(self):
+        if n_jobs == 1:
+            results = [self._construct_family(m) for m in range(self.ntarget)]
+        else:
+            pool = {'thread':ThreadPoolExecutor,
+                    'process':ProcessPoolExecutor}[self.executor]
+            with pool(max_workers=n_jobs) as executor:
+                results = list(executor.map(self._construct_family, range(self.ntarget)))
+
+        self._families = [family for family, _, _ in results]
+        self.solve_iterations = [niter for _, niter, _ in results]
+        if self.grid_tol is not None:
+            self.stat_grid = [grid for _, _, grid in results]
+
+    def _construct_family(self, m):
+
+        p = self.target_score_cov.shape[1]
+        observed_target_uni = (self.observed_target[m]).reshape((1,))
+        target_cov_uni = (np.diag(self.target_cov)[m]).reshape((1, 1))
+        var_target = target_cov_uni[0, 0]
+        target_score_cov_uni = self.target_score_cov[m, :].reshape((1, p))
+
+        if self.grid_tol is None:
+            stat_grid = self.stat_grid[m]
+            approx_log_ref, niter = self._approx_log_reference(observed_target_uni,
+                                                               target_cov_uni,
+                                                               target_score_cov_uni,
+                                                               stat_grid,
+                                                               return_iterations=True)
+        else:
+            (stat_grid,
+             approx_log_ref,
+             niter) = self._adaptive_log_reference(observed_target_uni,
+                                                   target_cov_uni,
+                                                   target_score_cov_uni,
+                                                   self.stat_grid[m])
+
+        family = self._family_from_grid(stat_grid,
+                                        approx_log_ref,
+                                        self.observed_target[m],
+                                        var_target,
+                                        initial_grid=self.stat_grid[m])
+
+        # logG = - 0.5 * grid**2 / var_target
+        # logG -= logG.max()
+        # import matplotlib.pyplot as plt
+
+        # plt.plot(self.stat_grid[m][10:30], approx_log_ref[10:30])
+        # plt.plot(self.stat_grid[m][:10], approx_log_ref[:10], 'r', linewidth=4)
+        # plt.plot(self.stat_grid[m][30:], approx_log_ref[30:], 'r', linewidth=4)
+        # plt.plot(self.stat_grid[m]*1.5, fapprox(self.stat_grid[m]*1.5), 'k--')
+        # plt.show()
+
+        # plt.plot(grid, logW)
+        # plt.plot(grid, logG)
+
+        return family, niter, stat_grid
+
+    def _family_from_grid(self,
+                          stat_grid,
+                          approx_log_ref,
+                          observed_target,
+                          var_target,
+                          initial_grid=None):
+
+        approx_fn = interp1d(stat_grid,
+                             approx_log_ref,
+                             kind='quadratic',
+                             bounds_error=False,
+                             fill_value='extrapolate')
+
+        if initial_grid is None:
+            grid = np.linspace(stat_grid.min(), stat_grid.max(), 1000)
+        else:
+            # an adaptive grid may be wider than the one it started from:
+            # extend the same lattice rather than coarsen it
+
+            spacing = (initial_grid.max() - initial_grid.min()) / 999.
+            start, stop = np.round((np.array([stat_grid.min(), stat_grid.max()]) -
+                                    initial_grid.min()) / spacing)
+            grid = initial_grid.min() + spacing * np.arange(start, stop + 1)
+        logW = (approx_fn(grid) -
+                0.5 * (grid - observed_target)**2 / var_target)
+        logW -= logW.max()
+
+        # construction of families follows `selectinf.learning.core`
+
+        return discrete_family(grid, np.exp(logW))
+
+    def _adaptive_log_reference(self,
+                                observed_target,
+                                target_cov,
+                                target_score_cov,
+                                grid,
+                                max_extend=10,
+                                max_refine=8,
+                                max_points=60):
 
-        self._families = []
-        for m in range(self.ntarget):
-            p = self.target_score_cov.shape[1]
-            observed_target_uni = (self.observed_target[m]).reshape((1,))
-            target_cov_uni = (np.diag(self.target_cov)[m]).reshape((1, 1))
-            var_target = target_cov_uni[0, 0]
-            target_score_cov_uni = self.target_score_cov[m, :].reshape((1, p))
-
-            approx_log_ref = self._approx_log_reference(observed_target_uni,
-                                                        target_cov_uni,
-                                                        target_score_cov_uni,
-                                                        self.stat_grid[m])
-
-            approx_fn = interp1d(self.stat_grid[m],
-                                 approx_log_ref,
-                                 kind='quadratic',
-                                 bounds_error=False,
-                                 fill_value='extrapolate')
-
-            grid = np.linspace(self.stat_grid[m].min(), self.stat_grid[m].max(), 1000)
-            logW = (approx_fn(grid) -
-                    0.5 * (grid - self.observed_target[m])**2 / var_target)
-            logW -= logW.max()
-
-            # construction of families follows `selectinf.learning.core`
-            
-            self._families.append(discrete_family(grid,
-                                                  np.exp(logW)))
-            
-            # logG = - 0.5 * grid**2 / var_target
-            # logG -= logG.max()
-            # import matplotlib.pyplot as plt
-
-            # plt.plot(self.stat_grid[m][10:30], approx_log_ref[10:30])
-            # plt.plot(self.stat_grid[m][:10], approx_log_ref[:10], 'r', linewidth=4)
-            # plt.plot(self.stat_grid[m][30:], approx_log_ref[30:], 'r', linewidth=4)
-            # plt.plot(self.stat_grid[m]*1.5, fapprox(self.stat_grid[m]*1.5), 'k--')
-            # plt.show()
-
-            # plt.plot(grid, logW)
-            # plt.plot(grid, logG)
+        """
+        Approximate the log of the reference density
+        on a grid adapted to `self.grid_tol`, starting from `grid`.
+
+        Bisection stops once the grid has `max_points` points,
+        which guards against chasing noise in inexact solves.
+        If a round would pass `max_points`, only the midpoints
+        of the intervals with the most weight are added.
+
+        Returns the grid, the log reference and
+        the iterations taken by each barrier solve.
+        """
+
+        tol = self.grid_tol
+        args = (observed_target, target_cov, target_score_cov)
+        var_target = target_cov[0, 0]
+        initial_grid = grid
+
+        def _logW(grid, ref):
+            return ref - 0.5 * (grid - observed_target[0])**2 / var_target
+
+        def _tilts(grid, ref):
+            # natural parameters at which the weights matter:
+            # the observed target and the current interval endpoints
+
+            family = self._family_from_grid(grid,
+                                            ref,
+                                            observed_target[0],
+                                            var_target,
+                                            initial_grid=initial_grid)
+            lower, upper = family.equal_tailed_interval(observed_target[0],
+                                                        alpha=1 - self.level)
+            tilts = np.array([0, lower, upper])
+            max_logW = (_logW(grid, ref)[None,:] + np.multiply.outer(tilts, grid)).max(1)
+            return tilts, max_logW
+
+        def _rel_logW(grid, ref, tilts, max_logW):
+            # largest log weight over the tilts, relative to its maximum
+
+            logW = _logW(grid, ref)[None,:] + np.multiply.outer(tilts, grid)
+            return (logW - max_logW[:,None]).max(0)
+
+        def _merge(grid, ref, niter, new_grid):
+            new_ref, new_niter = self._approx_log_reference(*args, 
+                                                            new_grid, 
+                                                            return_iterations=True)
+            grid = np.hstack([grid, new_grid])
+            order = np.argsort(grid)
+            return (grid[order], 
+                    np.hstack([ref, new_ref])[order],
+                    np.hstack([niter, new_niter])[order],
+                    new_ref)
+
+        ref, niter = self._approx_log_reference(*args, grid, return_iterations=True)
+
+        # extend the grid while the weight at either end is not negligible
+
+        spacing = grid[1] - grid[0]
+        nextend = grid.shape[0] // 2
+        for _ in range(max_extend):
+            logW = _rel_logW(grid, ref, *_tilts(grid, ref))
+            new_grid = []
+            if logW[0] > np.log(tol):
+                new_grid.append(grid[0] - spacing * np.arange(nextend, 0, -1))
+            if logW[-1] > np.log(tol):
+                new_grid.append(grid[-1] + spacing * np.arange(1, nextend + 1))
+            if not new_grid:
+                break
+            grid, ref, niter = _merge(grid, ref, niter, np.hstack(new_grid))[:3]
+
+        # bisect intervals where quadratic interpolation
+        # misses the log reference at the midpoint by enough
+        # to change the mass nearby
+
+        refine = np.ones(grid.shape[0] - 1, np.bool_)
+        for _ in range(max_refine):
+            if not np.any(refine) or grid.shape[0] >= max_points:
+                break
+            midpoints = 0.5 * (grid[:-1] + grid[1:])[refine]
+            width = 0.5 * (grid[1:] - grid[:-1])[refine] / np.sqrt(var_target)
+            predicted = interp1d(grid, ref, kind='quadratic')(midpoints)
+            tilts, max_logW = _tilts(grid, ref)
+
+            budget = max_points - grid.shape[0]
+            if midpoints.shape[0] > budget:
+                keep = np.sort(np.argsort(-_rel_logW(midpoints,
+                                                     predicted,
+                                                     tilts,
+                                                     max_logW))[:budget])
+                midpoints, width, predicted = midpoints[keep], width[keep], predicted[keep]
+
+            grid, ref, niter, mid_ref = _merge(grid, ref, niter, midpoints)
+
+            # error in the mass of the half intervals
+            # on either side of each midpoint
+
+            weight = np.exp(np.minimum(_rel_logW(midpoints, mid_ref, tilts, max_logW), 0))
+            error = np.fabs(predicted - mid_ref) * weight * width
+            split = np.in1d(grid, midpoints[error > tol])
+            refine = split[:-1] | split[1:]
+
+        return grid, ref, niter
 
     def _approx_pivots(self,
                        mean_parameter,
@@ -0,0 +1,839 @@
+r"""
+Pure numpy solvers for the log-barrier approximation to the
+CGF of an affinely truncated Gaussian, i.e.
+
+.. math::
+
+    \text{minimize}_u -u^T\eta + \frac{1}{2} u^T Q u +
+    \sum_i \log\left(1 + \frac{s_i}{b_i - a_i^Tu}\right)
+
+where $s_i$ is the scaling `np.sqrt(np.diag(A.dot(Q).dot(A.T)))`.
+
+The batch and path solvers mirror `_solve_barrier_affine_py` in
+`selectinf.randomized.query` but solve many problems sharing $Q, A, b$
+at once. `solve_barrier_affine_newton` is a damped Newton method
+for the same problem, and `solve_barrier_affine_stacked` applies it
+to a stack of unrelated problems of the same size.
+
+Solvers for a single set of constraints accept either a dense
+`con_linear` or a `structured_linear` for constraints whose rows
+have at most two nonzeros.
+"""
+
+from __future__ import division, print_function
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+
+def solve_barrier_affine_batch(conjugate_args,
+                               precision,
+                               feasible_point,
+                               con_linear,
+                               con_offset,
+                               step=1,
+                               max_iter=1000,
+                               min_iter=200,
+                               tol=1.e-12,
+                               method='descent',
+                               return_iterations=False):
+    r"""
+    Solve the affine barrier problem for a stack
+    of conjugate arguments sharing the same precision
+    and constraints.
+
+    Parameters
+    ----------
+
+    conjugate_args : ndarray
+        Stack of shape (k, d), one argument per row.
+
+    precision : ndarray
+        Precision matrix of Gaussian, shape (d, d).
+
+    feasible_point : ndarray
+        Starting point for every problem, satisfying
+        `con_linear.dot(feasible_point) < con_offset`.
+
+    con_linear : ndarray or `structured_linear`
+        Linear part of affine constraints: $\{o:Ao \leq b\}$
+
+    con_offset : ndarray
+        Offset part of affine constraints: $\{o:Ao \leq b\}$
+
+    step : float, optional
+        Initial step size.
+
+    max_iter : int, optional
+        Maximum number of iterations.
+
+    min_iter : int, optional
+        Minimum number of iterations.
+
+    tol : float, optional
+        Relative tolerance on change in value.
+
+    method : str, optional
+        One of ['descent', 'newton']: use step-halving gradient
+        descent or `solve_barrier_affine_newton` for each problem.
+
+    return_iterations : bool, optional
+        Also return the number of iterations
+        taken for each problem?
+
+    Returns
+    -------
+
+    values : ndarray
+        Optimal values, shape (k,).
+
+    solns : ndarray
+        Minimizers, shape (k, d).
+
+    hess : ndarray
+        Inverse Hessians at minimizers, shape (k, d, d).
+
+    niter : ndarray
+        Iterations for each problem, shape (k,). Only
+        returned if `return_iterations`.
+
+    """
+
+    if method == 'newton':
+        conjugate_args = np.atleast_2d(conjugate_args)
+        values = np.zeros(conjugate_args.shape[0])
+        solns = np.zeros(conjugate_args.shape)
+        niter = np.zeros(conjugate_args.shape[0], np.int64)
+        for i in range(conjugate_args.shape[0]):
+            (values[i],
+             solns[i],
+             _,
+             niter[i]) = solve_barrier_affine_newton(conjugate_args[i],
+                                                     precision,
+                                                     feasible_point,
+                                                     con_linear,
+                                                     con_offset,
+                                                     step=step,
+                                                     tol=tol,
+                                                     return_iterations=True)
+    elif method == 'descent':
+        values, solns, niter = _barrier_descent_batch(conjugate_args,
+                                                      precision,
+                                                      feasible_point,
+                                                      con_linear,
+                                                      con_offset,
+                                                      step=step,
+                                                      max_iter=max_iter,
+                                                      min_iter=min_iter,
+                                                      tol=tol)
+    else:
+        raise ValueError("method should be one of ['descent', 'newton']")
+
+    hess = np.linalg.inv(precision[None,:,:] +
+                         _barrier_hessian_batch(solns,
+                                                con_linear,
+                                                con_offset,
+                                                barrier_scaling(con_linear, precision)))
+    if return_iterations:
+        return values, solns, hess, niter
+    return values, solns, hess
+
+def solve_barrier_affine_path(conjugate_args,
+                              precision,
+                              feasible_point,
+                              con_linear,
+                              con_offset,
+                              start=0,
+                              step=1,
+                              max_iter=1000,
+                              min_iter=200,
+                              warm_min_iter=10,
+                              tol=1.e-12,
+                              method='descent',
+                              return_iterations=False):
+    r"""
+    Solve the affine barrier problem along an ordered path
+    of conjugate arguments by continuation: the problem at `start`
+    is solved from `feasible_point`, then the path is walked
+    outward in both directions, each solve being warm-started
+    from the solution of its neighbour.
+
+    Parameters
+    ----------
+
+    conjugate_args : ndarray
+        Stack of shape (k, d), ordered so that neighbouring
+        rows have nearby solutions.
+
+    precision : ndarray
+        Precision matrix of Gaussian, shape (d, d).
+
+    feasible_point : ndarray
+        Starting point for the solve at `start`.
+
+    con_linear : ndarray or `structured_linear`
+        Linear part of affine constraints: $\{o:Ao \leq b\}$
+
+    con_offset : ndarray
+        Offset part of affine constraints: $\{o:Ao \leq b\}$
+
+    start : int, optional
+        Row of `conjugate_args` solved from `feasible_point`.
+
+    step : float, optional
+        Initial step size.
+
+    max_iter : int, optional
+        Maximum number of iterations.
+
+    min_iter : int, optional
+        Minimum number of iterations for the cold start.
+
+    warm_min_iter : int, optional
+        Minimum number of iterations for warm starts.
+
+    tol : float, optional
+        Relative tolerance on change in value.
+
+    method : str, optional
+        One of ['descent', 'newton']: use step-halving gradient
+        descent or `solve_barrier_affine_newton` for each problem.
+
+    return_iterations : bool, optional
+        Also return the number of iterations
+        taken for each problem?
+
+    Returns
+    -------
+
+    values : ndarray
+        Optimal values, shape (k,).
+
+    solns : ndarray
+        Minimizers, shape (k, d).
+
+    hess : ndarray
+        Inverse Hessians at minimizers, shape (k, d, d).
+
+    niter : ndarray
+        Iterations for each problem, shape (k,). Only
+        returned if `return_iterations`.
+
+    """
+
+    conjugate_args = np.atleast_2d(conjugate_args)
+    nproblem = conjugate_args.shape[0]
+
+    values = np.zeros(nproblem)
+    solns = np.zeros(conjugate_args.shape)
+    niter = np.zeros(nproblem, np.int64)
+
+    if method not in ['descent', 'newton']:
+        raise ValueError("method should be one of ['descent', 'newton']")
+
+    def _solve(i, initial, min_its):
+        if method == 'newton':
+            (values[i],
+             solns[i],
+             _,
+             niter[i]) = solve_barrier_affine_newton(conjugate_args[i],
+                                                     precision,
+                                                     initial,
+                                                     con_linear,
+                                                     con_offset,
+                                                     step=step,
+                                                     tol=tol,
+                                                     return_iterations=True)
+        else:
+            (values[i:i+1],
+             solns[i:i+1],
+             niter[i:i+1]) = _barrier_descent_batch(conjugate_args[i:i+1],
+                                                    precision,
+                                                    initial,
+                                                    con_linear,
+                                                    con_offset,
+                                                    step=step,
+                                                    max_iter=max_iter,
+                                                    min_iter=min_its,
+                                                    tol=tol)
+
+    _solve(start, feasible_point, min_iter)
+    for i in range(start + 1, nproblem):
+        _solve(i, solns[i-1], warm_min_iter)
+    for i in range(start - 1, -1, -1):
+        _solve(i, solns[i+1], warm_min_iter)
+
+    hess = np.linalg.inv(precision[None,:,:] +
+                         _barrier_hessian_batch(solns,
+                                                con_linear,
+                                                con_offset,
+                                                barrier_scaling(con_linear, precision)))
+    if return_iterations:
+        return values, solns, hess, niter
+    return values, solns, hess
+
+def solve_barrier_affine_newton(conjugate_arg,
+                                precision,
+                                feasible_point,
+                                con_linear,
+                                con_offset,
+                                step=1,
+                                max_iter=100,
+                                min_iter=0,
+                                tol=1.e-12,
+                                return_iterations=False):
+    r"""
+    Solve the affine barrier problem by damped Newton's method,
+    factoring the Hessian by Cholesky at each step.
+
+    Parameters
+    ----------
+
+    conjugate_arg : ndarray
+        Argument to conjugate of Gaussian, shape (d,).
+
+    precision : ndarray
+        Precision matrix of Gaussian, shape (d, d).
+
+    feasible_point : ndarray
+        Starting point satisfying
+        `con_linear.dot(feasible_point) < con_offset`.
+
+    con_linear : ndarray or `structured_linear`
+        Linear part of affine constraints: $\{o:Ao \leq b\}$
+
+    con_offset : ndarray
+        Offset part of affine constraints: $\{o:Ao \leq b\}$
+
+    step : float, optional
+        Initial (undamped) Newton step.
+
+    max_iter : int, optional
+        Maximum number of iterations.
+
+    min_iter : int, optional
+        Minimum number of iterations.
+
+    tol : float, optional
+        Relative tolerance on the Newton decrement.
+
+    return_iterations : bool, optional
+        Also return the number of iterations taken?
+
+    Returns
+    -------
+
+    value : float
+        Optimal value.
+
+    soln : ndarray
+        Minimizer.
+
+    hess : tuple
+        Cholesky factor of the Hessian at the minimizer,
+        as returned by `scipy.linalg.cho_factor`. Use
+        `hessian_solve` to apply its inverse.
+
+    niter : int
+        Number of iterations. Only returned
+        if `return_iterations`.
+
+    """
+
+    con_offset = np.asarray(con_offset)
+    scaling = barrier_scaling(con_linear, precision)
+
+    if feasible_point is None:
+        feasible_point = 1. / scaling
+
+    objective = lambda u: (-u.dot(conjugate_arg) + u.dot(precision).dot(u) / 2. +
+                           np.log(1. + scaling / (con_offset - con_linear.dot(u))).sum())
+
+    def hessian(u):
+        slack = con_offset - con_linear.dot(u)
+        weights = 1. / slack**2 - 1. / (scaling + slack)**2
+        return precision + barrier_hessian(con_linear, weights)
+
+    current = np.array(feasible_point, float)
+    if not np.all(con_offset - con_linear.dot(current) > 0):
+        raise ValueError('feasible_point does not satisfy constraints')
+    current_value = objective(current)
+
+    for itercount in range(max_iter):
+
+        slack = con_offset - con_linear.dot(current)
+        cur_grad = (-conjugate_arg + precision.dot(current) -
+                    con_linear.T.dot(1. / (scaling + slack) - 1. / slack))
+        direction = -cho_solve(cho_factor(hessian(current), lower=True), cur_grad)
+
+        # stop if the Newton decrement is small
+
+        decrement = -cur_grad.dot(direction)
+        if decrement / 2. <= tol * max(np.fabs(current_value), 1) and itercount >= min_iter:
+            break
+
+        # damp the step until proposal is feasible
+        # and gives sufficient decrease
+
+        cur_step = step
+        count = 0
+        while True:
+            count += 1
+            proposal = current + cur_step * direction
+            if np.all(con_offset - con_linear.dot(proposal) > 0):
+                proposed_value = objective(proposal)
+                if proposed_value <= current_value - 0.25 * cur_step * decrement:
+                    break
+            cur_step *= 0.5
+            if count >= 50:
+                break
+
+        if count >= 50: # no further progress possible
+            break
+
+        current = proposal
+        current_value = proposed_value
+
+    if np.isnan(current_value):
+        raise ValueError('value is NaN')
+
+    hess = cho_factor(hessian(current), lower=True)
+    if return_iterations:
+        return current_value, current, hess, itercount + 1
+    return current_value, current, hess
+
+def solve_barrier_affine_stacked(conjugate_args,
+                                 precisions,
+                                 feasible_points,
+                                 con_linears,
+                                 con_offsets,
+                                 step=1,
+                                 max_iter=100,
+                                 min_iter=0,
+                                 tol=1.e-12,
+                                 return_iterations=False):
+    r"""
+    Solve a stack of unrelated affine barrier problems
+    of the same size by damped Newton's method, as in
+    `solve_barrier_affine_newton`. Each Newton step is a
+    stacked (batched) Cholesky solve.
+
+    Problems of different sizes can be stacked after padding:
+    padded variables should have unit precision, zero conjugate
+    argument and zero columns in the constraints; padded
+    constraints should have zero rows and offset 1. Padded
+    variables and constraints do not change the value, nor the
+    solution and inverse Hessian of the original variables.
+
+    Parameters
+    ----------
+
+    conjugate_args : ndarray
+        Arguments to conjugate of Gaussian, shape (k, d).
+
+    precisions : ndarray
+        Precision matrices of Gaussian, shape (k, d, d).
+
+    feasible_points : ndarray
+        Starting points, shape (k, d), satisfying
+        the constraints of each problem.
+
+    con_linears : ndarray
+        Linear parts of affine constraints, shape (k, m, d).
+
+    con_offsets : ndarray
+        Offset parts of affine constraints, shape (k, m).
+
+    step : float, optional
+        Initial (undamped) Newton step.
+
+    max_iter : int, optional
+        Maximum number of iterations.
+
+    min_iter : int, optional
+        Minimum number of iterations.
+
+    tol : float, optional
+        Relative tolerance on the Newton decrement.
+
+    return_iterations : bool, optional
+        Also return the number of iterations
+        taken for each problem?
+
+    Returns
+    -------
+
+    values : ndarray
+        Optimal values, shape (k,).
+
+    solns : ndarray
+        Minimizers, shape (k, d).
+
+    hess : ndarray
+        Inverse Hessians at minimizers, shape (k, d, d).
+
+    niter : ndarray
+        Iterations for each problem, shape (k,). Only
+        returned if `return_iterations`.
+
+    """
+
+    conjugate_args = np.asarray(conjugate_args, float)
+    precisions = np.asarray(precisions, float)
+    con_linears = np.asarray(con_linears, float)
+    con_offsets = np.asarray(con_offsets, float)
+    nproblem = conjugate_args.shape[0]
+
+    scaling = np.sqrt(np.sum(np.matmul(con_linears, precisions) * con_linears, 2))
+
+    def _slack(U, idx):
+        return con_offsets[idx] - np.matmul(con_linears[idx], U[:,:,None])[:,:,0]
+
+    def objective(U, idx):
+        slack = _slack(U, idx)
+        return (-np.sum(U * conjugate_args[idx], 1) +
+                0.5 * np.sum(U * np.matmul(precisions[idx], U[:,:,None])[:,:,0], 1) +
+                np.log(1. + scaling[idx] / slack).sum(1))
+
+    def hessian(U, idx):
+        slack = _slack(U, idx)
+        weights = 1. / slack**2 - 1. / (scaling[idx] + slack)**2
+        A = con_linears[idx]
+        return precisions[idx] + np.matmul(np.transpose(A, (0, 2, 1)) * weights[:,None,:], A)
+
+    current = np.array(feasible_points, float)
+    if not np.all(_slack(current, np.arange(nproblem)) > 0):
+        raise ValueError('feasible_points do not satisfy constraints')
+    current_value = objective(current, np.arange(nproblem))
+    niter = np.zeros(nproblem, np.int64)
+    active = np.ones(nproblem, np.bool_)
+
+    for itercount in range(max_iter):
+
+        idx = np.nonzero(active)[0]
+        if idx.shape[0] == 0:
+            break
+        niter[idx] += 1
+
+        cur = current[idx]
+        slack = _slack(cur, idx)
+        cur_grad = (-conjugate_args[idx] +
+                    np.matmul(precisions[idx], cur[:,:,None])[:,:,0] -
+                    np.matmul(np.transpose(con_linears[idx], (0, 2, 1)),
+                              (1. / (scaling[idx] + slack) - 1. / slack)[:,:,None])[:,:,0])
+        direction = -np.linalg.solve(hessian(cur, idx), cur_grad[:,:,None])[:,:,0]
+
+        # stop rows whose Newton decrement is small
+
+        decrement = -np.sum(cur_grad * direction, 1)
+        converged = ((decrement / 2. <= tol * np.maximum(np.fabs(current_value[idx]), 1)) *
+                     (itercount >= min_iter))
+
+        # damp the steps until proposals are feasible
+        # and give sufficient decrease
+
+        cur_step = step * np.ones(idx.shape[0])
+        accept = converged.copy()
+        proposal = cur.copy()
+        proposed_value = current_value[idx].copy()
+        for count in range(50):
+            todo = np.nonzero(~accept)[0]
+            if todo.shape[0] == 0:
+                break
+            trial = cur[todo] + cur_step[todo,None] * direction[todo]
+            feasible = np.all(_slack(trial, idx[todo]) > 0, 1)
+            trial_value = np.inf * np.ones(todo.shape[0])
+            if np.any(feasible):
+                trial_value[feasible] = objective(trial[feasible], idx[todo][feasible])
+            good = feasible & (trial_value <= current_value[idx][todo] -
+                               0.25 * cur_step[todo] * decrement[todo])
+            proposal[todo[good]] = trial[good]
+            proposed_value[todo[good]] = trial_value[good]
+            accept[todo[good]] = True
+            cur_step[todo[~good]] *= 0.5
+
+        # rows that cannot make further progress stop
+
+        current[idx] = proposal
+        current_value[idx] = proposed_value
+        active[idx[converged | ~accept]] = False
+
+    if np.any(np.isnan(current_value)):
+        raise ValueError('value is NaN')
+
+    hess = np.linalg.inv(hessian(current, np.arange(nproblem)))
+    if return_iterations:
+        return current_value, current, hess, niter
+    return current_value, current, hess
+
+def hessian_solve(hess, arg):
+    """
+    Apply the inverse Hessian returned by a barrier
+    solver to `arg`. The Hessian is either
+    an explicit inverse or a Cholesky factor
+    from `solve_barrier_affine_newton`.
+    """
+    if isinstance(hess, tuple):
+        return cho_solve(hess, arg)
+    return hess.dot(arg)
+
+def barrier_scaling(con_linear, precision):
+    """
+    Scaling of the barrier: the square root of
+    the diagonal of `A.dot(precision).dot(A.T)`.
+    """
+    if isinstance(con_linear, structured_linear):
+        return np.sqrt(con_linear.quadratic_diag(precision))
+    return np.sqrt(np.sum(con_linear.dot(precision) * con_linear, 1))
+
+def barrier_hessian(con_linear, weights):
+    """
+    Form `A.T.dot(np.diag(weights)).dot(A)`, or a stack
+    of such matrices if `weights` has shape (k, m).
+    """
+    weights = np.asarray(weights)
+    if isinstance(con_linear, structured_linear):
+        return con_linear.weighted_gram(weights)
+    if weights.ndim == 1:
+        return (con_linear.T * weights[None,:]).dot(con_linear)
+    return np.matmul(con_linear.T[None,:,:] * weights[:,None,:], con_linear)
+
+def structured_constraint(linear_part):
+    """
+    Return a `structured_linear` equivalent to `linear_part`
+    if each of its rows has at most two nonzero entries,
+    otherwise return `linear_part` unchanged.
+    """
+    linear_part = np.asarray(linear_part)
+    if linear_part.ndim != 2 or np.any((linear_part != 0).sum(1) > 2):
+        return linear_part
+    return structured_linear.from_dense(linear_part)
+
+class structured_linear(object):
+
+    """
+    A constraint matrix $A$ whose rows each have at most
+    two nonzero entries, e.g. (signed) rows of the identity
+    as in the LASSO or the bidiagonal rows of SLOPE.
+
+    Products with $A$, $A^T$ and forming $A^TDA$ cost
+    $O(m)$ rather than $O(md)$. The methods used by the barrier
+    solvers mirror those of `np.ndarray`, so instances can
+    be passed as `con_linear` to the python solvers.
+    """
+
+    def __init__(self, cols, vals, ncol):
+        """
+        Parameters
+        ----------
+
+        cols : np.int((m,2))
+            Column indices of the (at most) two nonzeros in each row.
+
+        vals : np.float((m,2))
+            Corresponding values, 0 if a row has fewer nonzeros.
+
+        ncol : int
+            Number of columns of $A$.
+        """
+        self.cols, self.vals = np.asarray(cols), np.asarray(vals, float)
+        self.shape = (self.cols.shape[0], ncol)
+
+    @staticmethod
+    def from_dense(linear_part):
+        nrow, ncol = linear_part.shape
+        cols = np.zeros((nrow, 2), int)
+        vals = np.zeros((nrow, 2))
+        for i in range(nrow):
+            idx = np.nonzero(linear_part[i])[0]
+            if idx.shape[0] > 2:
+                raise ValueError('row %d has more than two nonzero entries' % i)
+            cols[i,:idx.shape[0]] = idx
+            vals[i,:idx.shape[0]] = linear_part[i, idx]
+            if idx.shape[0] == 1:
+                cols[i,1] = idx[0]
+        return structured_linear(cols, vals, ncol)
+
+    @property
+    def nonneg(self):
+        r"""
+        Is $A=-I$, i.e. does $Ao \leq 0$ say $o \geq 0$?
+        """
+        m, d = self.shape
+        return (m == d and np.all(self.cols[:,0] == np.arange(d)) and
+                np.all(self.vals[:,0] == -1) and np.all(self.vals[:,1] == 0))
+
+    @property
+    def T(self):
+        return _structured_transpose(self)
+
+    def dot(self, arg):
+        arg = np.asarray(arg)
+        shape = (-1,) + (1,) * (arg.ndim - 1)
+        return (self.vals[:,0].reshape(shape) * arg[self.cols[:,0]] +
+                self.vals[:,1].reshape(shape) * arg[self.cols[:,1]])
+
+    def quadratic_diag(self, precision):
+        """
+        Diagonal of `A.dot(precision).dot(A.T)`.
+        """
+        c0, c1 = self.cols[:,0], self.cols[:,1]
+        v0, v1 = self.vals[:,0], self.vals[:,1]
+        return (v0**2 * precision[c0, c0] + 2 * v0 * v1 * precision[c0, c1] +
+                v1**2 * precision[c1, c1])
+
+    def weighted_gram(self, weights):
+        """
+        Form `A.T.dot(np.diag(weights)).dot(A)`, or a stack
+        of such matrices if `weights` has shape (k, m).
+        """
+        d = self.shape[1]
+        out = np.zeros(weights.shape[:-1] + (d, d))
+        for i in range(2):
+            for j in range(2):
+                coef = weights * (self.vals[:,i] * self.vals[:,j])
+                if weights.ndim == 1:
+                    np.add.at(out, (self.cols[:,i], self.cols[:,j]), coef)
+                else:
+                    np.add.at(out, (slice(None), self.cols[:,i], self.cols[:,j]), coef)
+        return out
+
+    def toarray(self):
+        A = np.zeros(self.shape)
+        rows = np.arange(self.shape[0])
+        np.add.at(A, (rows, self.cols[:,0]), self.vals[:,0])
+        np.add.at(A, (rows, self.cols[:,1]), self.vals[:,1])
+        return A
+
+# private functions
+
+class _structured_transpose(object):
+
+    def __init__(self, linear):
+        self.linear = linear
+        self.shape = linear.shape[::-1]
+
+    @property
+    def T(self):
+        return self.linear
+
+    def dot(self, arg):
+        arg = np.asarray(arg)
+        linear = self.linear
+        shape = (-1,) + (1,) * (arg.ndim - 1)
+        out = np.zeros((linear.shape[1],) + arg.shape[1:])
+        np.add.at(out, linear.cols[:,0], linear.vals[:,0].reshape(shape) * arg)
+        np.add.at(out, linear.cols[:,1], linear.vals[:,1].reshape(shape) * arg)
+        return out
+
+
+def _barrier_hessian_batch(solns,
+                           con_linear,
+                           con_offset,
+                           scaling):
+    """
+    Hessian of barrier term at each row of `solns`,
+    formed as one (k, d, m) x (m, d) product.
+    """
+    slack = con_offset[None,:] - con_linear.dot(solns.T).T
+    weights = 1. / slack**2 - 1. / (scaling[None,:] + slack)**2
+    return barrier_hessian(con_linear, weights)
+
+def _barrier_descent_batch(conjugate_args,
+                           precision,
+                           feasible_point,
+                           con_linear,
+                           con_offset,
+                           step=1,
+                           max_iter=1000,
+                           min_iter=200,
+                           tol=1.e-12):
+    """
+    Row-wise version of the step-halving gradient descent
+    in `_solve_barrier_affine_py`. Each row keeps its own step size
+    and stops on its own once converged.
+
+    Returns values, solutions and the number of
+    iterations taken by each row.
+    """
+
+    conjugate_args = np.atleast_2d(conjugate_args)
+    con_offset = np.asarray(con_offset)
+    nproblem = conjugate_args.shape[0]
+
+    scaling = barrier_scaling(con_linear, precision)
+
+    if feasible_point is None:
+        feasible_point = 1. / scaling
+
+    def objective(U, conj):
+        slack = con_offset[None,:] - con_linear.dot(U.T).T
+        return (-np.sum(U * conj, 1) + 0.5 * np.sum(U.dot(precision) * U, 1) +
+                np.log(1. + scaling[None,:] / slack).sum(1))
+
+    def grad(U, conj):
+        slack = con_offset[None,:] - con_linear.dot(U.T).T
+        return (-conj + U.dot(precision) -
+                con_linear.T.dot((1. / (scaling[None,:] + slack) - 1. / slack).T).T)
+
+    current = np.multiply.outer(np.ones(nproblem), feasible_point)
+    current_value = np.inf * np.ones(nproblem)
+    steps = step * np.ones(nproblem)
+    niter = np.zeros(nproblem, np.int64)
+    active = np.ones(nproblem, np.bool_)
+
+    for itercount in range(max_iter):
+
+        idx = np.nonzero(active)[0]
+        if idx.shape[0] == 0:
+            break
+
+        cur, conj, cur_step = current[idx], conjugate_args[idx], steps[idx]
+        cur_grad = grad(cur, conj)
+
+        # make sure proposals are feasible
+
+        count = 0
+        while True:
+            count += 1
+            proposal = cur - cur_step[:,None] * cur_grad
+            feasible = np.all(con_offset[None,:] - con_linear.dot(proposal.T).T > 0, 1)
+            if np.all(feasible):
+                break
+            cur_step[~feasible] *= 0.5
+            if count >= 40:
+                raise ValueError('not finding a feasible point')
+
+        # make sure proposals are descents
+
+        count = 0
+        while True:
+            count += 1
+            proposal = cur - cur_step[:,None] * cur_grad
+            proposed_value = objective(proposal, conj)
+            descent = proposed_value <= current_value[idx]
+            if np.all(descent):
+                break
+            cur_step[~descent] *= 0.5
+            if count >= 20:
+                bad = np.isnan(proposed_value) | np.isnan(current_value[idx])
+                if not np.any(bad):
+                    break
+                else:
+                    raise ValueError('value is NaN: %f, %f' % (proposed_value[bad][0],
+                                                               current_value[idx][bad][0]))
+
+        # stop rows whose relative decrease is small
+
+        converged = ((np.fabs(current_value[idx] - proposed_value) <
+                      tol * np.fabs(current_value[idx])) * (itercount >= min_iter))
+
+        current[idx] = proposal
+        current_value[idx] = proposed_value
+        niter[idx] += 1
+
+        if itercount % 4 == 0:
+            cur_step *= 2
+        steps[idx] = cur_step
+        active[idx[converged]] = False
+
+    return current_value, current, niter
@@ -0,0 +1,107 @@
+"""
+Cached Cholesky factorizations of the Gaussians
+implied by a randomized query.
+
+The conditional covariance of the optimization variables
+and the covariance of a target are used by `selective_MLE`,
+`reparam_map`, `normalizing_constant`, `posterior` and
+`approximate_grid_inference`. A `gaussian_factorization`
+is built once per query (and per target covariance) so
+each of these shares a single $O(d^3)$ factorization.
+"""
+
+from __future__ import division, print_function
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+
+class gaussian_factorization(object):
+
+    """
+    Covariance and precision of a Gaussian together with
+    their Cholesky factors. Either matrix may be specified;
+    the other, and each factor, is computed the first
+    time it is needed and then cached.
+    """
+
+    def __init__(self, covariance=None, precision=None):
+        '''
+        Parameters
+        ----------
+
+        covariance : ndarray, optional
+            Covariance matrix.
+
+        precision : ndarray, optional
+            Precision matrix, inverse of `covariance`.
+
+        '''
+
+        if covariance is None and precision is None:
+            raise ValueError('one of covariance or precision must be specified')
+
+        self._covariance = covariance
+        self._precision = precision
+        self._cov_factor = None
+        self._prec_factor = None
+
+    @property
+    def covariance(self):
+        if self._covariance is None:
+            self._covariance = _factor_inverse(self.prec_factor)
+        return self._covariance
+
+    @property
+    def precision(self):
+        if self._precision is None:
+            self._precision = _factor_inverse(self.cov_factor)
+        return self._precision
+
+    @property
+    def cov_factor(self):
+        """
+        Cholesky factor of `covariance` as returned by `scipy.linalg.cho_factor`.
+        """
+        if self._cov_factor is None:
+            self._cov_factor = cho_factor(self.covariance)
+        return self._cov_factor
+
+    @property
+    def prec_factor(self):
+        """
+        Cholesky factor of `precision` as returned by `scipy.linalg.cho_factor`.
+        """
+        if self._prec_factor is None:
+            self._prec_factor = cho_factor(self.precision)
+        return self._prec_factor
+
+    def solve_cov(self, arg):
+        """
+        Compute `np.linalg.inv(covariance).dot(arg)`.
+        """
+        if self._precision is not None:
+            return self._precision.dot(arg)
+        return cho_solve(self.cov_factor, arg)
+
+    def solve_prec(self, arg):
+        """
+        Compute `np.linalg.inv(precision).dot(arg)`.
+        """
+        if self._covariance is not None:
+            return self._covariance.dot(arg)
+        return cho_solve(self.prec_factor, arg)
+
+    def matches(self, covariance):
+        """
+        Is this a factorization of `covariance`?
+        """
+        covariance = np.asarray(covariance)
+        return (covariance is self._covariance or
+                (self._covariance is not None and
+                 covariance.shape == self._covariance.shape and
+                 np.all(covariance == self._covariance)))
+
+def _factor_inverse(factor):
+    c, _ = factor
+    inverse = cho_solve(factor, np.identity(c.shape[0]))
+    return 0.5 * (inverse + inverse.T)
@@ -8,9 +8,10 @@ from scipy.stats import norm as ndist
 
 import regreg.api as rr
 
-from .query import query, affine_gaussian_sampler
+from .query import query, affine_gaussian_sampler, _modular_index
 
 from .randomization import randomization
+from .factorization import gaussian_factorization
 from ..base import restricted_estimator
 from ..algorithms.debiased_lasso import (debiasing_matrix,
                                          pseudoinverse_debiasing_matrix)
@@ -1026,11 +1027,13 @@ class polynomial_gaussian_sampler(affine_gaussian_sampler):
                  log_det,
                  logdens_transform, # describes how score enters log_density.
                  selection_info=None,
-                 useC=False):
+                 useC=False,
+                 cache_size=32):
 
         self.mean = implied_mean
         self.covariance = np.zeros((1, 1))
         self.covariance[0, 0] = implied_covariance
+        self.cond_factorization = gaussian_factorization(covariance=self.covariance)
 
         self._log_cond_density = log_cond_density
         self._log_det = log_det
@@ -1038,6 +1041,7 @@ class polynomial_gaussian_sampler(affine_gaussian_sampler):
         self.observed_score_state = observed_score_state
         self.selection_info = selection_info
         self.logdens_transform = logdens_transform
+        self._init_cache(cache_size)
 
     def sample(self, ndraw):
         '''
@@ -1053,6 +1057,8 @@ class polynomial_gaussian_sampler(affine_gaussian_sampler):
 
         '''
 
+        self.clear_cache()
+
         mean, variance = self.mean, self.covariance[0,0]
         sd = np.sqrt(variance)
         Zscore = mean / sd
@@ -1099,8 +1105,11 @@ class polynomial_gaussian_sampler(affine_gaussian_sampler):
                                                          nuisance,
                                                          gaussian_sample,
                                                          opt_sample)
-        value += self._log_det(opt_sample)
-        return value
+        log_det = np.asarray(self._log_det(opt_sample)).reshape(-1)
+        log_det = log_det[_modular_index(gaussian_sample.shape[0],
+                                         opt_sample.shape[0])]
+        shape = log_det.shape + (1,) * np.asarray(candidate).ndim
+        return value + log_det.reshape(shape)
 
 # functions to construct targets of inference
 # and covariance with score representation
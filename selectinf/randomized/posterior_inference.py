@@ -1,10 +1,15 @@
 from __future__ import division, print_function
+from collections import OrderedDict
 
 import numpy as np
 from scipy.stats import norm as ndist, invgamma
 from scipy.linalg import fractional_matrix_power
 
 from .selective_MLE_utils import solve_barrier_affine as solve_barrier_affine_C
+from .barrier import (solve_barrier_affine_newton,
+                      solve_barrier_affine_batch)
+from .factorization import gaussian_factorization
+from ..distributions.chain import split_rhat, effective_sample_size
 
 class posterior(object):
 
@@ -31,6 +36,11 @@ class posterior(object):
 
     solve_args : dict
         Arguments passed to solver of affine barrier problem.
+        The key `method`, one of ['descent', 'newton'], selects the solver.
+
+    cache_size : int, optional
+        Number of barrier solutions, keyed by target parameter,
+        kept by `log_posterior`.
     """
 
     def __init__(self,
@@ -40,9 +50,11 @@ class posterior(object):
                  cov_target_score,
                  prior,
                  dispersion=1,
-                 solve_args={'tol':1.e-12}):
+                 solve_args={'tol':1.e-12},
+                 cache_size=8):
 
         self.solve_args = solve_args
+        self.cache_size = cache_size
         
         linear_part = query.sampler.affine_con.linear_part
         offset = query.sampler.affine_con.offset
@@ -57,8 +69,8 @@ class posterior(object):
         self.ntarget = cov_target.shape[0]
         self.nopt = query.cond_cov.shape[0]
 
-        self.cond_precision = np.linalg.inv(query.cond_cov)
-        self.prec_target = np.linalg.inv(cov_target)
+        self.cond_precision = query.sampler.cond_factorization.precision
+        self.prec_target = query.sampler.target_factorization(cov_target).precision
 
         self.observed_target = observed_target
         self.cov_target_score = cov_target_score
@@ -77,6 +89,13 @@ class posterior(object):
 
         self.prior = prior
 
+        # successive calls to `log_posterior` are at nearby
+        # parameters, often the same one: warm start each
+        # barrier solve from the last solution and keep recent ones
+
+        self._warm_start = None
+        self._solutions = OrderedDict()
+
     def log_posterior(self,
                       target_parameter,
                       sigma=1):
@@ -100,18 +119,7 @@ class posterior(object):
         prec_marginal = self.prec_marginal
         conjugate_marginal = prec_marginal.dot(mean_marginal)
 
-        useC = True
-        if useC:
-            solver = solve_barrier_affine_C
-        else:
-            solver = _solve_barrier_affine_py
-
-        val, soln, hess = solver(conjugate_marginal,
-                                 prec_marginal,
-                                 self.feasible_point,
-                                 self.linear_part,
-                                 self.offset,
-                                 **self.solve_args)
+        val, soln = self._solve_barrier(target_parameter, conjugate_marginal)
 
         log_normalizer = -val - mean_marginal.T.dot(prec_marginal).dot(mean_marginal)/2.
 
@@ -127,7 +135,106 @@ class posterior(object):
         return (self.dispersion * (log_lik - self.log_ref) / sigmasq + log_prior,
                 self.dispersion * grad_lik/sigmasq + grad_prior)
 
-    ### Private method
+    def log_posterior_batch(self,
+                            target_parameters,
+                            sigma=1):
+
+        """
+
+        Parameters
+        ----------
+
+        target_parameters : ndarray
+            Values of parameter at which to evaluate
+            posterior and its gradient, one per row.
+
+        sigma : ndarray
+            Noise standard deviation.
+
+        Returns
+        -------
+
+        values : ndarray
+            Log posterior at each row of `target_parameters`.
+
+        grads : ndarray
+            Gradient of log posterior at each row of `target_parameters`.
+
+        Notes
+        -----
+
+        The barrier problems are solved together by
+        `solve_barrier_affine_batch` from `self.feasible_point`,
+        so no warm start or cache is used.
+
+        """
+
+        target_parameters = np.atleast_2d(target_parameters)
+        sigmasq = sigma**2
+        prec_marginal = self.prec_marginal
+        mean_marginal = target_parameters.dot(self.linear_coef.T) + self.offset_coef[None,:]
+        conjugate_marginal = mean_marginal.dot(prec_marginal)
+
+        solve_args = dict(self.solve_args)
+        method = solve_args.pop('method', 'descent')
+        val, soln, _ = solve_barrier_affine_batch(conjugate_marginal,
+                                                  prec_marginal,
+                                                  self.feasible_point,
+                                                  self.linear_part,
+                                                  self.offset,
+                                                  method=method,
+                                                  **solve_args)
+
+        log_normalizer = -val - np.sum(mean_marginal * conjugate_marginal, 1) / 2.
+
+        resid = self.observed_target[None,:] - target_parameters
+        log_lik = -(np.sum(resid.dot(self.prec_target) * resid, 1) / 2. - log_normalizer)
+
+        grad_lik = (resid.dot(self.prec_target) - 
+                    (soln.dot(prec_marginal) - conjugate_marginal).dot(self.linear_coef))
+
+        log_prior, grad_prior = zip(*[self.prior(t) for t in target_parameters])
+
+        return (self.dispersion * (log_lik - self.log_ref) / sigmasq + np.asarray(log_prior),
+                self.dispersion * grad_lik / sigmasq + np.asarray(grad_prior))
+
+    ### Private methods
+
+    def _solve_barrier(self, target_parameter, conjugate_marginal):
+        """
+        Solve the barrier problem for `log_posterior`,
+        returning value and solution.
+        """
+        key = np.asarray(target_parameter, float).tobytes()
+        if key in self._solutions:
+            self._solutions.move_to_end(key)
+            return self._solutions[key]
+
+        solve_args = dict(self.solve_args)
+        if solve_args.pop('method', 'descent') == 'newton':
+            solver = solve_barrier_affine_newton
+        else:
+            solver = solve_barrier_affine_C
+
+        if self._warm_start is not None:
+            feasible_point = self._warm_start
+        else:
+            feasible_point = self.feasible_point
+
+        # the C solver overwrites its starting point
+
+        val, soln, hess = solver(conjugate_marginal,
+                                 self.prec_marginal,
+                                 np.array(feasible_point, float),
+                                 self.linear_part,
+                                 self.offset,
+                                 **solve_args)
+
+        self._warm_start = soln
+        self._solutions[key] = (val, soln)
+        if len(self._solutions) > self.cache_size:
+            self._solutions.popitem(last=False)
+        return val, soln
 
     def _set_marginal_parameters(self):
         """
@@ -145,7 +252,7 @@ class posterior(object):
         implied_precision[self.ntarget:][:,:self.ntarget] = (-target_linear.T.dot(self.cond_precision)).T
         implied_precision[self.ntarget:][:,self.ntarget:] = self.cond_precision
 
-        implied_cov = np.linalg.inv(implied_precision)
+        implied_cov = gaussian_factorization(precision=implied_precision).covariance
         self.linear_coef = implied_cov[self.ntarget:][:,:self.ntarget].dot(self.prec_target)
 
         target_offset = self.cond_mean - target_linear.dot(self.observed_target)
@@ -154,7 +261,14 @@ class posterior(object):
         self.offset_coef = implied_cov[self.ntarget:][:,:self.ntarget].dot(N) + M
 
         self.cov_marginal = implied_cov[self.ntarget:][:,self.ntarget:]
-        self.prec_marginal = np.linalg.inv(self.cov_marginal)
+
+        # the marginal precision is a Schur complement of implied_precision,
+        # only an ntarget x ntarget system needs to be solved
+
+        cross_precision = implied_precision[:self.ntarget][:,self.ntarget:]
+        self.prec_marginal = (self.cond_precision - 
+                              cross_precision.T.dot(np.linalg.solve(implied_precision[:self.ntarget][:,:self.ntarget],
+                                                                    cross_precision)))
 
 ### sampling methods
 
@@ -221,6 +335,100 @@ def gibbs_sampler(selective_posterior,
 
     return samples[nburnin:, :], scale_samples[nburnin:]
 
+def multichain_langevin_sampler(selective_posterior,
+                                nchain=4,
+                                nsample=2000,
+                                nburnin=100,
+                                proposal_scale=None,
+                                step=1.):
+    """
+    Run `nchain` Langevin chains in lockstep, evaluating
+    the posterior for all chains at once with
+    `selective_posterior.log_posterior_batch`.
+
+    Chains start from `selective_posterior.initial_estimate`
+    perturbed by a draw with covariance `proposal_scale`.
+    A chain whose proposal has a non-finite gradient halves its
+    stepsize and redraws, as in `langevin`.
+
+    Parameters
+    ----------
+
+    selective_posterior : `posterior`
+        Posterior to sample from.
+
+    nchain : int, optional
+        Number of chains.
+
+    nsample : int, optional
+        Number of steps in each chain, including burnin.
+
+    nburnin : int, optional
+        Number of steps discarded from each chain.
+
+    proposal_scale : ndarray, optional
+        Preconditioner, defaults to the inverse
+        information of the selective MLE.
+
+    step : float, optional
+        Scales stepsize, which is `1 / (step * ntarget)`.
+
+    Returns
+    -------
+
+    samples : ndarray
+        Shape (nchain, nsample - nburnin, ntarget).
+
+    ess : ndarray
+        Effective sample size of each coordinate, see
+        `effective_sample_size`.
+
+    rhat : ndarray
+        Split R-hat of each coordinate, see `split_rhat`.
+
+    """
+
+    ntarget = selective_posterior.ntarget
+    stepsize = 1. / (step * ntarget) * np.ones(nchain)
+    scaling = np.sqrt(selective_posterior.dispersion)
+
+    if proposal_scale is None:
+        proposal_scale = selective_posterior.inverse_info
+    proposal_sqrt = fractional_matrix_power(proposal_scale, 0.5)
+
+    # draw all the noise up front, already
+    # multiplied by the square root of proposal_scale
+
+    noise = np.random.standard_normal((nsample + 1, nchain, ntarget)).dot(proposal_sqrt.T)
+
+    state = selective_posterior.initial_estimate[None,:] + noise[-1]
+    value, grad = selective_posterior.log_posterior_batch(state, scaling)
+
+    samples = np.zeros((nchain, nsample, ntarget))
+    for i in range(nsample):
+
+        cur_noise = noise[i]
+        todo = np.arange(nchain)
+        while todo.shape[0] > 0:
+            candidate = (state[todo] + stepsize[todo,None] * grad[todo].dot(proposal_scale.T) + 
+                         np.sqrt(2. * stepsize[todo])[:,None] * cur_noise[todo])
+            cand_value, cand_grad = selective_posterior.log_posterior_batch(candidate, scaling)
+
+            finite = np.all(np.isfinite(cand_grad), 1)
+            state[todo[finite]] = candidate[finite]
+            value[todo[finite]] = cand_value[finite]
+            grad[todo[finite]] = cand_grad[finite]
+
+            todo = todo[~finite]
+            stepsize[todo] *= 0.5
+            cur_noise = np.zeros((nchain, ntarget))
+            cur_noise[todo] = np.random.standard_normal((todo.shape[0], ntarget)).dot(proposal_sqrt.T)
+
+        samples[:,i] = state
+
+    samples = samples[:,nburnin:]
+    return samples, effective_sample_size(samples), split_rhat(samples)
+
 class langevin(object):
 
     def __init__(self,
@@ -1,5 +1,6 @@
 import functools
 from itertools import product
+from collections import OrderedDict
 
 import numpy as np
 import pandas as pd
@@ -11,10 +12,21 @@ import regreg.api as rr
 
 from ..distributions.api import discrete_family
 from ..constraints.affine import (sample_from_constraints,
+                                  chain_sizes,
                                   constraints)
 from .posterior_inference import posterior
 from .selective_MLE_utils import solve_barrier_affine as solve_barrier_affine_C
 from .approx_reference import approximate_grid_inference
+from .selective_MLE_utils import solve_barrier_nonneg as solve_barrier_nonneg_C
+from .barrier import (solve_barrier_affine_newton,
+                      hessian_solve,
+                      barrier_scaling,
+                      barrier_hessian,
+                      structured_constraint,
+                      structured_linear,
+                      solve_barrier_affine_stacked,
+                      solve_barrier_affine_batch)
+from .factorization import gaussian_factorization
 
 class query(object):
 
@@ -153,6 +165,12 @@ class gaussian_query(query):
 
         self.cond_mean, self.cond_cov = cond_mean, cond_cov
 
+        # Cholesky factors shared by selective_MLE, posterior,
+        # approximate_grid_inference, etc.
+
+        self.cond_factorization = gaussian_factorization(covariance=cond_cov,
+                                                         precision=cond_precision)
+
         affine_con = constraints(A,
                                  b,
                                  mean=cond_mean,
@@ -164,7 +182,8 @@ class gaussian_query(query):
                                                log_density,
                                                (logdens_linear, opt_offset),
                                                selection_info=self.selection_variable,
-                                               useC=self.useC)
+                                               useC=self.useC,
+                                               cond_factorization=self.cond_factorization)
 
     def _setup_implied_gaussian(self, 
                                 opt_linear, 
@@ -200,7 +219,9 @@ class gaussian_query(query):
                 level=0.9,
                 ndraw=10000,
                 burnin=2000,
-                compute_intervals=False):
+                compute_intervals=False,
+                nchains=1,
+                n_jobs=1):
         """
         Produce p-values and confidence intervals for targets
         of model including selected features
@@ -238,13 +259,25 @@ class gaussian_query(query):
 
         dispersion : float (optional)
             Use a known value for dispersion, or Pearson's X^2?
+
+        nchains : int (optional)
+            Number of hit-and-run chains used to sample.
+
+        n_jobs : int (optional)
+            Number of worker processes running the chains.
         """
 
         if parameter is None:
             parameter = np.zeros_like(observed_target)
 
+        if alternatives is None:
+            alternatives = ['twosided'] * observed_target.shape[0]
+
         if opt_sample is None:
-            opt_sample, logW = self.sampler.sample(ndraw, burnin)
+            opt_sample, logW = self.sampler.sample(ndraw, 
+                                                   burnin,
+                                                   nchains=nchains,
+                                                   n_jobs=n_jobs)
         else:
             if len(opt_sample) == 1: # only a sample, so weights are 1s
                 opt_sample = opt_sample[0]
@@ -253,24 +286,33 @@ class gaussian_query(query):
                 opt_sample, logW = opt_sample
             ndraw = opt_sample.shape[0]
 
-        pivots = self.sampler.coefficient_pvalues(observed_target,
-                                                  target_cov,
-                                                  target_score_cov,
-                                                  parameter=parameter,
-                                                  sample=(opt_sample, logW),
-                                                  normal_sample=target_sample,
-                                                  alternatives=alternatives)
+        # one normal sample and one set of weights are shared
+        # by the pivots, p-values and intervals below, so
+        # the sampler's terms along each target's ray are reused
 
-        if not np.all(parameter == 0):
-            pvalues = self.sampler.coefficient_pvalues(observed_target,
-                                                       target_cov,
-                                                       target_score_cov,
-                                                       parameter=np.zeros_like(parameter),
-                                                       sample=(opt_sample, logW),
-                                                       normal_sample=target_sample,
-                                                       alternatives=alternatives)
+        _intervals = optimization_intervals([(self.sampler, 
+                                              opt_sample, 
+                                              logW,
+                                              target_cov, 
+                                              target_score_cov)],
+                                            observed_target, 
+                                            ndraw, 
+                                            normal_sample=target_sample)
+
+        if np.all(parameter == 0):
+            candidates = parameter[:,None]
         else:
-            pvalues = pivots
+            candidates = np.array([parameter, np.zeros_like(parameter)]).T
+
+        values = []
+        for i in range(observed_target.shape[0]):
+            keep = np.zeros_like(observed_target)
+            keep[i] = 1.
+            values.append(_intervals.pivot_grid(keep, 
+                                                candidates[i],
+                                                alternative=alternatives[i]))
+        values = np.array(values)
+        pivots, pvalues = values[:,0], values[:,-1]
 
         result = pd.DataFrame({'target':observed_target,
                                'pvalue':pvalues})
@@ -282,21 +324,25 @@ class gaussian_query(query):
                                      target_score_cov)[0]
             MLE_intervals = np.asarray(MLE[['lower_confidence', 'upper_confidence']])
 
-            intervals = self.sampler.confidence_intervals(  
-                observed_target,
-                target_cov,
-                target_score_cov,
-                sample=(opt_sample, logW),
-                normal_sample=target_sample,
-                initial_guess=MLE_intervals,
-                level=level)
+            # confidence_interval takes its guess as offsets
+            # from the observed target
+
+            intervals = []
+            for i in range(observed_target.shape[0]):
+                keep = np.zeros_like(observed_target)
+                keep[i] = 1.
+                guess = MLE_intervals[i] - observed_target[i]
+                intervals.append(_intervals.confidence_interval(keep, 
+                                                                level=level,
+                                                                guess=guess))
+            intervals = np.array(intervals)
 
             result.insert(2, 'lower_confidence', intervals[:,0])
             result.insert(3, 'upper_confidence', intervals[:,1])
 
         if not np.all(parameter == 0):
-            result.insert(4, 'pivot', pivots)
-            result.insert(5, 'parameter', parameter)
+            result['pivot'] = pivots
+            result['parameter'] = parameter
 
         return result
 
@@ -324,7 +370,8 @@ class gaussian_query(query):
             Confidence level.
 
         solve_args : dict, optional
-            Arguments passed to solver.
+            Arguments passed to solver. The key `method`,
+            one of ['descent', 'newton'], selects the solver.
 
         """
         
@@ -393,7 +440,12 @@ class gaussian_query(query):
                                    target_cov,
                                    target_score_cov,
                                    alternatives=None,
-                                   solve_args={'tol': 1.e-12}):
+                                   solve_args={'tol': 1.e-12},
+                                   continuation=False,
+                                   n_jobs=1,
+                                   executor='thread',
+                                   grid_tol=None,
+                                   level=0.9):
 
         """
 
@@ -416,14 +468,37 @@ class gaussian_query(query):
         solve_args : dict, optional
             Arguments passed to solver.
 
+        continuation : bool, optional
+            Warm-start barrier solves along each grid?
+
+        n_jobs : int, optional
+            Number of workers constructing the per-target
+            families. If -1, use all CPUs.
+
+        executor : str, optional
+            One of ['thread', 'process'].
+
+        grid_tol : float, optional
+            If not None, use adaptive grids with this
+            error tolerance for the reference densities.
+
+        level : float, optional
+            Confidence level of the intervals.
+
         """
 
         G = approximate_grid_inference(self,
                                        observed_target,
                                        target_cov,
                                        target_score_cov,
-                                       solve_args=solve_args)
-        return G.summary(alternatives=alternatives)
+                                       solve_args=solve_args,
+                                       continuation=continuation,
+                                       n_jobs=n_jobs,
+                                       executor=executor,
+                                       grid_tol=grid_tol,
+                                       level=level)
+        return G.summary(alternatives=alternatives,
+                         level=level)
 
 class multiple_queries(object):
 
@@ -674,6 +749,17 @@ class optimization_sampler(object):
     def sample(self):
         raise NotImplementedError("abstract method")
 
+    def sample_chunks(self, *sample_args, chunk_size=10000):
+        """
+        Generator yielding `(sample, logW)` in chunks
+        of at most `chunk_size` draws. This default
+        draws the full sample with `self.sample(*sample_args)`;
+        subclasses override it to keep memory constant.
+        """
+        sample, logW = self.sample(*sample_args)
+        for chunk in _chunks(sample, logW, chunk_size):
+            yield chunk
+
     def log_cond_density(self,
                          opt_sample,
                          target_sample,
@@ -683,6 +769,50 @@ class optimization_sampler(object):
         """
         raise NotImplementedError("abstract method")
 
+    def log_cond_density_grid(self,
+                              opt_sample,
+                              target_sample,
+                              candidates,
+                              transform):
+        """
+        Density of opt_sample | target_sample + candidate
+        along the ray `transform` for each of `candidates`,
+        of shape `target_sample.shape + candidates.shape`.
+        Draw `i` of `target_sample` is paired with draw
+        `i % opt_sample.shape[0]` of `opt_sample`.
+        This default calls `self.log_cond_density` once per candidate.
+        """
+        candidates = np.asarray(candidates)
+        opt_sample = opt_sample[_modular_index(target_sample.shape[0], 
+                                               opt_sample.shape[0])]
+        logdens = [self.log_cond_density(opt_sample,
+                                         target_sample + candidate,
+                                         transform=transform)
+                   for candidate in candidates.reshape(-1)]
+        return np.stack(logdens, -1).reshape(target_sample.shape + candidates.shape)
+
+    def target_factorization(self, target_cov):
+        """
+        Factorization of `target_cov`, cached
+        while the same target covariance is used.
+
+        Parameters
+        ----------
+
+        target_cov : ndarray
+            Estimated covariance of target.
+
+        Returns
+        -------
+
+        factorization : `gaussian_factorization`
+        """
+        cached = getattr(self, '_target_factorization', None)
+        if cached is None or not cached.matches(target_cov):
+            cached = gaussian_factorization(covariance=np.array(target_cov))
+            self._target_factorization = cached
+        return cached
+
     def hypothesis_test(self,
                         test_stat,
                         observed_value,
@@ -691,7 +821,8 @@ class optimization_sampler(object):
                         sample_args=(),
                         sample=None,
                         parameter=0,
-                        alternative='twosided'):
+                        alternative='twosided',
+                        chunk_size=None):
 
         '''
         Sample `target` from selective density
@@ -725,6 +856,12 @@ class optimization_sampler(object):
         alternative : ['greater', 'less', 'twosided']
             What alternative to use.
 
+        chunk_size : int (optional)
+            If not None, draws are processed in chunks of this
+            size (see `self.sample_chunks`) and the p-value is
+            accumulated online, so memory does not grow with
+            the number of draws.
+
         Returns
         -------
 
@@ -734,28 +871,43 @@ class optimization_sampler(object):
         if alternative not in ['greater', 'less', 'twosided']:
             raise ValueError("alternative should be one of ['greater', 'less', 'twosided']")
 
+        if parameter is None:
+            parameter = self.reference
+
+        delta = self.target_factorization(target_cov).solve_cov(parameter - self.reference)
+
+        if chunk_size is not None:
+            if sample is None:
+                chunks = self.sample_chunks(*sample_args, chunk_size=chunk_size)
+            else:
+                sample = np.atleast_2d(sample)
+                chunks = _chunks(sample, np.zeros(sample.shape[0]), chunk_size)
+
+            # P(T <= observed_value), as `discrete_family.cdf` below
+
+            accumulator = pivot_accumulator()
+            for chunk, logW in chunks:
+                chunk = np.atleast_2d(chunk)
+                chunk_test_stat = np.squeeze(np.array([test_stat(x) for x in chunk]))
+                accumulator.update(chunk.dot(delta) + logW,
+                                   chunk_test_stat <= observed_value)
+            return _pvalue_from_pivot(accumulator.pivot, alternative)
+
         if sample is None:
             sample, logW = self.sample(*sample_args)
             sample = np.atleast_2d(sample)
-
-        if parameter is None:
-            parameter = self.reference
+        else:
+            sample = np.atleast_2d(sample)
+            logW = np.zeros(sample.shape[0])
 
         sample_test_stat = np.squeeze(np.array([test_stat(x) for x in sample]))
 
-        target_inv_cov = np.linalg.inv(target_cov)
-        delta = target_inv_cov.dot(parameter - self.reference)
         W = np.exp(sample.dot(delta) + logW)
 
         family = discrete_family(sample_test_stat, W)
         pval = family.cdf(0, observed_value)
 
-        if alternative == 'greater':
-            return 1 - pval
-        elif alternative == 'less':
-            return pval
-        else:
-            return 2 * min(pval, 1 - pval)
+        return _pvalue_from_pivot(pval, alternative)
 
     def confidence_intervals(self,
                              observed_target,
@@ -806,12 +958,13 @@ class optimization_sampler(object):
 
         if sample is None:
             sample, logW = self.sample(*sample_args)
-            sample = np.vstack([sample]*5) # why times 5?
-            logW = np.hstack([logW]*5) 
+
+            # each draw is paired with 5 normal draws
+
+            ndraw = 5 * sample.shape[0]
         else:
             sample, logW = sample
-
-        ndraw = sample.shape[0]
+            ndraw = sample.shape[0]
 
         _intervals = optimization_intervals([(self, 
                                               sample, 
@@ -844,7 +997,8 @@ class optimization_sampler(object):
                             sample_args=(),
                             sample=None,
                             normal_sample=None,
-                            alternatives=None):
+                            alternatives=None,
+                            chunk_size=None):
         '''
         Construct selective p-values
         for each parameter of the target.
@@ -873,6 +1027,13 @@ class optimization_sampler(object):
         alternatives : list of ['greater', 'less', 'twosided']
             What alternative to use.
 
+        chunk_size : int (optional)
+            If not None, draws are processed in chunks of this
+            size (see `self.sample_chunks`) and the pivots are
+            accumulated online, so memory does not grow with
+            the number of draws. A `normal_sample` must then
+            have as many rows as draws.
+
         Returns
         -------
         pvalues : np.float
@@ -882,14 +1043,50 @@ class optimization_sampler(object):
         if alternatives is None:
             alternatives = ['twosided'] * observed_target.shape[0]
 
+        if parameter is None:
+            parameter = np.zeros(observed_target.shape[0])
+
+        if chunk_size is not None:
+            if sample is None:
+                chunks = self.sample_chunks(*sample_args, chunk_size=chunk_size)
+            else:
+                chunks = _chunks(sample[0], sample[1], chunk_size)
+
+            accumulator = pivot_accumulator((observed_target.shape[0],))
+            start = 0
+            for opt_sample, opt_logW in chunks:
+                nchunk = opt_sample.shape[0]
+                if normal_sample is not None:
+                    normal_chunk = normal_sample[start:start + nchunk]
+                else:
+                    normal_chunk = None
+                start += nchunk
+
+                _intervals = optimization_intervals([(self,
+                                                      opt_sample,
+                                                      opt_logW,
+                                                      target_cov,
+                                                      score_cov)],
+                                                    observed_target,
+                                                    nchunk,
+                                                    normal_sample=normal_chunk)
+                logW, indicator = [], []
+                for i in range(observed_target.shape[0]):
+                    keep = np.zeros_like(observed_target)
+                    keep[i] = 1.
+                    _logW, _indicator = _intervals._pivot_terms(keep, parameter[i])
+                    logW.append(_logW)
+                    indicator.append(_indicator)
+                accumulator.update(np.array(logW).T, np.array(indicator).T)
+
+            return np.array([_pvalue_from_pivot(pivot, alternative) for
+                             pivot, alternative in zip(accumulator.pivot, alternatives)])
+
         if sample is None:
             sample, logW = self.sample(*sample_args)
         else:
             sample, logW = sample
-            ndraw = sample.shape[0]
-
-        if parameter is None:
-            parameter = np.zeros(observed_target.shape[0])
+        ndraw = sample.shape[0]
 
         _intervals = optimization_intervals([(self, 
                                               sample, 
@@ -935,7 +1132,9 @@ class affine_gaussian_sampler(optimization_sampler):
                  log_cond_density,
                  logdens_transform, # described how score enters log_density.
                  selection_info=None,
-                 useC=False):
+                 useC=False,
+                 cond_factorization=None,
+                 cache_size=32):
 
         '''
         Parameters
@@ -968,6 +1167,14 @@ class affine_gaussian_sampler(optimization_sampler):
 
         useC : bool, optional
             Use python or C solver.
+
+        cond_factorization : `gaussian_factorization`, optional
+            Factorization of the covariance of `affine_con`,
+            formed from it if not supplied.
+
+        cache_size : int, optional
+            Number of rays, keyed by direction, nuisance
+            and samples, whose terms are kept by `log_cond_density`.
         
         '''
 
@@ -983,6 +1190,33 @@ class affine_gaussian_sampler(optimization_sampler):
         self.logdens_transform = logdens_transform
         self.useC = useC
 
+        # rows of (signed) identities or bidiagonals
+        # are handled by O(d) kernels in the barrier solvers
+
+        self.barrier_linear_part = structured_constraint(self.affine_con.linear_part)
+
+        if cond_factorization is None:
+            cond_factorization = gaussian_factorization(covariance=self.covariance)
+        self.cond_factorization = cond_factorization
+
+        self._init_cache(cache_size)
+
+    def _init_cache(self, cache_size):
+        """
+        Set up the cache of ray terms used by `log_cond_density`,
+        shared with subclasses that do not call `__init__`.
+        """
+        self.cache_size = cache_size
+        self.cache_hits = self.cache_misses = 0
+        self._rays = OrderedDict()
+
+    def clear_cache(self):
+        """
+        Drop the terms cached by `log_cond_density`,
+        called whenever a new sample is drawn.
+        """
+        self._rays.clear()
+
     def log_cond_density(self,
                          opt_sample,
                          target_sample,
@@ -1006,12 +1240,26 @@ class affine_gaussian_sampler(optimization_sampler):
             return self._log_cond_density(opt_sample,
                                           score_sample)
 
-    def sample(self, ndraw, burnin):
+    def log_cond_density_grid(self,
+                              opt_sample,
+                              target_sample,
+                              candidates,
+                              transform):
+
+        # the log-density is quadratic in the candidate
+        # so all candidates share the cached terms
+
+        direction, nuisance = transform
+        return self._log_density_ray(np.asarray(candidates),
+                                     direction,
+                                     nuisance,
+                                     target_sample,
+                                     opt_sample)
+
+    def sample(self, ndraw, burnin, nchains=1, n_jobs=1, method='hit_and_run'):
         '''
-        Sample `target` from selective density
-        using projected Langevin sampler with
-        gradient map `self.gradient` and
-        projection map `self.projection`.
+        Sample optimization variables from their
+        conditional density, restricted to `self.affine_con`.
 
         Parameters
         ----------
@@ -1022,14 +1270,86 @@ class affine_gaussian_sampler(optimization_sampler):
         burnin : int
            How many samples to discard?
 
+        nchains : int
+           Number of independent chains sharing the `ndraw` draws.
+
+        n_jobs : int
+           Number of workers running the chains.
+
+        method : str
+           One of ['hit_and_run', 'hmc'], see `sample_from_constraints`.
+
         '''
 
+        self.clear_cache()
         _sample = sample_from_constraints(self.affine_con,
                                           self.initial_point,
                                           ndraw=ndraw,
-                                          burnin=burnin)
+                                          burnin=burnin,
+                                          nchains=nchains,
+                                          n_jobs=n_jobs,
+                                          method=method)
         return _sample, np.zeros(_sample.shape[0])
 
+    def sample_chunks(self,
+                      ndraw,
+                      burnin,
+                      nchains=1,
+                      n_jobs=1,
+                      method='hit_and_run',
+                      chunk_size=10000):
+        '''
+        Generator version of `self.sample` yielding `(sample, logW)`
+        in chunks of at most `chunk_size` draws. Each chunk continues
+        every chain from its last draw in the previous one, so only
+        the first chunk is burned in.
+
+        Parameters
+        ----------
+
+        ndraw : int
+           How many draws in total?
+
+        burnin : int
+           How many samples to discard before the first chunk?
+
+        nchains : int
+           Number of independent chains sharing each chunk.
+
+        n_jobs : int
+           Number of workers running the chains.
+
+        method : str
+           One of ['hit_and_run', 'hmc'], see `sample_from_constraints`.
+
+        chunk_size : int
+           Largest number of draws held in memory.
+
+        '''
+
+        if chunk_size < nchains:
+            raise ValueError('chunk_size should be at least nchains')
+
+        # one state per chain, carried from chunk to chunk
+
+        state = np.array([self.initial_point] * nchains)
+        remaining = ndraw
+        while remaining > 0:
+            self.clear_cache()
+            nchunk = min(chunk_size, remaining)
+            _sample = sample_from_constraints(self.affine_con,
+                                              state,
+                                              ndraw=nchunk,
+                                              burnin=burnin,
+                                              nchains=nchains,
+                                              n_jobs=n_jobs,
+                                              method=method)
+            yield _sample, np.zeros(_sample.shape[0])
+            last = np.cumsum(chain_sizes(nchunk, nchains)) - 1
+            state = _sample[last]
+            remaining -= _sample.shape[0]
+            burnin = 0
+
     def selective_MLE(self, 
                       observed_target, 
                       target_cov, 
@@ -1074,11 +1394,13 @@ class affine_gaussian_sampler(optimization_sampler):
                              self.mean,
                              self.covariance,
                              self.logdens_transform[0],
-                             self.affine_con.linear_part,
+                             self.barrier_linear_part,
                              self.affine_con.offset,
                              solve_args=solve_args,
                              level=level,
-                             useC=self.useC)
+                             useC=self.useC,
+                             prec_target=self.target_factorization(target_cov).precision,
+                             prec_opt=self.cond_factorization.precision)
 
     def reparam_map(self, 
                     parameter_target, 
@@ -1089,27 +1411,26 @@ class affine_gaussian_sampler(optimization_sampler):
                     solve_args={'tol':1.e-12},
                     useC=True):
 
-        prec_target = np.linalg.inv(target_cov)
+        prec_target = self.target_factorization(target_cov).precision
         ndim = prec_target.shape[0]
         logdens_lin, _ = self.logdens_transform
         target_lin = - logdens_lin.dot(target_score_cov.T.dot(prec_target))
         target_offset = self.mean - target_lin.dot(observed_target)
 
-        cov_opt = self.covariance
-        prec_opt = np.linalg.inv(cov_opt)
+        prec_opt = self.cond_factorization.precision
 
         mean_param = target_lin.dot(parameter_target) + target_offset
         conjugate_arg = prec_opt.dot(mean_param)
 
-        if useC:
-            solver = solve_barrier_affine_C
-        else:
-            solver = _solve_barrier_affine_py
+        solver, solve_args, linear_part = _barrier_solver(solve_args,
+                                                          self.barrier_linear_part,
+                                                          self.affine_con.offset,
+                                                          useC=useC)
 
         val, soln, hess = solver(conjugate_arg,
                                  prec_opt, # JT: I think this quadratic is wrong should involve target_cov and target_lin too?
                                  init_soln,
-                                 self.affine_con.linear_part,
+                                 linear_part,
                                  self.affine_con.offset,
                                  **solve_args)
             
@@ -1119,7 +1440,8 @@ class affine_gaussian_sampler(optimization_sampler):
                               - parameter_target.T.dot(target_lin.T).dot(prec_opt.dot(soln)) - target_offset.T.dot(prec_opt).dot(target_offset)/2. 
                               + val - (param_map.T.dot(prec_target).dot(param_map))/2.)
 
-        jacobian_map = (np.identity(ndim) + inter_map.dot(target_lin)) - inter_map.dot(hess).dot(prec_opt.dot(target_lin))
+        jacobian_map = ((np.identity(ndim) + inter_map.dot(target_lin)) -
+                        inter_map.dot(hessian_solve(hess, prec_opt.dot(target_lin))))
 
         return param_map, log_normalizer_map, jacobian_map
 
@@ -1130,28 +1452,41 @@ class affine_gaussian_sampler(optimization_sampler):
                          gaussian_sample,
                          opt_sample):
 
-        # implicitly caching (opt_sample, gaussian_sample) ?
+        # the cached terms depend on (direction, nuisance)
+        # and on the samples themselves, which are kept
+        # with the terms so their ids are not reused
 
-        if (not hasattr(self, "_direction") or not 
-            np.all(self._direction == direction)):
+        key = (np.asarray(direction, float).tobytes(),
+               np.asarray(nuisance, float).tobytes(),
+               id(gaussian_sample),
+               id(opt_sample))
+
+        if key in self._rays:
+            self._rays.move_to_end(key)
+            self.cache_hits += 1
+            _, _, terms = self._rays[key]
+        else:
+            self.cache_misses += 1
 
             logdens_lin, logdens_offset = self.logdens_transform
 
+            # gaussian_sample[i] is paired with
+            # opt_sample[i % opt_sample.shape[0]]
+
+            index = _modular_index(gaussian_sample.shape[0], opt_sample.shape[0])
+
             if opt_sample.shape[1] == 1:
 
                 prec = 1. / self.covariance[0, 0]
                 quadratic_term = logdens_lin.dot(direction)**2 * prec
                 arg = (logdens_lin.dot(nuisance + logdens_offset) + 
                        logdens_lin.dot(direction) * gaussian_sample +
-                       opt_sample[:,0])
+                       opt_sample[index,0])
                 linear_term = logdens_lin.dot(direction) * prec * arg
                 constant_term = arg**2 * prec
 
-                self._cache = {'linear_term':linear_term,
-                               'quadratic_term':quadratic_term,
-                               'constant_term':constant_term}
+                terms = (linear_term, quadratic_term, constant_term)
             else:
-                self._direction = direction.copy()
 
                 # density is a Gaussian evaluated at
                 # O_i + A(N + (Z_i + theta) * gamma + b)
@@ -1162,38 +1497,40 @@ class affine_gaussian_sampler(optimization_sampler):
                 # gamma is direction
                 # O_i is opt_sample[i]
 
-                # let arg1 = O_i
-                # let arg2 = A(N+b + Z_i \cdot gamma)
-                # then it is of the form (arg1 + arg2 + theta * A gamma)
+                # let arg1 = O_i + A(N+b)
+                # then it is of the form (arg1 + (Z_i + theta) * A gamma)
+                # and the terms below only need products of
+                # arg1 for the draws of opt_sample
 
-                logdens_lin, logdens_offset = self.logdens_transform
-                cov = self.covariance
-                prec = np.linalg.inv(cov)
+                prec = self.cond_factorization.precision
                 linear_part = logdens_lin.dot(direction) # A gamma
 
-                if 1 in opt_sample.shape:
-                    pass # stop3 what's this for?
-                cov = self.covariance
-
                 quadratic_term = linear_part.T.dot(prec).dot(linear_part)
 
-                arg1 = opt_sample.T
-                arg2 = logdens_lin.dot(np.multiply.outer(direction, gaussian_sample) + 
-                                       (nuisance + logdens_offset)[:,None])
-                arg = arg1 + arg2
-                linear_term = linear_part.T.dot(prec).dot(arg)
-                constant_term = np.sum(prec.dot(arg) * arg, 0)
-
-                self._cache = {'linear_term':linear_term,
-                               'quadratic_term':quadratic_term,
-                               'constant_term':constant_term}
-        (linear_term, 
-         quadratic_term,
-         constant_term) = (self._cache['linear_term'], 
-                           self._cache['quadratic_term'],
-                           self._cache['constant_term'])
+                arg1 = opt_sample.T + logdens_lin.dot(nuisance + logdens_offset)[:,None]
+                linear_opt = linear_part.T.dot(prec).dot(arg1)[index]
+                constant_opt = np.sum(prec.dot(arg1) * arg1, 0)[index]
+
+                linear_term = linear_opt + gaussian_sample * quadratic_term
+                constant_term = (constant_opt + 
+                                 2 * gaussian_sample * linear_opt + 
+                                 gaussian_sample**2 * quadratic_term)
+
+                terms = (linear_term, quadratic_term, constant_term)
+
+            self._rays[key] = (gaussian_sample, opt_sample, terms)
+            while len(self._rays) > self.cache_size:
+                self._rays.popitem(last=False)
+
+        linear_term, quadratic_term, constant_term = terms
+
+        # an array of candidates gives one column per candidate
+
+        candidate = np.asarray(candidate)
+        shape = linear_term.shape + (1,) * candidate.ndim
         return (-0.5 * candidate**2 * quadratic_term - 
-                 candidate * linear_term - 0.5 * constant_term)
+                 candidate * linear_term.reshape(shape) - 
+                 0.5 * constant_term.reshape(shape))
 
 class optimization_intervals(object):
 
@@ -1211,55 +1548,20 @@ class optimization_intervals(object):
                  target_cov=None,
                  normal_sample=None):
 
-        # not all opt_samples will be of the same size as nsample 
-        # let's repeat them as necessary
-        
-        tiled_sampling_info = []
-        for (opt_sampler, 
-             opt_sample, 
-             opt_logW,
-             t_cov, 
-             t_score_cov) in opt_sampling_info: 
-            if opt_sample is not None:
-                if opt_sample.shape[0] < nsample:
-                    if opt_sample.ndim == 1:
-                        tiled_opt_sample = np.tile(opt_sample, 
-                                              int(np.ceil(nsample / 
-                                              opt_sample.shape[0])))[:nsample]
-                        tiled_opt_logW = np.tile(opt_logW,
-                                                 int(np.ceil(nsample / 
-                                                             opt_logW.shape[0])))[:nsample]
-                    else:
-                        tiled_opt_sample = np.tile(opt_sample, 
-                                              (int(np.ceil(nsample / 
-                                              opt_sample.shape[0])), 1))[:nsample]
-                        tiled_opt_logW = np.tile(opt_logW,
-                                                 (int(np.ceil(nsample / 
-                                                              opt_logW.shape[0])), 1))[:nsample]
-                else:
-                    tiled_opt_sample = opt_sample[:nsample]
-                    tiled_opt_logW = opt_logW[:nsample]
-            else:
-                tiled_sample = None
-            tiled_sampling_info.append((opt_sampler, 
-                                        tiled_opt_sample, 
-                                        tiled_opt_logW,
-                                        t_cov, 
-                                        t_score_cov))
-
-        self.opt_sampling_info = tiled_sampling_info
+        # not all opt_samples will be of the same size as nsample,
+        # the i-th normal draw is paired with draw i % opt_sample.shape[0]
+        # of each view so the samples are never copied
+
+        self.opt_sampling_info = list(opt_sampling_info)
         self._logden = 0
         for opt_sampler, opt_sample, opt_logW, _, _ in opt_sampling_info:
 
-            self._logden += opt_sampler.log_cond_density(
-                                opt_sample,
-                                opt_sampler.observed_score_state,
-                                transform=None) 
-            self._logden -= opt_logW
-            if opt_sample.shape[0] < nsample:
-                self._logden = np.tile(self._logden, 
-                                       int(np.ceil(nsample / 
-                                       opt_sample.shape[0])))[:nsample]
+            logden = opt_sampler.log_cond_density(
+                         opt_sample,
+                         opt_sampler.observed_score_state,
+                         transform=None) 
+            logden -= opt_logW
+            self._logden += logden[_modular_index(nsample, opt_sample.shape[0])]
 
         # this is our observed unpenalized estimator
         self.observed = observed.copy()
@@ -1280,6 +1582,11 @@ class optimization_intervals(object):
         else:
             self._normal_sample = normal_sample
 
+        # projections of the normal sample by linear functional,
+        # reused so samplers can cache terms by sample identity
+
+        self._sample_stats = {}
+
     def pivot(self,
               linear_func,
               candidate,
@@ -1295,99 +1602,197 @@ class optimization_intervals(object):
         if alternative not in ['greater', 'less', 'twosided']:
             raise ValueError("alternative should be one of ['greater', 'less', 'twosided']")
 
-        observed_stat = self.observed.dot(linear_func)
-        sample_stat = self._normal_sample.dot(linear_func)
+        accumulator = pivot_accumulator()
+        accumulator.update(*self._pivot_terms(linear_func, candidate))
+        return _pvalue_from_pivot(accumulator.pivot, alternative)
 
-        target_cov = linear_func.dot(self.target_cov.dot(linear_func))
+    def pivot_grid(self,
+                   linear_func,
+                   candidates,
+                   alternative='twosided'):
+        '''
+        Pivots at each of several candidate values,
+        computed in one pass over the sample.
 
-        nuisance = []
-        translate_dirs = []
+        Parameters
+        ----------
 
-        for (opt_sampler, 
-             opt_sample, 
-             _, 
-             _, 
-             target_score_cov) in self.opt_sampling_info:
+        linear_func : np.float
+            Linear functional of the target.
 
-            cur_score_cov = linear_func.dot(target_score_cov)
+        candidates : np.float(ncand)
+            Candidate values of `linear_func` applied to the parameter.
 
-            # cur_nuisance is in the view's score coordinates
-            cur_nuisance = opt_sampler.observed_score_state - cur_score_cov * observed_stat / target_cov
-            nuisance.append(cur_nuisance)
-            translate_dirs.append(cur_score_cov / target_cov)
+        alternative : ['greater', 'less', 'twosided']
+            What alternative to use.
 
-        weights = self._weights(sample_stat,  # normal sample 
-                                candidate,    # candidate value
-                                nuisance,       # nuisance sufficient stats for each view
-                                translate_dirs) # points will be moved like sample * target_score_cov
+        Returns
+        -------
 
-        pivot = np.mean((sample_stat + candidate <= observed_stat) * weights) / np.mean(weights)
+        pvalues : np.float(ncand)
+        '''
 
-        if alternative == 'twosided':
-            return 2 * min(pivot, 1 - pivot)
-        elif alternative == 'less':
-            return pivot
-        else:
-            return 1 - pivot
+        if alternative not in ['greater', 'less', 'twosided']:
+            raise ValueError("alternative should be one of ['greater', 'less', 'twosided']")
+
+        candidates = np.asarray(candidates, float)
+        accumulator = pivot_accumulator(candidates.shape)
+        accumulator.update(*self._pivot_terms(linear_func, candidates))
+        return _pvalue_from_pivot(accumulator.pivot, alternative)
 
     def confidence_interval(self, 
                             linear_func, 
                             level=0.90, 
                             how_many_sd=20,
-                            guess=None):
+                            guess=None,
+                            ngrid=100,
+                            nrefine=10,
+                            tol=1.e-6):
+        '''
+        Invert the pivot to find a confidence interval.
+
+        The pivot is evaluated on a grid of `ngrid` candidates
+        bracketing both endpoints, after which each bracket
+        is subdivided into `nrefine` pieces until its width
+        is below `tol` times the standard deviation of the
+        statistic. Each round is one call to `pivot_grid`.
+
+        Parameters
+        ----------
+
+        linear_func : np.float
+            Linear functional of the target.
+
+        level : float
+            Confidence level.
+
+        how_many_sd : float
+            Half-width of the initial grid, in standard
+            deviations of the statistic.
 
-        sample_stat = self._normal_sample.dot(linear_func)
+        guess : tuple (optional)
+            Approximate offsets of the endpoints from the observed
+            statistic. If not None, brackets are grown around them
+            instead of searching a grid.
+
+        ngrid : int
+            Size of the initial grid.
+
+        nrefine : int
+            Number of subintervals in each refinement.
+
+        tol : float
+            Relative width at which refinement stops.
+
+        Returns
+        -------
+
+        lower, upper : float
+        '''
+
+        sample_stat = self._sample_stat(linear_func)
         observed_stat = self.observed.dot(linear_func)
-        
-        def _rootU(gamma):
-            return self.pivot(linear_func,
-                              observed_stat + gamma,
-                              alternative='less') - (1 - level) / 2.
-        def _rootL(gamma):
-            return self.pivot(linear_func,
-                              observed_stat + gamma,
-                              alternative='less') - (1 + level) / 2.
+        scale = np.std(sample_stat)
+
+        # the pivot decreases in the candidate, the lower endpoint
+        # is where it crosses (1 + level) / 2 and the upper
+        # where it crosses (1 - level) / 2
+
+        levels = np.array([(1 + level) / 2., (1 - level) / 2.])
+
+        def _root(gamma):
+            pivots = self.pivot_grid(linear_func,
+                                     observed_stat + gamma.reshape(-1),
+                                     alternative='less')
+            return pivots.reshape(gamma.shape) - levels[:,None]
 
         if guess is None:
-            grid_min, grid_max = -how_many_sd * np.std(sample_stat), how_many_sd * np.std(sample_stat)
-            upper = bisect(_rootU, grid_min, grid_max)
-            lower = bisect(_rootL, grid_min, grid_max)
-            
+            grid = np.linspace(-how_many_sd * scale, how_many_sd * scale, ngrid)
+            gamma = np.array([grid, grid])
+            brackets = _bracket_roots(gamma, _root(gamma))
         else:
-            delta = 0.5 * (guess[1] - guess[0])
-            
-            # find interval bracketing upper solution
-            count = 0
-            while True:
-                Lu, Uu = guess[1] - delta, guess[1] + delta
-                valU = _rootU(Uu)
-                valL = _rootU(Lu)
-                if valU * valL < 0:
-                    break
-                delta *= 2
-                count += 1
-            upper = bisect(_rootU, Lu, Uu)
-
-            # find interval bracketing lower solution
-            count = 0
-            while True:
-                Ll, Ul = guess[0] - delta, guess[0] + delta
-                valU = _rootL(Ul)
-                valL = _rootL(Ll)
-                if valU * valL < 0:
+            guess = np.asarray(guess, float)
+            delta = 0.5 * np.fabs(guess[1] - guess[0]) * np.ones(2)
+            delta[delta == 0] = scale
+
+            # grow brackets around each guess until the
+            # root function changes sign
+
+            for _ in range(50):
+                gamma = np.array([guess - delta, guess + delta]).T
+                values = _root(gamma)
+                found = values[:,0] * values[:,1] <= 0
+                if np.all(found):
                     break
-                delta *= 2
-                count += 1
-            lower = bisect(_rootL, Ll, Ul)
+                delta[~found] *= 2
+            else:
+                raise ValueError('pivot does not cross the confidence level within the grid')
+            brackets = _bracket_roots(gamma, values)
+
+        while np.max(brackets[0][:,1] - brackets[0][:,0]) > tol * scale:
+            left, right = brackets[0].T
+            gamma = (left[:,None] + 
+                     np.linspace(0, 1, nrefine + 1)[None,:] * (right - left)[:,None])
+            brackets = _bracket_roots(gamma, _root(gamma))
+
+        # linear interpolation within the final brackets
+
+        (left, right), (value_left, value_right) = brackets[0].T, brackets[1].T
+        denom = value_left - value_right
+        denom[denom == 0] = 1
+        lower, upper = left + (right - left) * value_left / denom
         return lower + observed_stat, upper + observed_stat
 
     # Private methods
 
-    def _weights(self, 
-                 stat_sample,
-                 candidate,
-                 nuisance,
-                 translate_dirs):
+    def _sample_stat(self, linear_func):
+        key = np.asarray(linear_func, float).tobytes()
+        if key not in self._sample_stats:
+            self._sample_stats[key] = self._normal_sample.dot(linear_func)
+        return self._sample_stats[key]
+
+    def _pivot_terms(self,
+                     linear_func,
+                     candidate):
+        '''
+        Log-weights and indicators of `sample_stat + candidate <= observed_stat`
+        whose weighted mean is the pivot at `candidate`, with one
+        column per candidate if `candidate` is an array.
+        '''
+
+        observed_stat = self.observed.dot(linear_func)
+        sample_stat = self._sample_stat(linear_func)
+
+        target_cov = linear_func.dot(self.target_cov.dot(linear_func))
+
+        nuisance = []
+        translate_dirs = []
+
+        for (opt_sampler, 
+             opt_sample, 
+             _, 
+             _, 
+             target_score_cov) in self.opt_sampling_info:
+
+            cur_score_cov = linear_func.dot(target_score_cov)
+
+            # cur_nuisance is in the view's score coordinates
+            cur_nuisance = opt_sampler.observed_score_state - cur_score_cov * observed_stat / target_cov
+            nuisance.append(cur_nuisance)
+            translate_dirs.append(cur_score_cov / target_cov)
+
+        logW = self._log_weights(sample_stat,  # normal sample 
+                                 candidate,    # candidate value(s)
+                                 nuisance,       # nuisance sufficient stats for each view
+                                 translate_dirs) # points will be moved like sample * target_score_cov
+
+        return logW, np.add.outer(sample_stat, candidate) <= observed_stat
+
+    def _log_weights(self, 
+                     stat_sample,
+                     candidate,
+                     nuisance,
+                     translate_dirs):
 
         # Here we should loop through the views
         # and move the score of each view 
@@ -1405,21 +1810,122 @@ class optimization_intervals(object):
 
         # In this function, \hat{\theta}_i will change with the Monte Carlo sample
 
-        score_sample = []
+        candidate = np.asarray(candidate)
         _lognum = 0
         for i, opt_info in enumerate(self.opt_sampling_info):
             opt_sampler, opt_sample = opt_info[:2]
 
-            _lognum += opt_sampler.log_cond_density(opt_sample,
-                                                    stat_sample + candidate,
-                                                    transform=
-                                                    (translate_dirs[i],
-                                                     nuisance[i]))
+            _lognum += opt_sampler.log_cond_density_grid(opt_sample,
+                                                         stat_sample,
+                                                         candidate,
+                                                         (translate_dirs[i],
+                                                          nuisance[i]))
+
+        logden = np.reshape(self._logden, np.shape(self._logden) + (1,) * candidate.ndim)
+        return _lognum - logden
+
+class pivot_accumulator(object):
+
+    r"""
+    Online computation of weighted Monte Carlo pivots
+
+    .. math::
+
+         \frac{\sum_i e^{\ell_i} I_i}{\sum_i e^{\ell_i}}
+
+    from chunks of log-weights $\ell_i$ and indicators $I_i$.
+    Both sums are kept relative to the running maximum
+    of the log-weights, so memory does not grow with
+    the number of draws.
+    """
+
+    def __init__(self, shape=()):
+        '''
+        Parameters
+        ----------
 
-        _logratio = _lognum - self._logden
-        _logratio -= _logratio.max()
+        shape : tuple
+            Shape of the pivots, one for each
+            statistic accumulated in parallel.
+        '''
+        self.log_scale = -np.inf * np.ones(shape)
+        self.numerator = np.zeros(shape)
+        self.denominator = np.zeros(shape)
+        self.ndraw = 0
 
-        return np.exp(_logratio)
+    def update(self, logW, indicator):
+        '''
+        Add a chunk of draws.
+
+        Parameters
+        ----------
+
+        logW : np.float((nchunk,) + shape)
+            Unnormalized log-weights of the draws.
+
+        indicator : np.bool((nchunk,) + shape)
+            Indicators whose weighted mean is the pivot.
+        '''
+        logW = np.asarray(logW, float)
+        if logW.shape[0] == 0:
+            return
+        log_scale = np.maximum(self.log_scale, logW.max(0))
+        factor = np.exp(self.log_scale - log_scale)
+        W = np.exp(logW - log_scale)
+        self.numerator = self.numerator * factor + (W * indicator).sum(0)
+        self.denominator = self.denominator * factor + W.sum(0)
+        self.log_scale = log_scale
+        self.ndraw += logW.shape[0]
+
+    @property
+    def pivot(self):
+        return self.numerator / self.denominator
+
+def _pvalue_from_pivot(pivot, alternative):
+    if alternative == 'twosided':
+        return 2 * np.minimum(pivot, 1 - pivot)
+    elif alternative == 'less':
+        return pivot
+    else:
+        return 1 - pivot
+
+def _modular_index(nsample, nopt):
+    """
+    Indices pairing `nsample` draws with a sample
+    of size `nopt`, repeating it as necessary.
+    """
+    if nopt >= nsample:
+        return slice(0, nsample)
+    return np.arange(nsample) % nopt
+
+def _bracket_roots(grid, values):
+    """
+    For each row of `grid`, the first pair of adjacent
+    points at which `values` changes sign.
+
+    Returns
+    -------
+
+    brackets : np.float((nrow, 2))
+
+    bracket_values : np.float((nrow, 2))
+    """
+    signs = np.sign(values)
+    change = (signs[:,1:] != signs[:,:1]) | (signs[:,1:] == 0)
+    if not np.all(change.any(1)):
+        raise ValueError('pivot does not cross the confidence level within the grid')
+    idx = np.argmax(change, 1)
+    rows = np.arange(grid.shape[0])
+    return (np.array([grid[rows, idx], grid[rows, idx + 1]]).T,
+            np.array([values[rows, idx], values[rows, idx + 1]]).T)
+
+def _chunks(sample, logW, chunk_size):
+    """
+    Split a materialized sample into chunks of
+    `(sample, logW)` of at most `chunk_size` draws.
+    """
+    for start in range(0, sample.shape[0], chunk_size):
+        yield sample[start:start + chunk_size], logW[start:start + chunk_size]
 
 def naive_confidence_intervals(diag_cov, observed, level=0.9):
     """
@@ -1474,7 +1980,7 @@ def _solve_barrier_affine_py(conjugate_arg,
                              min_its=200,
                              tol=1.e-10):
 
-    scaling = np.sqrt(np.diag(con_linear.dot(precision).dot(con_linear.T)))
+    scaling = barrier_scaling(con_linear, precision)
 
     if feasible_point is None:
         feasible_point = 1. / scaling
@@ -1483,8 +1989,9 @@ def _solve_barrier_affine_py(conjugate_arg,
                           + np.log(1.+ 1./((con_offset - con_linear.dot(u))/ scaling)).sum()
     grad = lambda u: -conjugate_arg + precision.dot(u) - con_linear.T.dot(1./(scaling + con_offset - con_linear.dot(u)) -
                                                                        1./(con_offset - con_linear.dot(u)))
-    barrier_hessian = lambda u: con_linear.T.dot(np.diag(-1./((scaling + con_offset-con_linear.dot(u))**2.)
-                                                 + 1./((con_offset-con_linear.dot(u))**2.))).dot(con_linear)
+    barrier_hess = lambda u: barrier_hessian(con_linear,
+                                             -1./((scaling + con_offset-con_linear.dot(u))**2.)
+                                             + 1./((con_offset-con_linear.dot(u))**2.))
 
     current = feasible_point
     current_value = np.inf
@@ -1533,7 +2040,7 @@ def _solve_barrier_affine_py(conjugate_arg,
         if itercount % 4 == 0:
             step *= 2
 
-    hess = np.linalg.inv(precision + barrier_hessian(current))
+    hess = np.linalg.inv(precision + barrier_hess(current))
     return current_value, current, hess
 
 def _solve_barrier_nonneg(conjugate_arg,
@@ -1541,6 +2048,7 @@ def _solve_barrier_nonneg(conjugate_arg,
                           feasible_point=None,
                           step=1,
                           nstep=1000,
+                          min_its=0,
                           tol=1.e-8):
 
     scaling = np.sqrt(np.diag(precision))
@@ -1574,6 +2082,7 @@ def _solve_barrier_nonneg(conjugate_arg,
 
         count = 0
         while True:
+            count += 1
             proposal = current - step * cur_grad
             proposed_value = objective(proposal)
             if proposed_value <= current_value:
@@ -1587,7 +2096,8 @@ def _solve_barrier_nonneg(conjugate_arg,
 
         # stop if relative decrease is small
 
-        if np.fabs(current_value - proposed_value) < tol * np.fabs(current_value):
+        if (np.fabs(current_value - proposed_value) < tol * np.fabs(current_value) and
+            itercount >= min_its):
             current = proposal
             current_value = proposed_value
             break
@@ -1616,7 +2126,9 @@ def selective_MLE(observed_target,
                   offset,
                   solve_args={'tol':1.e-12}, 
                   level=0.9,
-                  useC=False):
+                  useC=False,
+                  prec_target=None,
+                  prec_opt=None):
     """
     Selective MLE based on approximation of
     CGF.
@@ -1653,13 +2165,20 @@ def selective_MLE(observed_target,
         Offset part of affine constraints: $\{o:Ao \leq b\}$
 
     solve_args : dict, optional
-        Arguments passed to solver.
+        Arguments passed to solver. The key `method`,
+        one of ['descent', 'newton'], selects the solver.
 
     level : float, optional
         Confidence level.
 
     useC : bool, optional
         Use python or C solver.
+
+    prec_target : ndarray, optional
+        Inverse of `target_cov`, computed if not supplied.
+
+    prec_opt : ndarray, optional
+        Inverse of `cond_cov`, computed if not supplied.
         
     """
 
@@ -1667,7 +2186,8 @@ def selective_MLE(observed_target,
         raise ValueError('no target specified')
 
     observed_target = np.atleast_1d(observed_target)
-    prec_target = np.linalg.inv(target_cov)
+    if prec_target is None:
+        prec_target = np.linalg.inv(target_cov)
 
     # target_lin determines how the conditional mean of optimization variables
     # vary with target
@@ -1677,16 +2197,15 @@ def selective_MLE(observed_target,
     target_lin = - logdens_linear.dot(target_score_cov.T.dot(prec_target)) 
     target_offset = cond_mean - target_lin.dot(observed_target)
 
-    prec_opt = np.linalg.inv(cond_cov)
+    if prec_opt is None:
+        prec_opt = np.linalg.inv(cond_cov)
 
     conjugate_arg = prec_opt.dot(cond_mean)
 
-    useC= False
-    print("useC", useC)
-    if useC:
-        solver = solve_barrier_affine_C
-    else:
-        solver = _solve_barrier_affine_py
+    solver, solve_args, linear_part = _barrier_solver(solve_args,
+                                                      linear_part,
+                                                      offset,
+                                                      useC=useC)
     
     val, soln, hess = solver(conjugate_arg,
                              prec_opt,
@@ -1695,13 +2214,190 @@ def selective_MLE(observed_target,
                              offset,
                              **solve_args)
 
+    return _selective_MLE_summary(observed_target,
+                                  target_cov,
+                                  prec_target,
+                                  target_lin,
+                                  init_soln,
+                                  cond_mean,
+                                  cond_cov,
+                                  prec_opt,
+                                  val,
+                                  soln,
+                                  hess,
+                                  level=level)
+
+def selective_MLE_batch(problems,
+                        solve_args={'tol':1.e-12},
+                        level=0.9):
+    """
+    Selective MLE for many independent queries, solving
+    all of their barrier problems together.
+
+    Problems are sorted by the number of optimization
+    variables and grouped so that, within a group, no problem
+    is more than twice the size of the smallest. Each group is
+    padded to a common size and solved by
+    `solve_barrier_affine_stacked`.
+
+    Parameters
+    ----------
+
+    problems : sequence
+        Each element is either a tuple
+        `(query, observed_target, target_cov, target_score_cov)`
+        with `query` a fitted `gaussian_query`, or a tuple
+        `(observed_target, target_cov, target_score_cov, init_soln,
+        cond_mean, cond_cov, logdens_linear, linear_part, offset)`
+        of the leading arguments to `selective_MLE`.
+
+    solve_args : dict, optional
+        Arguments passed to `solve_barrier_affine_stacked`.
+
+    level : float, optional
+        Confidence level.
+
+    Returns
+    -------
+
+    results : list
+        For each problem, the tuple `(result, observed_info_mean, log_ref)`
+        returned by `selective_MLE`.
+
+    """
+
+    setups = [_selective_MLE_setup(problem) for problem in problems]
+    solve_args = dict(solve_args)
+    solve_args.pop('method', None)
+
+    order = sorted(range(len(setups)), key=lambda i: setups[i]['init_soln'].shape[0])
+    groups = []
+    for i in order:
+        if groups and setups[i]['init_soln'].shape[0] <= 2 * setups[groups[-1][0]]['init_soln'].shape[0]:
+            groups[-1].append(i)
+        else:
+            groups.append([i])
+
+    results = [None] * len(setups)
+    for group in groups:
+
+        nopt = max([setups[i]['init_soln'].shape[0] for i in group])
+        ncon = max([setups[i]['offset'].shape[0] for i in group])
+        k = len(group)
+
+        # padded variables are decoupled standard Gaussians,
+        # padded constraints are 0 <= 1
+
+        conjugate_args = np.zeros((k, nopt))
+        precisions = np.multiply.outer(np.ones(k), np.identity(nopt))
+        feasible_points = np.zeros((k, nopt))
+        con_linears = np.zeros((k, ncon, nopt))
+        con_offsets = np.ones((k, ncon))
+
+        for j, i in enumerate(group):
+            setup = setups[i]
+            d, m = setup['init_soln'].shape[0], setup['offset'].shape[0]
+            conjugate_args[j,:d] = setup['prec_opt'].dot(setup['cond_mean'])
+            precisions[j,:d,:d] = setup['prec_opt']
+            feasible_points[j,:d] = setup['init_soln']
+            con_linears[j,:m,:d] = setup['linear_part']
+            con_offsets[j,:m] = setup['offset']
+
+        vals, solns, hess = solve_barrier_affine_stacked(conjugate_args,
+                                                         precisions,
+                                                         feasible_points,
+                                                         con_linears,
+                                                         con_offsets,
+                                                         **solve_args)
+
+        for j, i in enumerate(group):
+            setup = setups[i]
+            d = setup['init_soln'].shape[0]
+            results[i] = _selective_MLE_summary(setup['observed_target'],
+                                                setup['target_cov'],
+                                                setup['prec_target'],
+                                                setup['target_lin'],
+                                                setup['init_soln'],
+                                                setup['cond_mean'],
+                                                setup['cond_cov'],
+                                                setup['prec_opt'],
+                                                vals[j],
+                                                solns[j,:d],
+                                                hess[j,:d,:d],
+                                                level=level)
+    return results
+
+def _selective_MLE_setup(problem):
+    """
+    Unpack one element of `problems` in `selective_MLE_batch`.
+    """
+    if hasattr(problem[0], 'sampler'):
+        query_, observed_target, target_cov, target_score_cov = problem
+        sampler = query_.sampler
+        init_soln = query_.observed_opt_state
+        cond_mean = sampler.mean
+        cond_cov = sampler.covariance
+        logdens_linear = sampler.logdens_transform[0]
+        linear_part = sampler.affine_con.linear_part
+        offset = sampler.affine_con.offset
+        prec_target = sampler.target_factorization(target_cov).precision
+        prec_opt = sampler.cond_factorization.precision
+    else:
+        (observed_target,
+         target_cov,
+         target_score_cov,
+         init_soln,
+         cond_mean,
+         cond_cov,
+         logdens_linear,
+         linear_part,
+         offset) = problem
+        prec_target = np.linalg.inv(target_cov)
+        prec_opt = np.linalg.inv(cond_cov)
+
+    if np.asarray(observed_target).shape in [(), (0,)]:
+        raise ValueError('no target specified')
+    if isinstance(linear_part, structured_linear):
+        linear_part = linear_part.toarray()
+
+    target_lin = - logdens_linear.dot(target_score_cov.T.dot(prec_target)) 
+
+    return {'observed_target':np.atleast_1d(observed_target),
+            'target_cov':target_cov,
+            'prec_target':prec_target,
+            'target_lin':target_lin,
+            'init_soln':np.asarray(init_soln),
+            'cond_mean':cond_mean,
+            'cond_cov':cond_cov,
+            'prec_opt':prec_opt,
+            'linear_part':linear_part,
+            'offset':np.asarray(offset)}
+
+def _selective_MLE_summary(observed_target,
+                           target_cov,
+                           prec_target,
+                           target_lin,
+                           init_soln,
+                           cond_mean,
+                           cond_cov,
+                           prec_opt,
+                           val,
+                           soln,
+                           hess,
+                           level=0.9):
+    """
+    Form the output of `selective_MLE` from
+    the solution of its barrier problem.
+    """
+
+    conjugate_arg = prec_opt.dot(cond_mean)
+
     final_estimator = observed_target + target_cov.dot(target_lin.T.dot(prec_opt.dot(cond_mean - soln)))
     ind_unbiased_estimator = observed_target + target_cov.dot(target_lin.T.dot(prec_opt.dot(cond_mean
                                                                                             - init_soln)))
 
-    print("check within MLE ", soln, init_soln)
     L = target_lin.T.dot(prec_opt)
-    observed_info_natural = prec_target + L.dot(target_lin) - L.dot(hess.dot(L.T))
+    observed_info_natural = prec_target + L.dot(target_lin) - L.dot(hessian_solve(hess, L.T))
     observed_info_mean = target_cov.dot(observed_info_natural.dot(target_cov))
 
     Z_scores = final_estimator / np.sqrt(np.diag(observed_info_mean))
@@ -1735,7 +2431,10 @@ def normalizing_constant(target_parameter,
                          logdens_linear,
                          linear_part,
                          offset,
-                         useC=False):
+                         solve_args={'tol':1.e-12},
+                         useC=False,
+                         cond_precision=None,
+                         prec_target=None):
 
     """
 
@@ -1774,19 +2473,162 @@ def normalizing_constant(target_parameter,
         Offset part of affine constraints: $\{o:Ao \leq b\}$
 
     solve_args : dict, optional
-        Arguments passed to solver.
+        Arguments passed to solver. The key `method`,
+        one of ['descent', 'newton'], selects the solver.
 
     level : float, optional
         Confidence level.
 
     useC : bool, optional
         Use python or C solver.
+
+    cond_precision : ndarray, optional
+        Inverse of `cond_cov`, computed if not supplied.
+
+    prec_target : ndarray, optional
+        Inverse of `target_cov`, computed if not supplied.
     """
 
     target_parameter = np.atleast_1d(target_parameter)
 
-    cond_precision = np.linalg.inv(cond_cov)
-    prec_target = np.linalg.inv(target_cov)
+    (full_Q,
+     target_term,
+     opt_term,
+     full_con_linear,
+     full_feasible,
+     prec_target) = _normalizing_constant_setup(observed_target,
+                                                target_cov,
+                                                target_score_cov,
+                                                feasible_point,
+                                                cond_mean,
+                                                cond_cov,
+                                                logdens_linear,
+                                                linear_part,
+                                                cond_precision=cond_precision,
+                                                prec_target=prec_target)
+    ntarget = target_cov.shape[0]
+
+    linear_term = np.hstack([-prec_target.dot(target_parameter) + target_term,
+                             opt_term])
+
+    solver, solve_args, full_con_linear = _barrier_solver(solve_args,
+                                                          full_con_linear,
+                                                          offset,
+                                                          useC=useC)
+
+    value, soln, hess = solver(-linear_term,
+                                full_Q,
+                                full_feasible,
+                                full_con_linear,
+                                offset,
+                                **solve_args)
+    return (-value + 0.5 * np.sum(target_parameter * prec_target.dot(target_parameter)), 
+             soln[:ntarget], 
+             hessian_solve(hess, np.identity(full_Q.shape[0])[:,:ntarget])[:ntarget])
+
+def normalizing_constant_batch(target_parameters,
+                               observed_target,
+                               target_cov,
+                               target_score_cov,
+                               feasible_point,
+                               cond_mean,
+                               cond_cov,
+                               logdens_linear,
+                               linear_part,
+                               offset,
+                               solve_args={'tol':1.e-12},
+                               cond_precision=None,
+                               prec_target=None):
+
+    """
+
+    Approximation of normalizing constant
+    in affine constrained Gaussian at many
+    values of the target parameter.
+
+    The quadratic and constraints of the barrier problem
+    do not depend on the target parameter, so they are formed
+    once and all problems are solved by `solve_barrier_affine_batch`.
+
+    Parameters
+    ----------
+
+    target_parameters : ndarray
+        Values of target parameter, one per row.
+
+    Other parameters are as in `normalizing_constant`.
+
+    Returns
+    -------
+
+    log_normalizers : ndarray
+        Shape (k,) for `k` rows of `target_parameters`.
+
+    solns : ndarray
+        Target block of the optimizers, shape (k, ntarget).
+
+    hess : ndarray
+        Target block of the inverse Hessians,
+        shape (k, ntarget, ntarget).
+
+    """
+
+    target_parameters = np.atleast_2d(target_parameters)
+
+    (full_Q,
+     target_term,
+     opt_term,
+     full_con_linear,
+     full_feasible,
+     prec_target) = _normalizing_constant_setup(observed_target,
+                                                target_cov,
+                                                target_score_cov,
+                                                feasible_point,
+                                                cond_mean,
+                                                cond_cov,
+                                                logdens_linear,
+                                                linear_part,
+                                                cond_precision=cond_precision,
+                                                prec_target=prec_target)
+    ntarget = target_cov.shape[0]
+
+    linear_terms = np.hstack([-target_parameters.dot(prec_target) + target_term[None,:],
+                              np.multiply.outer(np.ones(target_parameters.shape[0]), opt_term)])
+
+    solve_args = dict(solve_args)
+    method = solve_args.pop('method', 'descent')
+    values, solns, hess = solve_barrier_affine_batch(-linear_terms,
+                                                     full_Q,
+                                                     full_feasible,
+                                                     full_con_linear,
+                                                     offset,
+                                                     method=method,
+                                                     **solve_args)
+
+    return (-values + 0.5 * np.sum(target_parameters.dot(prec_target) * target_parameters, 1),
+            solns[:,:ntarget],
+            hess[:,:ntarget,:ntarget])
+
+def _normalizing_constant_setup(observed_target,
+                                target_cov,
+                                target_score_cov,
+                                feasible_point,
+                                cond_mean,
+                                cond_cov,
+                                logdens_linear,
+                                linear_part,
+                                cond_precision=None,
+                                prec_target=None):
+    """
+    Quadratic, constraints and the parts of the linear term
+    of the barrier problem in `normalizing_constant` that
+    do not depend on the target parameter.
+    """
+
+    if cond_precision is None:
+        cond_precision = np.linalg.inv(cond_cov)
+    if prec_target is None:
+        prec_target = np.linalg.inv(target_cov)
     target_linear = -logdens_linear.dot(target_score_cov.dot(prec_target))
     nuisance_correction = target_linear.dot(observed_target)
     corrected_mean = cond_mean - nuisance_correction
@@ -1801,39 +2643,83 @@ def normalizing_constant(target_parameter,
     full_Q = np.zeros((ntarget + nopt,
                        ntarget + nopt))
     full_Q[:ntarget][:,:ntarget] = (prec_target + target_linear.T.dot(cond_precision.dot(target_linear)))
-    full_Q[:ntarget][:,ntarget:] = -target_linear.dot(cond_precision)
-    full_Q[ntarget:][:,:ntarget] = (-target_linear.dot(cond_precision)).T
+    full_Q[:ntarget][:,ntarget:] = -target_linear.T.dot(cond_precision)
+    full_Q[ntarget:][:,:ntarget] = (-target_linear.T.dot(cond_precision)).T
     full_Q[ntarget:][:,ntarget:] = cond_precision
 
-    linear_term = np.hstack([-prec_target.dot(target_parameter) + 
-                              corrected_mean.dot(cond_precision).dot(target_linear), 
-                              -cond_precision.dot(corrected_mean)])
+    # the linear term is (-prec_target.dot(target_parameter) + target_term, opt_term)
 
-    constant_term = 0.5 * (np.sum(target_parameter * prec_target.dot(target_parameter)) +
-                           np.sum(corrected_mean * cond_precision.dot(corrected_mean)))
+    target_term = corrected_mean.dot(cond_precision).dot(target_linear)
+    opt_term = -cond_precision.dot(corrected_mean)
 
+    if isinstance(linear_part, structured_linear):
+        linear_part = linear_part.toarray()
     full_con_linear = np.zeros((linear_part.shape[0],
                                 ntarget + nopt))
     full_con_linear[:,ntarget:] = linear_part
     full_feasible = np.zeros(ntarget + nopt)
     full_feasible[ntarget:] = feasible_point
 
-    solve_args={'tol':1.e-12}
+    return (full_Q,
+            target_term,
+            opt_term,
+            structured_constraint(full_con_linear),
+            full_feasible,
+            prec_target)
+
+def _barrier_solver(solve_args, linear_part, offset, useC=False):
+    """
+    Choose the barrier solver named by `solve_args['method']`,
+    one of ['descent', 'newton'], defaulting to descent with
+    the C or python solver according to `useC`.
+
+    If `linear_part` is a `structured_linear` equal to $-I$ and
+    `offset` is 0, descent uses the nonnegative barrier solver;
+    otherwise the python solvers use its O(d) products, while the
+    C solver is handed a dense copy.
+
+    The C and Newton solvers limit iterations with
+    `max_iter, min_iter` and the python solvers with
+    `nstep, min_its`; either spelling is accepted in
+    `solve_args` and renamed for the chosen solver.
+
+    Returns the solver, the remaining arguments and
+    the linear part to pass to the solver.
+    """
+    solve_args = dict(solve_args)
+    method = solve_args.pop('method', 'descent')
+    structured = isinstance(linear_part, structured_linear)
+
+    C_args = _rename_solve_args(solve_args, {'nstep':'max_iter', 'min_its':'min_iter'})
+    py_args = _rename_solve_args(solve_args, {'max_iter':'nstep', 'min_iter':'min_its'})
+
+    if method == 'newton':
+        return solve_barrier_affine_newton, C_args, linear_part
+    elif method != 'descent':
+        raise ValueError("method should be one of ['descent', 'newton']")
+
+    if structured and linear_part.nonneg and np.all(np.asarray(offset) == 0):
+        nonneg_solver = solve_barrier_nonneg_C if useC else _solve_barrier_nonneg
+        def solver(conjugate_arg,
+                   precision,
+                   feasible_point,
+                   con_linear,
+                   con_offset,
+                   **solve_args):
+            return nonneg_solver(conjugate_arg,
+                                 precision,
+                                 feasible_point,
+                                 **solve_args)
+        return solver, (C_args if useC else py_args), linear_part
 
     if useC:
-        solver = solve_barrier_affine_C
-    else:
-        solver = _solve_barrier_affine_py
+        if structured:
+            linear_part = linear_part.toarray()
+        return solve_barrier_affine_C, C_args, linear_part
+    return _solve_barrier_affine_py, py_args, linear_part
 
-    value, soln, hess = solver(-linear_term,
-                                full_Q,
-                                full_feasible,
-                                full_con_linear,
-                                offset,
-                                **solve_args)
-    return (-value + 0.5 * np.sum(target_parameter * prec_target.dot(target_parameter)), 
-             soln[:ntarget], 
-             hess[:ntarget][:,:ntarget])
+def _rename_solve_args(solve_args, names):
+    return dict([(names.get(key, key), value) for key, value in solve_args.items()])
 
 
 def _bisect(f, lb, ub, min_iter=20, max_iter=100, tol=1.e-3):
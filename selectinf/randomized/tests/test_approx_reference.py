@@ -188,6 +188,130 @@ def test_approx_ci(n=500,
     return np.mean(coverage), np.mean(length)
 
 
+def test_parallel_families(n=500,
+                           p=100,
+                           signal_fac=1.,
+                           s=5,
+                           sigma=2.,
+                           rho=0.4,
+                           randomizer_scale=1.):
+
+    inst, const = gaussian_instance, lasso.gaussian
+    signal = np.sqrt(signal_fac * 2 * np.log(p))
+
+    X, Y, beta = inst(n=n,
+                      p=p,
+                      signal=signal,
+                      s=s,
+                      equicorrelated=False,
+                      rho=rho,
+                      sigma=sigma,
+                      random_signs=True)[:3]
+
+    n, p = X.shape
+
+    sigma_ = np.std(Y)
+    dispersion = np.linalg.norm(Y - X.dot(np.linalg.pinv(X).dot(Y))) ** 2 / (n - p)
+
+    W = 1 * np.ones(X.shape[1]) * np.sqrt(2 * np.log(p)) * sigma_
+
+    conv = const(X,
+                 Y,
+                 W,
+                 randomizer_scale=randomizer_scale * dispersion)
+
+    signs = conv.fit()
+    nonzero = signs != 0
+
+    if nonzero.sum()>0:
+
+        (observed_target,
+         cov_target,
+         cov_target_score,
+         alternatives) = selected_targets(conv.loglike,
+                                          conv._W,
+                                          nonzero,
+                                          dispersion=dispersion)
+
+        S1 = conv.approximate_grid_inference(observed_target,
+                                             cov_target,
+                                             cov_target_score,
+                                             alternatives=alternatives)
+
+        for executor in ['thread', 'process']:
+            S2 = conv.approximate_grid_inference(observed_target,
+                                                 cov_target,
+                                                 cov_target_score,
+                                                 alternatives=alternatives,
+                                                 n_jobs=3,
+                                                 executor=executor)
+            np.testing.assert_array_equal(S1.values, S2.values)
+
+
+def test_adaptive_grid(n=500,
+                       p=100,
+                       signal_fac=1.,
+                       s=5,
+                       sigma=2.,
+                       rho=0.4,
+                       randomizer_scale=1.):
+
+    inst, const = gaussian_instance, lasso.gaussian
+    signal = np.sqrt(signal_fac * 2 * np.log(p))
+
+    X, Y, beta = inst(n=n,
+                      p=p,
+                      signal=signal,
+                      s=s,
+                      equicorrelated=False,
+                      rho=rho,
+                      sigma=sigma,
+                      random_signs=True)[:3]
+
+    n, p = X.shape
+
+    sigma_ = np.std(Y)
+    dispersion = np.linalg.norm(Y - X.dot(np.linalg.pinv(X).dot(Y))) ** 2 / (n - p)
+
+    W = 1 * np.ones(X.shape[1]) * np.sqrt(2 * np.log(p)) * sigma_
+
+    conv = const(X,
+                 Y,
+                 W,
+                 randomizer_scale=randomizer_scale * dispersion)
+
+    signs = conv.fit()
+    nonzero = signs != 0
+
+    if nonzero.sum()>0:
+
+        (observed_target,
+         cov_target,
+         cov_target_score,
+         alternatives) = selected_targets(conv.loglike,
+                                          conv._W,
+                                          nonzero,
+                                          dispersion=dispersion)
+
+        solve_args = {'tol':1.e-12, 'method':'newton'}
+        G1 = approximate_grid_inference(conv,
+                                        observed_target,
+                                        cov_target,
+                                        cov_target_score,
+                                        solve_args=solve_args)
+        G2 = approximate_grid_inference(conv,
+                                        observed_target,
+                                        cov_target,
+                                        cov_target_score,
+                                        solve_args=solve_args,
+                                        grid_tol=1.e-4)
+
+        np.testing.assert_allclose(G1._approx_intervals(0.9),
+                                   G2._approx_intervals(0.9),
+                                   rtol=1.e-2,
+                                   atol=1.e-2)
+        assert max([len(grid) for grid in G2.stat_grid]) <= 60
+
 
 def main(nsim=300, CI = False):
 
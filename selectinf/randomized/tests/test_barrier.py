@@ -0,0 +1,263 @@
+import numpy as np
+import nose.tools as nt
+
+from ...tests.decorators import set_seed_iftrue
+from ..query import (_solve_barrier_affine_py,
+                     _barrier_solver,
+                     selective_MLE,
+                     selective_MLE_batch,
+                     normalizing_constant,
+                     normalizing_constant_batch)
+from ..barrier import (solve_barrier_affine_batch,
+                       solve_barrier_affine_path,
+                       solve_barrier_affine_newton,
+                       solve_barrier_affine_stacked,
+                       hessian_solve,
+                       structured_constraint,
+                       structured_linear)
+
+@set_seed_iftrue(True)
+def test_batch_solver(k=6):
+
+    X = np.random.standard_normal((10, 5))
+    precision = X.T.dot(X) / 10
+    conjugate_args = np.random.standard_normal((k, 5))
+
+    A = np.vstack([-np.identity(5), np.random.standard_normal((2, 5))])
+    b = np.hstack([np.zeros(5), 10 * np.ones(2)])
+    feasible_point = np.ones(5)
+
+    vals, solns, hess = solve_barrier_affine_batch(conjugate_args,
+                                                   precision,
+                                                   feasible_point,
+                                                   A,
+                                                   b,
+                                                   tol=1.e-12)
+
+    assert solns.shape == (k, 5)
+    assert hess.shape == (k, 5, 5)
+
+    for i in range(k):
+        val, soln, H = _solve_barrier_affine_py(conjugate_args[i],
+                                                precision,
+                                                feasible_point,
+                                                A,
+                                                b,
+                                                tol=1.e-12)
+        np.testing.assert_allclose(soln, solns[i], atol=1.e-4, rtol=1.e-4)
+        np.testing.assert_allclose(H, hess[i], atol=1.e-4, rtol=1.e-4)
+        assert (np.fabs(val - vals[i]) < 1.e-4 * np.fabs(val))
+
+@set_seed_iftrue(True)
+def test_path_solver(k=20):
+
+    X = np.random.standard_normal((10, 5))
+    precision = X.T.dot(X) / 10
+    direction = np.random.standard_normal(5)
+    conjugate_args = np.multiply.outer(np.linspace(-1, 1, k), direction)
+
+    A = -np.identity(5)
+    b = np.zeros(5)
+    feasible_point = np.ones(5)
+
+    vals1, solns1, hess1, niter1 = solve_barrier_affine_batch(conjugate_args,
+                                                              precision,
+                                                              feasible_point,
+                                                              A,
+                                                              b,
+                                                              return_iterations=True)
+
+    vals2, solns2, hess2, niter2 = solve_barrier_affine_path(conjugate_args,
+                                                             precision,
+                                                             feasible_point,
+                                                             A,
+                                                             b,
+                                                             start=k // 2,
+                                                             return_iterations=True)
+
+    np.testing.assert_allclose(solns1, solns2, atol=1.e-4, rtol=1.e-4)
+    np.testing.assert_allclose(vals1, vals2, atol=1.e-4, rtol=1.e-4)
+    assert niter2.sum() < niter1.sum()
+
+@set_seed_iftrue(True)
+def test_newton_solver():
+
+    X = np.random.standard_normal((10, 5))
+    precision = X.T.dot(X) / 10
+    conjugate_arg = np.random.standard_normal(5)
+
+    A = np.vstack([-np.identity(5), np.random.standard_normal((2, 5))])
+    b = np.hstack([np.zeros(5), 10 * np.ones(2)])
+    feasible_point = np.ones(5)
+
+    val1, soln1, hess1 = _solve_barrier_affine_py(conjugate_arg,
+                                                  precision,
+                                                  feasible_point,
+                                                  A,
+                                                  b,
+                                                  tol=1.e-12)
+
+    val2, soln2, hess2, niter = solve_barrier_affine_newton(conjugate_arg,
+                                                            precision,
+                                                            feasible_point,
+                                                            A,
+                                                            b,
+                                                            tol=1.e-12,
+                                                            return_iterations=True)
+
+    np.testing.assert_allclose(soln1, soln2, atol=1.e-4, rtol=1.e-4)
+    np.testing.assert_allclose(hess1, hessian_solve(hess2, np.identity(5)), atol=1.e-4, rtol=1.e-4)
+    assert (np.fabs(val1 - val2) < 1.e-4 * np.fabs(val1))
+    assert niter < 100
+
+@set_seed_iftrue(True)
+def test_structured_solver():
+
+    X = np.random.standard_normal((10, 5))
+    precision = X.T.dot(X) / 10
+    conjugate_arg = np.random.standard_normal(5)
+
+    # bidiagonal constraints as in SLOPE
+
+    A = -np.identity(5)
+    A[1:,:-1] += np.identity(4)
+    b = np.zeros(5)
+    feasible_point = np.arange(1, 6) * 1.
+
+    A_struct = structured_constraint(A)
+    assert isinstance(A_struct, structured_linear)
+    assert not A_struct.nonneg
+    np.testing.assert_allclose(A_struct.toarray(), A)
+    np.testing.assert_allclose(A_struct.T.dot(np.ones(5)), A.T.dot(np.ones(5)))
+    assert structured_constraint(-np.identity(5)).nonneg
+
+    val1, soln1, hess1 = _solve_barrier_affine_py(conjugate_arg,
+                                                  precision,
+                                                  feasible_point,
+                                                  A,
+                                                  b,
+                                                  tol=1.e-12)
+
+    val2, soln2, hess2 = _solve_barrier_affine_py(conjugate_arg,
+                                                  precision,
+                                                  feasible_point,
+                                                  A_struct,
+                                                  b,
+                                                  tol=1.e-12)
+
+    np.testing.assert_allclose(soln1, soln2, atol=1.e-8, rtol=1.e-8)
+    np.testing.assert_allclose(hess1, hess2, atol=1.e-8, rtol=1.e-8)
+    np.testing.assert_allclose(val1, val2)
+
+@set_seed_iftrue(True)
+def test_structured_nonneg_args():
+
+    X = np.random.standard_normal((10, 5))
+    precision = X.T.dot(X) / 10
+    conjugate_arg = np.random.standard_normal(5)
+    A_struct = structured_constraint(-np.identity(5))
+    b = np.zeros(5)
+
+    val, soln, hess = _solve_barrier_affine_py(conjugate_arg,
+                                               precision,
+                                               np.ones(5),
+                                               -np.identity(5),
+                                               b,
+                                               tol=1.e-12)
+
+    # iteration limits in either spelling reach the nonnegative solvers
+
+    for solve_args in [{'tol':1.e-12, 'min_its':50, 'nstep':2000},
+                       {'tol':1.e-12, 'min_iter':50, 'max_iter':2000}]:
+
+        args = _barrier_solver(solve_args, A_struct, b, useC=True)[1]
+        nt.assert_equal(args, {'tol':1.e-12, 'min_iter':50, 'max_iter':2000})
+
+        solver, args, linear_part = _barrier_solver(solve_args,
+                                                    A_struct,
+                                                    b,
+                                                    useC=False)
+        nt.assert_equal(args, {'tol':1.e-12, 'min_its':50, 'nstep':2000})
+        soln_ = solver(conjugate_arg,
+                       precision,
+                       np.ones(5),
+                       linear_part,
+                       b,
+                       **args)[1]
+        np.testing.assert_allclose(soln, soln_, atol=1.e-5, rtol=1.e-5)
+
+@set_seed_iftrue(True)
+def test_stacked_solver(k=4):
+
+    problems = []
+    for i in range(k):
+        X = np.random.standard_normal((10, 5))
+        precision = X.T.dot(X) / 10
+        conjugate_arg = np.random.standard_normal(5)
+        A = np.vstack([-np.identity(5), np.random.standard_normal((2, 5))])
+        b = np.hstack([np.zeros(5), 10 * np.ones(2)])
+        problems.append((conjugate_arg, precision, np.ones(5), A, b))
+
+    vals, solns, hess = solve_barrier_affine_stacked(*[np.array(v) for v in zip(*problems)])
+
+    for i in range(k):
+        val, soln, H = solve_barrier_affine_newton(*problems[i])
+        np.testing.assert_allclose(soln, solns[i], atol=1.e-8, rtol=1.e-8)
+        np.testing.assert_allclose(hessian_solve(H, np.identity(5)), hess[i], atol=1.e-8, rtol=1.e-8)
+        np.testing.assert_allclose(val, vals[i])
+
+@set_seed_iftrue(True)
+def test_selective_MLE_batch(p=10):
+
+    problems = []
+    for nopt, ntarget in [(3, 2), (5, 5), (4, 3)]:
+        X = np.random.standard_normal((2 * nopt, nopt))
+        cond_cov = np.linalg.inv(X.T.dot(X)) 
+        Y = np.random.standard_normal((2 * ntarget, ntarget))
+        target_cov = Y.T.dot(Y) / (2 * ntarget)
+        problems.append((np.random.standard_normal(ntarget),
+                         target_cov,
+                         0.1 * np.random.standard_normal((ntarget, p)),
+                         np.ones(nopt),
+                         np.random.standard_normal(nopt),
+                         cond_cov,
+                         np.random.standard_normal((nopt, p)),
+                         -np.identity(nopt),
+                         np.zeros(nopt)))
+
+    results = selective_MLE_batch(problems)
+    for problem, (result, info, log_ref) in zip(problems, results):
+        result_, info_, log_ref_ = selective_MLE(*problem,
+                                                solve_args={'tol':1.e-12, 'method':'newton'})
+        np.testing.assert_allclose(result['MLE'], result_['MLE'], atol=1.e-6, rtol=1.e-6)
+        np.testing.assert_allclose(info, info_, atol=1.e-6, rtol=1.e-6)
+        np.testing.assert_allclose(log_ref, log_ref_, atol=1.e-6, rtol=1.e-6)
+        assert list(result.columns) == list(result_.columns)
+
+@set_seed_iftrue(True)
+def test_normalizing_constant_batch(nopt=4, ntarget=3, p=10, k=5):
+
+    X = np.random.standard_normal((2 * nopt, nopt))
+    cond_cov = np.linalg.inv(X.T.dot(X))
+    Y = np.random.standard_normal((2 * ntarget, ntarget))
+    target_cov = Y.T.dot(Y) / (2 * ntarget)
+    observed_target = np.random.standard_normal(ntarget)
+
+    args = (observed_target,
+            target_cov,
+            0.1 * np.random.standard_normal((p, ntarget)),
+            np.ones(nopt),
+            np.random.standard_normal(nopt),
+            cond_cov,
+            np.random.standard_normal((nopt, p)),
+            -np.identity(nopt),
+            np.zeros(nopt))
+
+    target_parameters = observed_target[None,:] + 0.2 * np.random.standard_normal((k, ntarget))
+    values, solns, hess = normalizing_constant_batch(target_parameters, *args)
+
+    for i in range(k):
+        value, soln, H = normalizing_constant(target_parameters[i], *args)
+        np.testing.assert_allclose(value, values[i], rtol=1.e-8)
+        np.testing.assert_allclose(soln, solns[i], atol=1.e-8, rtol=1.e-8)
+        np.testing.assert_allclose(H, hess[i], atol=1.e-8, rtol=1.e-8)
@@ -0,0 +1,25 @@
+import numpy as np
+
+from ...tests.decorators import set_seed_iftrue
+from ..factorization import gaussian_factorization
+
+@set_seed_iftrue(True)
+def test_factorization(d=6):
+
+    X = np.random.standard_normal((20, d))
+    covariance = X.T.dot(X) / 20
+    precision = np.linalg.inv(covariance)
+    arg = np.random.standard_normal(d)
+
+    F1 = gaussian_factorization(covariance=covariance)
+    F2 = gaussian_factorization(precision=precision)
+
+    np.testing.assert_allclose(F1.precision, precision, rtol=1.e-8, atol=1.e-8)
+    np.testing.assert_allclose(F2.covariance, covariance, rtol=1.e-8, atol=1.e-8)
+    np.testing.assert_allclose(F1.solve_cov(arg), precision.dot(arg), rtol=1.e-8, atol=1.e-8)
+    np.testing.assert_allclose(F2.solve_prec(arg), covariance.dot(arg), rtol=1.e-8, atol=1.e-8)
+
+    assert F1.precision is F1.precision
+    assert F1.matches(covariance.copy())
+    assert not F1.matches(2 * covariance)
+    assert not F2.matches(covariance)
@@ -6,6 +6,7 @@ import nose.tools as nt
 import regreg.api as rr
 
 from ..group_lasso import (group_lasso,
+                           polynomial_gaussian_sampler,
                            selected_targets, 
                            full_targets, 
                            debiased_targets)
@@ -14,6 +15,7 @@ from ...tests.flags import SET_SEED
 from ...tests.decorators import set_sampling_params_iftrue, set_seed_iftrue
 from ...algorithms.sqrt_lasso import choose_lambda, solve_sqrt_lasso
 from ..randomization import randomization
+from ..query import optimization_intervals
 from ...tests.decorators import rpy_test_safe
 
 @set_seed_iftrue(SET_SEED)
@@ -279,6 +281,59 @@ def test_all_targets(n=100, p=20, signal_fac=1.5, s=5, sigma=3, rho=0.4):
                          rho=rho, 
                          target=target)
 
+@set_seed_iftrue(True)
+def test_polynomial_sampler(p=4, ndraw=50, nsample=80):
+    """
+    Pivots from a polynomial_gaussian_sampler
+    with more normal draws than opt draws
+    """
+
+    logdens_linear = np.random.standard_normal((1, p))
+    score = np.random.standard_normal(p)
+
+    def log_cond_density(opt_sample, score_sample):
+        return -0.5 * (opt_sample.reshape(-1) - logdens_linear.dot(score_sample))**2
+
+    def log_det(r):
+        return 2 * np.log(1 + np.fabs(np.reshape(r, (-1))))
+
+    sampler = polynomial_gaussian_sampler(0.5,
+                                          1.3,
+                                          1.,
+                                          score,
+                                          log_cond_density,
+                                          log_det,
+                                          (logdens_linear, np.zeros(p)))
+
+    opt_sample, logW = sampler.sample(ndraw)
+    target_cov = np.identity(1)
+    target_score_cov = np.random.standard_normal((1, p))
+    normal_sample = np.random.standard_normal((nsample, 1))
+    observed = np.array([0.7])
+
+    # draw i of normal_sample is paired with draw i % ndraw of opt_sample
+
+    tile = np.arange(nsample) % ndraw
+    intervals, tiled = [optimization_intervals([(sampler, 
+                                                 opt_sample_, 
+                                                 logW_, 
+                                                 target_cov, 
+                                                 target_score_cov)],
+                                               observed,
+                                               nsample,
+                                               normal_sample=normal_sample)
+                        for opt_sample_, logW_ in [(opt_sample, logW),
+                                                   (opt_sample[tile], logW[tile])]]
+
+    linear_func = np.ones(1)
+    pivot = intervals.pivot(linear_func, 0.3)
+    nt.assert_true(0 <= pivot <= 1)
+    np.testing.assert_allclose(pivot, tiled.pivot(linear_func, 0.3))
+
+    nt.assert_equal(sampler.cache_misses, 2)
+    intervals.pivot(linear_func, -0.3)
+    nt.assert_equal(sampler.cache_hits, 1)
+
 def main(nsim=500, n=200, p=50, target='full', sigma=3):
 
     import matplotlib.pyplot as plt
@@ -7,8 +7,9 @@ import regreg.api as rr
 
 from ..lasso import lasso, selected_targets, full_targets, debiased_targets
 from ..screening import marginal_screening
-from ..query import multiple_queries
+from ..query import multiple_queries, optimization_intervals
 from ...tests.instance import gaussian_instance
+from ...tests.decorators import set_seed_iftrue
 from ...algorithms.sqrt_lasso import choose_lambda, solve_sqrt_lasso
 
 # the test here is marginal_screening + lasso
@@ -78,6 +79,297 @@ def test_multiple_queries(n=500,
     pval = np.asarray(results['pvalue'])
     return pval[beta[nonzero] == 0], pval[beta[nonzero] != 0]
 
+def _selected_lasso(n=200, p=30, signal_fac=1.5, s=5, sigma=3, rho=0.4):
+    """
+    Randomized lasso with its selected targets, the tests 
+    using it are seeded so that something is selected
+    """
+
+    signal = np.sqrt(signal_fac * np.log(p))
+    X, Y, beta = gaussian_instance(n=n,
+                                   p=p, 
+                                   signal=signal, 
+                                   s=s, 
+                                   equicorrelated=False, 
+                                   rho=rho, 
+                                   sigma=sigma, 
+                                   random_signs=True)[:3]
+
+    sigma_ = np.std(Y)
+    W = np.ones(X.shape[1]) * np.sqrt(1.5 * np.log(p)) * sigma_
+
+    conv = lasso.gaussian(X, 
+                          Y, 
+                          W, 
+                          randomizer_scale=sigma_)
+    
+    signs = conv.fit()
+    nonzero = signs != 0
+    nt.assert_true(nonzero.sum() > 0)
+
+    (observed_target, 
+     cov_target, 
+     cov_target_score, 
+     alternatives) = selected_targets(conv.loglike, 
+                                      conv._W, 
+                                      nonzero)
+
+    return conv, observed_target, cov_target, cov_target_score, alternatives
+
+@set_seed_iftrue(True)
+def test_streaming_pvalues(ndraw=3000,
+                           burnin=500,
+                           chunk_size=700):
+    """
+    Pivots accumulated over chunks agree
+    with those computed from the full sample
+    """
+
+    (conv, 
+     observed_target, 
+     cov_target, 
+     cov_target_score, 
+     alternatives) = _selected_lasso()
+
+    sampler = conv.sampler
+    sample = sampler.sample(ndraw, burnin)
+    normal_sample = np.random.multivariate_normal(np.zeros(observed_target.shape[0]),
+                                                  cov_target,
+                                                  size=(ndraw,))
+
+    pvalues = sampler.coefficient_pvalues(observed_target,
+                                          cov_target,
+                                          cov_target_score,
+                                          sample=sample,
+                                          normal_sample=normal_sample,
+                                          alternatives=alternatives)
+    streamed = sampler.coefficient_pvalues(observed_target,
+                                           cov_target,
+                                           cov_target_score,
+                                           sample=sample,
+                                           normal_sample=normal_sample,
+                                           alternatives=alternatives,
+                                           chunk_size=chunk_size)
+    np.testing.assert_allclose(pvalues, streamed, atol=1.e-10)
+
+    chunks = list(sampler.sample_chunks(ndraw, burnin, chunk_size=chunk_size))
+    nt.assert_equal(sum([chunk.shape[0] for chunk, _ in chunks]), ndraw)
+    nt.assert_true(max([chunk.shape[0] for chunk, _ in chunks]) <= chunk_size)
+
+    streamed = sampler.coefficient_pvalues(observed_target,
+                                           cov_target,
+                                           cov_target_score,
+                                           sample_args=(ndraw, burnin),
+                                           alternatives=alternatives,
+                                           chunk_size=chunk_size)
+    nt.assert_true(np.all((streamed >= 0) & (streamed <= 1)))
+
+@set_seed_iftrue(True)
+def test_pivot_grid(ndraw=3000,
+                    burnin=500,
+                    level=0.9,
+                    nsample=None):
+    """
+    Pivots on a grid agree with those at each candidate
+    and interval endpoints are where the pivot crosses the level
+    """
+
+    if nsample is None:
+        nsample = ndraw
+
+    (conv, 
+     observed_target, 
+     cov_target, 
+     cov_target_score, 
+     alternatives) = _selected_lasso()
+
+    sampler = conv.sampler
+    opt_sample, opt_logW = sampler.sample(ndraw, burnin)
+    intervals = optimization_intervals([(sampler, 
+                                         opt_sample, 
+                                         opt_logW, 
+                                         cov_target, 
+                                         cov_target_score)],
+                                       observed_target,
+                                       nsample)
+
+    linear_func = np.zeros_like(observed_target)
+    linear_func[0] = 1
+    sd = np.sqrt(cov_target[0, 0])
+    candidates = observed_target[0] + sd * np.linspace(-3, 3, 7)
+    pivots = [intervals.pivot(linear_func, candidate, alternative='less') 
+              for candidate in candidates]
+    np.testing.assert_allclose(intervals.pivot_grid(linear_func, 
+                                                    candidates, 
+                                                    alternative='less'),
+                               pivots, 
+                               atol=1.e-10)
+
+    lower, upper = intervals.confidence_interval(linear_func, level=level)
+    nt.assert_true(lower < upper)
+    np.testing.assert_allclose(intervals.pivot_grid(linear_func, 
+                                                    [lower, upper], 
+                                                    alternative='less'),
+                               [(1 + level) / 2, (1 - level) / 2],
+                               atol=5.e-3)
+
+@set_seed_iftrue(True)
+def test_pivot_grid_reuse():
+    """
+    As above with more normal draws than optimization draws
+    """
+    test_pivot_grid(ndraw=1000, nsample=3500)
+
+@set_seed_iftrue(True)
+def test_sample_reuse(ndraw=1000,
+                      burnin=200,
+                      nsample=3500):
+    """
+    A short optimization sample paired with a longer
+    normal sample gives the same pivots as tiling it
+    """
+
+    (conv, 
+     observed_target, 
+     cov_target, 
+     cov_target_score, 
+     alternatives) = _selected_lasso()
+
+    sampler = conv.sampler
+    opt_sample, opt_logW = sampler.sample(ndraw, burnin)
+    normal_sample = np.random.multivariate_normal(np.zeros(observed_target.shape[0]),
+                                                  cov_target,
+                                                  size=(nsample,))
+
+    reps = int(np.ceil(nsample / ndraw))
+    tiled_sample = np.tile(opt_sample, (reps, 1))[:nsample]
+    tiled_logW = np.tile(opt_logW, reps)[:nsample]
+
+    linear_func = np.zeros_like(observed_target)
+    linear_func[0] = 1
+    candidates = observed_target[0] + np.sqrt(cov_target[0, 0]) * np.linspace(-2, 2, 5)
+
+    pivots = []
+    for sample, logW in [(opt_sample, opt_logW), (tiled_sample, tiled_logW)]:
+        intervals = optimization_intervals([(sampler, 
+                                             sample, 
+                                             logW, 
+                                             cov_target, 
+                                             cov_target_score)],
+                                           observed_target,
+                                           nsample,
+                                           normal_sample=normal_sample)
+        pivots.append(intervals.pivot_grid(linear_func, candidates))
+    np.testing.assert_allclose(pivots[0], pivots[1], atol=1.e-10)
+
+@set_seed_iftrue(True)
+def test_log_density_cache(ndraw=1000,
+                           burnin=200):
+    """
+    Terms of the conditional density along each target's ray
+    are reused across pivots until a new sample is drawn
+    """
+
+    (conv, 
+     observed_target, 
+     cov_target, 
+     cov_target_score, 
+     alternatives) = _selected_lasso()
+
+    sampler = conv.sampler
+    opt_sample, opt_logW = sampler.sample(ndraw, burnin)
+    intervals = optimization_intervals([(sampler, 
+                                         opt_sample, 
+                                         opt_logW, 
+                                         cov_target, 
+                                         cov_target_score)],
+                                       observed_target,
+                                       ndraw)
+
+    ntarget = observed_target.shape[0]
+    hits, misses = sampler.cache_hits, sampler.cache_misses
+    pivots = []
+    for _ in range(2):
+        for i in range(ntarget):
+            linear_func = np.zeros(ntarget)
+            linear_func[i] = 1
+            pivots.append(intervals.pivot(linear_func, 0))
+    np.testing.assert_allclose(pivots[:ntarget], pivots[ntarget:])
+    nt.assert_equal(sampler.cache_misses - misses, ntarget)
+    nt.assert_equal(sampler.cache_hits - hits, ntarget)
+
+    sampler.sample(ndraw, burnin)
+    nt.assert_equal(len(sampler._rays), 0)
+
+@set_seed_iftrue(True)
+def test_summary_single_pass(ndraw=2000,
+                             burnin=500):
+    """
+    Pivots and p-values from summary agree with separate
+    calls to coefficient_pvalues and the sampler's terms
+    are computed once per target
+    """
+
+    (conv, 
+     observed_target, 
+     cov_target, 
+     cov_target_score, 
+     alternatives) = _selected_lasso()
+
+    sampler = conv.sampler
+    sample = sampler.sample(ndraw, burnin)
+    normal_sample = np.random.multivariate_normal(np.zeros(observed_target.shape[0]),
+                                                  cov_target,
+                                                  size=(ndraw,))
+    parameter = 0.5 * observed_target
+
+    misses = sampler.cache_misses
+    result = conv.summary(observed_target,
+                          cov_target,
+                          cov_target_score,
+                          alternatives,
+                          opt_sample=sample,
+                          target_sample=normal_sample,
+                          parameter=parameter)
+    nt.assert_equal(sampler.cache_misses - misses, observed_target.shape[0])
+
+    for column, value in [('pivot', parameter), 
+                          ('pvalue', np.zeros_like(parameter))]:
+        pvalues = sampler.coefficient_pvalues(observed_target,
+                                              cov_target,
+                                              cov_target_score,
+                                              parameter=value,
+                                              sample=sample,
+                                              normal_sample=normal_sample,
+                                              alternatives=alternatives)
+        np.testing.assert_allclose(result[column], pvalues, atol=1.e-10)
+
+
+    # intervals grown around the MLE intervals agree with a grid search
+
+    result = conv.summary(observed_target,
+                          cov_target,
+                          cov_target_score,
+                          alternatives,
+                          opt_sample=sample,
+                          target_sample=normal_sample,
+                          compute_intervals=True)
+
+    intervals = optimization_intervals([(sampler, 
+                                         sample[0], 
+                                         sample[1], 
+                                         cov_target, 
+                                         cov_target_score)],
+                                       observed_target,
+                                       ndraw,
+                                       normal_sample=normal_sample)
+
+    for i in range(observed_target.shape[0]):
+        keep = np.zeros_like(observed_target)
+        keep[i] = 1.
+        np.testing.assert_allclose(result[['lower_confidence', 'upper_confidence']].iloc[i],
+                                   intervals.confidence_interval(keep),
+                                   atol=1.e-2 * np.sqrt(cov_target[i, i]))
 
 def main(nsim=500, n=500, p=100, sigma=3):
 
@@ -5,7 +5,10 @@ from scipy.stats import norm as ndist
 from ...tests.instance import gaussian_instance, HIV_NRTI
 from ..lasso import lasso, selected_targets, split_lasso
 from ..posterior_inference import (langevin_sampler,
-                                   gibbs_sampler)
+                                   gibbs_sampler,
+                                   multichain_langevin_sampler,
+                                   split_rhat,
+                                   effective_sample_size)
 
 def test_Langevin(n=500,
                   p=100,
@@ -123,6 +126,96 @@ def test_instance(nsample=100, nburnin=50):
     return np.mean(coverage), np.mean(length)
 
 
+def test_log_posterior_cache():
+
+    n, p, s = 500, 100, 5
+    X = np.random.standard_normal((n, p))
+    Y = np.random.standard_normal(n)
+
+    scale_ = np.std(Y)
+    L = lasso.gaussian(X, Y, 3 * scale_ * np.sqrt(2 * np.log(p) * np.sqrt(n)))
+    signs = L.fit()
+    E = (signs != 0)
+
+    M = E.copy()
+    M[-3:] = 1
+    dispersion = np.linalg.norm(Y - X[:, M].dot(np.linalg.pinv(X[:, M]).dot(Y))) ** 2 / (n - M.sum())
+    (observed_target,
+     cov_target,
+     cov_target_score,
+     alternatives) = selected_targets(L.loglike,
+                                      L._W,
+                                      M,
+                                      dispersion=dispersion)
+
+    posterior_inf = L.posterior(observed_target,
+                                cov_target,
+                                cov_target_score,
+                                dispersion=dispersion)
+
+    value, grad = posterior_inf.log_posterior(observed_target)
+    assert len(posterior_inf._solutions) == 1
+
+    # a second call at the same parameter is not solved again
+
+    value2, grad2 = posterior_inf.log_posterior(observed_target)
+    assert len(posterior_inf._solutions) == 1
+    assert value == value2
+    np.testing.assert_array_equal(grad, grad2)
+
+    for i in range(2 * posterior_inf.cache_size):
+        posterior_inf.log_posterior(observed_target + 0.01 * i)
+    assert len(posterior_inf._solutions) == posterior_inf.cache_size
+
+
+def test_multichain(nchain=3, nsample=100, nburnin=50):
+
+    n, p, s = 500, 100, 5
+    X = np.random.standard_normal((n, p))
+    Y = np.random.standard_normal(n)
+
+    scale_ = np.std(Y)
+    L = lasso.gaussian(X, Y, 3 * scale_ * np.sqrt(2 * np.log(p) * np.sqrt(n)))
+    signs = L.fit()
+    E = (signs != 0)
+
+    M = E.copy()
+    M[-3:] = 1
+    dispersion = np.linalg.norm(Y - X[:, M].dot(np.linalg.pinv(X[:, M]).dot(Y))) ** 2 / (n - M.sum())
+    (observed_target,
+     cov_target,
+     cov_target_score,
+     alternatives) = selected_targets(L.loglike,
+                                      L._W,
+                                      M,
+                                      dispersion=dispersion)
+
+    posterior_inf = L.posterior(observed_target,
+                                cov_target,
+                                cov_target_score,
+                                dispersion=dispersion)
+
+    samples, ess, rhat = multichain_langevin_sampler(posterior_inf,
+                                                     nchain=nchain,
+                                                     nsample=nsample,
+                                                     nburnin=nburnin)
+
+    assert samples.shape == (nchain, nsample - nburnin, M.sum())
+    assert ess.shape == rhat.shape == (M.sum(),)
+
+def test_diagnostics():
+
+    Z = np.random.standard_normal((4, 2000, 3))
+    np.testing.assert_allclose(split_rhat(Z), 1, atol=0.02)
+    assert np.all(effective_sample_size(Z) > 4000)
+
+    # a random walk mixes poorly
+
+    W = np.cumsum(Z, 1)
+    assert np.all(split_rhat(W) > 1.1)
+    assert np.all(effective_sample_size(W) < 200)
+
+
 def test_flexible_prior1(nsample=100, nburnin=50):
 
     np.random.seed(0)
@@ -1,4 +1,5 @@
 from .langevin import projected_langevin
 from .truncnorm import (sample_truncnorm_white, 
+                        sample_truncnorm_white_many,
                         sample_truncnorm_white_sphere,
                         sample_truncnorm_white_ball)
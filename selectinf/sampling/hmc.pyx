@@ -0,0 +1,200 @@
+"""
+Exact Hamiltonian Monte Carlo for a standard Gaussian
+truncated to linear and quadratic inequalities, as in
+Pakman and Paninski (2014). The sampler itself is
+`HmcSampler` in `selectinf/src_C`.
+"""
+
+import numpy as np
+cimport numpy as cnp
+
+DTYPE_float = np.float
+ctypedef cnp.float_t DTYPE_float_t
+
+cdef extern from "preparation_Eig_Vect.h":
+    void samples(int n,
+                 int dim,
+                 int seed,
+                 double* initial,
+                 int numlin,
+                 int numquad,
+                 double* lin,
+                 double* quad,
+                 double* quad_lin,
+                 double* offset_lin,
+                 double* offset_quad,
+                 double* samples_Carray) nogil
+
+def quad_sampler(int n_sample,
+                 initial,
+                 quad,
+                 quad_lin,
+                 lin,
+                 offset_quad,
+                 offset_lin,
+                 random_state=None):
+    r"""
+    Sample from $N(0,I)$ restricted to
+
+    .. math::
+
+         \{x: x^TQ_ix + L_i^Tx \leq c_i, Ax \leq b\}
+
+    Parameters
+    ----------
+
+    n_sample : int
+        How many samples should we return?
+
+    initial : np.float(n)
+        Initial point, assumed to satisfy the constraints.
+
+    quad : np.float((l,n,n))
+        Quadratic parts $Q_i$, possibly of shape `(0,n,n)`.
+
+    quad_lin : np.float((l,n))
+        Linear parts $L_i$ of the quadratic constraints.
+
+    lin : np.float((q,n))
+        Linear part $A$ of affine constraints, possibly of
+        shape `(0,n)`.
+
+    offset_quad : np.float(l)
+        Offsets $c_i$ of the quadratic constraints.
+
+    offset_lin : np.float(q)
+        Offset $b$ of affine constraints.
+
+    random_state : np.random.RandomState (optional)
+        Source of the seed of the sampler. Defaults to `np.random`.
+
+    Returns
+    -------
+
+    samples : np.float((n_sample, n))
+
+    """
+
+    if random_state is None:
+        random_state = np.random
+
+    cdef int p = np.asarray(initial).shape[0]
+    cdef cnp.ndarray[DTYPE_float_t, ndim=1] initial2 = \
+        np.ascontiguousarray(initial, np.float)
+
+    # the sampler's constraints are $f^Tx + g \geq 0$
+    # and $x^TAx + B^Tx + C \geq 0$
+
+    cdef cnp.ndarray[DTYPE_float_t, ndim=3] quad2 = \
+        np.ascontiguousarray(-np.asarray(quad, np.float).reshape((-1, p, p)))
+    cdef cnp.ndarray[DTYPE_float_t, ndim=2] quad_lin2 = \
+        np.ascontiguousarray(-np.asarray(quad_lin, np.float).reshape((-1, p)))
+    cdef cnp.ndarray[DTYPE_float_t, ndim=1] offset_quad2 = \
+        np.ascontiguousarray(offset_quad, np.float).reshape(-1)
+    cdef cnp.ndarray[DTYPE_float_t, ndim=2] lin2 = \
+        np.ascontiguousarray(-np.asarray(lin, np.float).reshape((-1, p)))
+    cdef cnp.ndarray[DTYPE_float_t, ndim=1] offset_lin2 = \
+        np.ascontiguousarray(offset_lin, np.float).reshape(-1)
+
+    cdef int numquad = quad2.shape[0]
+    cdef int numlin = lin2.shape[0]
+
+    if ((numlin > 0 and np.any(lin2.dot(initial2) + offset_lin2 < 0)) or
+        (numquad > 0 and np.any(np.einsum('i,kij,j->k', initial2, quad2, initial2) +
+                                quad_lin2.dot(initial2) + offset_quad2 < 0))):
+        raise ValueError('initial point does not satisfy the constraints')
+
+    cdef double *pt_quad = NULL
+    cdef double *pt_quad_lin = NULL
+    cdef double *pt_quad_offset = NULL
+    if numquad > 0:
+        pt_quad = &quad2[0, 0, 0]
+        pt_quad_lin = &quad_lin2[0, 0]
+        pt_quad_offset = &offset_quad2[0]
+
+    cdef double *pt_lin = NULL
+    cdef double *pt_lin_offset = NULL
+    if numlin > 0:
+        pt_lin = &lin2[0, 0]
+        pt_lin_offset = &offset_lin2[0]
+
+    cdef int seed = random_state.randint(1, 2**31 - 1)
+
+    cdef cnp.ndarray[DTYPE_float_t, ndim=2] samples_array = \
+        np.empty((n_sample, p), np.float)
+
+    if n_sample > 0:
+        with nogil:
+            samples(n_sample,
+                    p,
+                    seed,
+                    &initial2[0],
+                    numlin,
+                    numquad,
+                    pt_lin,
+                    pt_quad,
+                    pt_quad_lin,
+                    pt_lin_offset,
+                    pt_quad_offset,
+                    &samples_array[0, 0])
+
+    return samples_array
+
+def sample_truncnorm_white_hmc(A,
+                               b,
+                               initial,
+                               sigma=1.,
+                               burnin=500,
+                               ndraw=1000,
+                               random_state=None):
+    r"""
+    Sample from a truncated normal with covariance
+    equal to sigma**2 I using exact HMC.
+
+    Constraint is $Ax \leq b$ where `A` has shape
+    `(q,n)` with `q` the number of constraints and
+    `n` the number of random variables.
+
+    Parameters
+    ----------
+
+    A : np.float((q,n))
+        Linear part of affine constraints.
+
+    b : np.float(q)
+        Offset part of affine constraints.
+
+    initial : np.float(n)
+        Initial point for the HMC trajectories.
+        Assumed to satisfy the constraints.
+
+    sigma : float
+        Variance parameter.
+
+    burnin : int
+        How many iterations until we start
+        recording samples?
+
+    ndraw : int
+        How many samples should we return?
+
+    random_state : np.random.RandomState (optional)
+        Source of the seed of the sampler. Defaults to `np.random`.
+
+    Returns
+    -------
+
+    trunc_sample : np.float((ndraw, n))
+
+    """
+
+    nvar = A.shape[1]
+    trunc_sample = quad_sampler(burnin + ndraw,
+                                np.asarray(initial) / sigma,
+                                np.zeros((0, nvar, nvar)),
+                                np.zeros((0, nvar)),
+                                A,
+                                np.zeros(0),
+                                np.asarray(b) / sigma,
+                                random_state=random_state)
+    return trunc_sample[burnin:] * sigma
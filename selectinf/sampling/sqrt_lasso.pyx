@@ -1,9 +1,8 @@
 import numpy as np, cython
 cimport numpy as cnp
 
-from libc.math cimport pow, sqrt, log, exp # sin, cos, acos, asin, sqrt, fabs
-from scipy.special import ndtr, ndtri
-from scipy.stats import beta, norm as ndist
+from libc.math cimport pow, sqrt, log, exp, fabs, isnan, INFINITY # sin, cos, acos, asin
+from scipy.special.cython_special cimport ndtr, ndtri, btdtr, btdtri
 
 cdef double PI = np.pi
 
@@ -33,6 +32,7 @@ def sample_sqrt_lasso(cnp.ndarray[DTYPE_float_t, ndim=2] A,
                       DTYPE_int_t how_often=1000,
                       DTYPE_int_t burnin=500,
                       DTYPE_int_t ndraw=1000,
+                      random_state=None,
                       ):
     """
     Sample from null distribution in sqrt LASSO.
@@ -88,6 +88,10 @@ def sample_sqrt_lasso(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     ndraw : int
         How many samples should we return?
 
+    random_state : np.random.RandomState (optional)
+        Source of the uniforms, directions and coordinate
+        orders drawn before sampling. Defaults to `np.random`.
+
     Returns
     -------
 
@@ -107,6 +111,7 @@ def sample_sqrt_lasso(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     cdef int idx, iter_count, irow, ivar
     cdef double lower_bound, upper_bound, V
     cdef double tval, dval, val, alpha
+    cdef double cdfL, cdfU, unif, tnorm
     cdef double norm_state_bound_sq = RSS_max - RSS_1
     cdef double norm_state_sq = norm_state_bound_sq
     cdef cnp.ndarray[DTYPE_float_t, ndim=1] effective_offset = \
@@ -119,14 +124,16 @@ def sample_sqrt_lasso(cnp.ndarray[DTYPE_float_t, ndim=2] A,
 
     cdef cnp.ndarray[DTYPE_float_t, ndim=1] Astate = np.dot(A, state) 
 
-    cdef cnp.ndarray[DTYPE_float_t, ndim=1] usample = \
-        np.random.sample(burnin + ndraw)
+    if random_state is None:
+        random_state = np.random
 
+    cdef cnp.ndarray[DTYPE_float_t, ndim=1] usample = \
+        random_state.random_sample(burnin + ndraw)
     # directions not parallel to coordinate axes
 
     cdef cnp.ndarray[DTYPE_float_t, ndim=2] directions = \
         np.vstack([A, 
-                   np.random.standard_normal((int(nvar/5),nvar))])
+                   random_state.standard_normal((int(nvar/5),nvar))])
     directions[-1][:] = bias_direction
 
     directions /= np.sqrt((directions**2).sum(1))[:,None]
@@ -147,10 +154,10 @@ def sample_sqrt_lasso(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     # choose the order of sampling (randomly)
 
     cdef cnp.ndarray[DTYPE_intp_t, ndim=1] random_idx_dir = \
-        np.random.random_integers(0, ndir-1, size=(burnin+ndraw,)).astype(np.intp)
+        random_state.random_integers(0, ndir-1, size=(burnin+ndraw,)).astype(np.intp)
 
     cdef cnp.ndarray[DTYPE_intp_t, ndim=1] random_idx_coord = \
-        np.random.random_integers(0, nvar-1, size=(burnin+ndraw,)).astype(np.intp)
+        random_state.random_integers(0, nvar-1, size=(burnin+ndraw,)).astype(np.intp)
 
     # for switching between coordinate updates and
     # other directions
@@ -167,208 +174,214 @@ def sample_sqrt_lasso(cnp.ndarray[DTYPE_float_t, ndim=2] A,
 
     iter_count = 0
 
-    # this one is for RSS_1
-    beta_1_rv = beta(df_1*0.5, (df_max - nvar)*0.5)
+    # RSS_1 / (RSS_max - norm_state_sq) is Beta(beta_a, beta_b)
+    cdef double beta_a = df_1 * 0.5
+    cdef double beta_b = (df_max - nvar) * 0.5
 
     # this is what we use to sample
     # norm_rv = lambda x: np.exp(-(x**2).sum()/2.)
 
-    while True:
+    with nogil:
+        while True:
 
-        # sample from the ball
+            # sample from the ball
 
-        docoord = 1
-        iperiod = iperiod + 1
-        ibias = ibias + 1
+            docoord = 1
+            iperiod = iperiod + 1
+            ibias = ibias + 1
 
-        if iperiod == invperiod: 
-            docoord = 0
-            iperiod = 0
-            dobias = 0
+            if iperiod == invperiod: 
+                docoord = 0
+                iperiod = 0
+                dobias = 0
 
-        if ibias == how_often:
-            docoord = 0
-            ibias = 0
-            dobias = 1
+            if ibias == how_often:
+                docoord = 0
+                ibias = 0
+                dobias = 1
         
-        # V is the current value of np.dot(direction, state)
-
-        if docoord == 1:
-            idx = random_idx_coord[iter_count  % (ndraw + burnin)]
-            V = state[idx]
-        else:
-            if not dobias:
-                idx = random_idx_dir[iter_count  % (ndraw + burnin)]
-            else:
-                idx = directions.shape[0]-1 # last row of directions is bias_direction
-            V = 0
-            for ivar in range(nvar):
-                V = V + directions[idx, ivar] * state[ivar]
-
-        # compute the slice in the chosen direction
+            # V is the current value of np.dot(direction, state)
 
-        lower_bound = -1e12
-        upper_bound = 1e12
-        for irow in range(nconstraint):
             if docoord == 1:
-                alpha = alphas_coord[irow,idx]
-                val = (-Astate[irow] + effective_offset[irow]) / alpha + V
-                if alpha > alphas_max_coord[idx] and (val < upper_bound):
-                    upper_bound = val
-                elif alpha < -alphas_max_coord[idx] and (val > lower_bound):
-                    lower_bound = val
-            else:
-                alpha = alphas_dir[irow,idx]
-                val = (-Astate[irow] + effective_offset[irow]) / alpha + V
-                if alpha > alphas_max_dir[idx] and (val < upper_bound):
-                    upper_bound = val
-                elif alpha < -alphas_max_dir[idx] and (val > lower_bound):
-                    lower_bound = val
-
-        if lower_bound > V:
-            lower_bound = V - tol 
-        elif upper_bound < V:
-            upper_bound = V + tol 
-
-        # intersect the line segment with the ball
-        # 
-        # below, discriminant is the sqaure root of 
-        # the squared overall bound on the length
-        # minus the current norm of P_{\eta}^{\perp}y
-        # where eta is the current direction of movement
-
-        discriminant = sqrt(norm_state_bound_sq - (norm_state_sq - V*V))
-
-        if np.isnan(discriminant):
-            upper_bound = V
-            lower_bound = V
-        else:
-            if upper_bound > discriminant:
-                upper_bound = discriminant
-            if lower_bound < - discriminant:
-                lower_bound = - discriminant
-
-        lower_bound = lower_bound / sigma
-        upper_bound = upper_bound / sigma
-
-        if upper_bound < -10: # use Exp approximation
-            # the approximation is that
-            # Z | lower_bound < Z < upper_bound
-            # is fabs(upper_bound) * (upper_bound - Z) = E approx Exp(1)
-            # so Z = upper_bound - E / fabs(upper_bound)
-            # and the truncation of the exponential is
-            # E < fabs(upper_bound - lower_bound) * fabs(upper_bound) = D
-
-            # this has distribution function (1 - exp(-x)) / (1 - exp(-D))
-            # so to draw from this distribution
-            # we set E = - log(1 - U * (1 - exp(-D))) where U is Unif(0,1)
-            # and Z (= tnorm below) is as stated
-
-            unif = usample[iter_count] * (1 - exp(-np.fabs(
-                        lower_bound - upper_bound) * upper_bound))
-            tnorm = (upper_bound + log(1 - unif) / np.fabs(upper_bound)) * sigma
-        elif lower_bound > 10:
-
-            # here Z = lower_bound + E / fabs(lower_bound) (though lower_bound is positive)
-            # and D = fabs((upper_bound - lower_bound) * lower_bound)
-            unif = usample[iter_count] * (1 - exp(-np.fabs(
-                        upper_bound - lower_bound) * lower_bound))
-            tnorm = (lower_bound - log(1 - unif) / lower_bound) * sigma
-        elif lower_bound < 0:
-            cdfL = ndtr(lower_bound)
-            cdfU = ndtr(upper_bound)
-            unif = usample[iter_count] * (cdfU - cdfL) + cdfL
-            if unif < 0.5:
-                tnorm = ndtri(unif) * sigma
+                idx = random_idx_coord[iter_count  % (ndraw + burnin)]
+                V = state[idx]
             else:
-                tnorm = -ndtri(1-unif) * sigma
-        else:
-            cdfL = ndtr(-lower_bound)
-            cdfU = ndtr(-upper_bound)
-            unif = usample[iter_count] * (cdfL - cdfU) + cdfU
-            if unif < 0.5:
-                tnorm = -ndtri(unif) * sigma
-            else:
-                tnorm = ndtri(1-unif) * sigma
-
-        tval = tnorm
-
-        # update the state vector
-
-        if docoord == 1:
-            state[idx] = tval
-            dval = tval - V
+                if not dobias:
+                    idx = random_idx_dir[iter_count  % (ndraw + burnin)]
+                else:
+                    idx = ndir-1 # last row of directions is bias_direction
+                V = 0
+                for ivar in range(nvar):
+                    V = V + directions[idx, ivar] * state[ivar]
+
+            # compute the slice in the chosen direction
+
+            lower_bound = -1e12
+            upper_bound = 1e12
             for irow in range(nconstraint):
-                Astate[irow] = Astate[irow] + dval * A[irow, idx]
-        else:
-            dval = tval - V
-            for ivar in range(nvar):
-                state[ivar] = state[ivar] + dval * directions[idx,ivar]
-                for irow in range(nconstraint):
-                    Astate[irow] = (Astate[irow] + A[irow, ivar] * 
-                                    dval * directions[idx,ivar])
+                if docoord == 1:
+                    alpha = alphas_coord[irow,idx]
+                    val = (-Astate[irow] + effective_offset[irow]) / alpha + V
+                    if alpha > alphas_max_coord[idx] and (val < upper_bound):
+                        upper_bound = val
+                    elif alpha < -alphas_max_coord[idx] and (val > lower_bound):
+                        lower_bound = val
+                else:
+                    alpha = alphas_dir[irow,idx]
+                    val = (-Astate[irow] + effective_offset[irow]) / alpha + V
+                    if alpha > alphas_max_dir[idx] and (val < upper_bound):
+                        upper_bound = val
+                    elif alpha < -alphas_max_dir[idx] and (val > lower_bound):
+                        lower_bound = val
+
+            if lower_bound > V:
+                lower_bound = V - tol 
+            elif upper_bound < V:
+                upper_bound = V + tol 
+
+            # intersect the line segment with the ball
+            # 
+            # below, discriminant is the sqaure root of 
+            # the squared overall bound on the length
+            # minus the current norm of P_{\eta}^{\perp}y
+            # where eta is the current direction of movement
 
-        if sample_count >= burnin:
-            for ivar in range(nvar):
-                trunc_sample[sample_count-burnin, ivar] = state[ivar] 
-            trunc_sample[sample_count-burnin, nvar] = RSS_1
+            discriminant = sqrt(norm_state_bound_sq - (norm_state_sq - V*V))
 
-        # compute squared norm of current state
+            if isnan(discriminant):
+                upper_bound = V
+                lower_bound = V
+            else:
+                if upper_bound > discriminant:
+                    upper_bound = discriminant
+                if lower_bound < - discriminant:
+                    lower_bound = - discriminant
+
+            lower_bound = lower_bound / sigma
+            upper_bound = upper_bound / sigma
+
+            if upper_bound < -10: # use Exp approximation
+                # the approximation is that
+                # Z | lower_bound < Z < upper_bound
+                # is fabs(upper_bound) * (upper_bound - Z) = E approx Exp(1)
+                # so Z = upper_bound - E / fabs(upper_bound)
+                # and the truncation of the exponential is
+                # E < fabs(upper_bound - lower_bound) * fabs(upper_bound) = D
+
+                # this has distribution function (1 - exp(-x)) / (1 - exp(-D))
+                # so to draw from this distribution
+                # we set E = - log(1 - U * (1 - exp(-D))) where U is Unif(0,1)
+                # and Z (= tnorm below) is as stated
+
+                unif = usample[iter_count] * (1 - exp(-fabs(
+                            lower_bound - upper_bound) * upper_bound))
+                tnorm = (upper_bound + log(1 - unif) / fabs(upper_bound)) * sigma
+            elif lower_bound > 10:
+
+                # here Z = lower_bound + E / fabs(lower_bound) (though lower_bound is positive)
+                # and D = fabs((upper_bound - lower_bound) * lower_bound)
+                unif = usample[iter_count] * (1 - exp(-fabs(
+                            upper_bound - lower_bound) * lower_bound))
+                tnorm = (lower_bound - log(1 - unif) / lower_bound) * sigma
+            elif lower_bound < 0:
+                cdfL = ndtr(lower_bound)
+                cdfU = ndtr(upper_bound)
+                unif = usample[iter_count] * (cdfU - cdfL) + cdfL
+                if unif < 0.5:
+                    tnorm = ndtri(unif) * sigma
+                else:
+                    tnorm = -ndtri(1-unif) * sigma
+            else:
+                cdfL = ndtr(-lower_bound)
+                cdfU = ndtr(-upper_bound)
+                unif = usample[iter_count] * (cdfL - cdfU) + cdfU
+                if unif < 0.5:
+                    tnorm = -ndtri(unif) * sigma
+                else:
+                    tnorm = ndtri(1-unif) * sigma
 
-        norm_state_sq = 0
-        for ivar in range(nvar):
-            norm_state_sq = norm_state_sq + state[ivar]*state[ivar]
+            tval = tnorm
 
-        # weight has to now be computed
-        # based on the normal approximation compared to true distribution            
+            # update the state vector
 
-        weight_sample[sample_count-burnin] = (pow(1. - norm_state_sq / norm_state_bound_sq, 0.5 * (df_max - df_1) - 1) / 
-                                              exp(-norm_state_sq / (2 * sigma**2)))
+            if docoord == 1:
+                state[idx] = tval
+                dval = tval - V
+                for irow in range(nconstraint):
+                    Astate[irow] = Astate[irow] + dval * A[irow, idx]
+            else:
+                dval = tval - V
+                for ivar in range(nvar):
+                    state[ivar] = state[ivar] + dval * directions[idx,ivar]
+                    for irow in range(nconstraint):
+                        Astate[irow] = (Astate[irow] + A[irow, ivar] * 
+                                        dval * directions[idx,ivar])
 
-        if iter_count % 30 == 0:
-            # now we sample RSS_1
+            if sample_count >= burnin:
+                for ivar in range(nvar):
+                    trunc_sample[sample_count-burnin, ivar] = state[ivar] 
+                trunc_sample[sample_count-burnin, nvar] = RSS_1
 
-            lower_bound_RSS = 0.
-            upper_bound_RSS = np.inf
+            # compute squared norm of current state
 
-            for irow in range(nconstraint):
-                if RHS_offset[irow] > 0:
-                    RSS_bound_lhs = (Astate[irow] + LHS_offset[irow]) / RHS_offset[irow]
-                    if RSS_bound_lhs > lower_bound_RSS:
-                        lower_bound_RSS = RSS_bound_lhs
-                elif RHS_offset[irow] < 0:
-                    RSS_bound_lhs = (Astate[irow] + LHS_offset[irow]) / RHS_offset[irow]
-                    if RSS_bound_lhs < upper_bound_RSS:
-                        upper_bound_RSS = RSS_bound_lhs
-
-            if lower_bound_RSS > upper_bound_RSS:
-                raise ValueError('RSS inequalities not satisfied')
-
-            lower_bound_RSS = lower_bound_RSS**2
-            upper_bound_RSS = min(upper_bound_RSS**2, RSS_max - norm_state_sq)
-
-            # with the squared length of state at norm_state_sq
-            # RSS_1 is between 0 and RSS_max - norm_state_sq
-            # 
-            # we therefore draw from beta(df_1/2, (df_max-nvar)/2)
-            # truncated to [lower_bound_RSS, upper_bound_RSS]
+            norm_state_sq = 0
+            for ivar in range(nvar):
+                norm_state_sq = norm_state_sq + state[ivar]*state[ivar]
 
-            lower_bound_RSS = lower_bound_RSS / (RSS_max - norm_state_sq)
-            upper_bound_RSS = upper_bound_RSS / (RSS_max - norm_state_sq)
+            # weight has to now be computed
+            # based on the normal approximation compared to true distribution            
 
-            cdfL = beta_1_rv.cdf(lower_bound_RSS)
-            cdfU = beta_1_rv.cdf(upper_bound_RSS)
-            unif = usample[iter_count] * (cdfU - cdfL) + cdfL
-            RSS_1 = beta_1_rv.ppf(unif) * (RSS_max - norm_state_sq)
+            weight_sample[sample_count-burnin] = (pow(1. - norm_state_sq / norm_state_bound_sq, 0.5 * (df_max - df_1) - 1) / 
+                                                  exp(-norm_state_sq / (2 * sigma**2)))
 
-            norm_state_bound_sq = RSS_max - RSS_1
+            if iter_count % 30 == 0:
+                # now we sample RSS_1
 
-        # check to see if we've drawn enough samples
+                lower_bound_RSS = 0.
+                upper_bound_RSS = INFINITY
 
-        sample_count = sample_count + 1
-        iter_count = iter_count + 1
-        if sample_count >= ndraw + burnin:
-            break
+                for irow in range(nconstraint):
+                    if RHS_offset[irow] > 0:
+                        RSS_bound_lhs = (Astate[irow] + LHS_offset[irow]) / RHS_offset[irow]
+                        if RSS_bound_lhs > lower_bound_RSS:
+                            lower_bound_RSS = RSS_bound_lhs
+                    elif RHS_offset[irow] < 0:
+                        RSS_bound_lhs = (Astate[irow] + LHS_offset[irow]) / RHS_offset[irow]
+                        if RSS_bound_lhs < upper_bound_RSS:
+                            upper_bound_RSS = RSS_bound_lhs
+
+                if lower_bound_RSS > upper_bound_RSS:
+                    with gil:
+                        raise ValueError('RSS inequalities not satisfied')
+
+                lower_bound_RSS = lower_bound_RSS**2
+                upper_bound_RSS = min(upper_bound_RSS**2, RSS_max - norm_state_sq)
+
+                # with the squared length of state at norm_state_sq
+                # RSS_1 is between 0 and RSS_max - norm_state_sq
+                # 
+                # we therefore draw from beta(df_1/2, (df_max-nvar)/2)
+                # truncated to [lower_bound_RSS, upper_bound_RSS]
+
+                lower_bound_RSS = lower_bound_RSS / (RSS_max - norm_state_sq)
+                upper_bound_RSS = upper_bound_RSS / (RSS_max - norm_state_sq)
+
+                if upper_bound_RSS > 1:
+                    upper_bound_RSS = 1.
+
+                cdfL = btdtr(beta_a, beta_b, lower_bound_RSS)
+                cdfU = btdtr(beta_a, beta_b, upper_bound_RSS)
+                unif = usample[iter_count] * (cdfU - cdfL) + cdfL
+                RSS_1 = btdtri(beta_a, beta_b, unif) * (RSS_max - norm_state_sq)
+
+                norm_state_bound_sq = RSS_max - RSS_1
+
+            # check to see if we've drawn enough samples
+
+            sample_count = sample_count + 1
+            iter_count = iter_count + 1
+            if sample_count >= ndraw + burnin:
+                break
 
 
     return trunc_sample, weight_sample
@@ -391,6 +404,7 @@ def sample_sqrt_lasso_segment(cnp.ndarray[DTYPE_float_t, ndim=2] A,
                               DTYPE_int_t how_often=1000,
                               DTYPE_int_t burnin=500,
                               DTYPE_int_t ndraw=1000,
+                              random_state=None,
                               ):
     """
     Sample from null distribution in sqrt LASSO.
@@ -446,6 +460,10 @@ def sample_sqrt_lasso_segment(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     ndraw : int
         How many samples should we return?
 
+    random_state : np.random.RandomState (optional)
+        Source of the uniforms, directions and coordinate
+        orders drawn before sampling. Defaults to `np.random`.
+
     Returns
     -------
 
@@ -465,6 +483,7 @@ def sample_sqrt_lasso_segment(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     cdef int idx, iter_count, irow, ivar
     cdef double lower_bound, upper_bound, V
     cdef double tval, dval, val, alpha
+    cdef double cdfL, cdfU, unif, tnorm
     cdef double norm_state_bound_sq = RSS_max - RSS_1
     cdef double norm_state_sq = norm_state_bound_sq
     cdef cnp.ndarray[DTYPE_float_t, ndim=1] effective_offset = \
@@ -477,14 +496,22 @@ def sample_sqrt_lasso_segment(cnp.ndarray[DTYPE_float_t, ndim=2] A,
 
     cdef cnp.ndarray[DTYPE_float_t, ndim=1] Astate = np.dot(A, state) 
 
+    if random_state is None:
+        random_state = np.random
+
     cdef cnp.ndarray[DTYPE_float_t, ndim=1] usample = \
-        np.random.sample(burnin + ndraw)
+        random_state.random_sample(burnin + ndraw)
+
+    # uniforms for placing each draw within its grid cell
+
+    cdef cnp.ndarray[DTYPE_float_t, ndim=1] gsample = \
+        random_state.random_sample(burnin + ndraw)
 
     # directions not parallel to coordinate axes
 
     cdef cnp.ndarray[DTYPE_float_t, ndim=2] directions = \
         np.vstack([A, 
-                   np.random.standard_normal((int(nvar/5),nvar))])
+                   random_state.standard_normal((int(nvar/5),nvar))])
     directions[-1][:] = bias_direction
 
     directions /= np.sqrt((directions**2).sum(1))[:,None]
@@ -505,10 +532,10 @@ def sample_sqrt_lasso_segment(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     # choose the order of sampling (randomly)
 
     cdef cnp.ndarray[DTYPE_intp_t, ndim=1] random_idx_dir = \
-        np.random.random_integers(0, ndir-1, size=(burnin+ndraw,)).astype(np.intp)
+        random_state.random_integers(0, ndir-1, size=(burnin+ndraw,)).astype(np.intp)
 
     cdef cnp.ndarray[DTYPE_intp_t, ndim=1] random_idx_coord = \
-        np.random.random_integers(0, nvar-1, size=(burnin+ndraw,)).astype(np.intp)
+        random_state.random_integers(0, nvar-1, size=(burnin+ndraw,)).astype(np.intp)
 
     # grid for evaluating density along
 
@@ -520,6 +547,7 @@ def sample_sqrt_lasso_segment(cnp.ndarray[DTYPE_float_t, ndim=2] A,
         np.empty(ngrid, np.float)
     cdef int igrid = 0
     cdef double sum_density = 0.
+    cdef double norm_perp_proj_sq
 
     # for switching between coordinate updates and
     # other directions
@@ -536,186 +564,193 @@ def sample_sqrt_lasso_segment(cnp.ndarray[DTYPE_float_t, ndim=2] A,
 
     iter_count = 0
 
-    # this one is for RSS_1
-    beta_1_rv = beta(df_1*0.5, (df_max - nvar)*0.5)
+    # RSS_1 / (RSS_max - norm_state_sq) is Beta(beta_a, beta_b)
+    cdef double beta_a = df_1 * 0.5
+    cdef double beta_b = (df_max - nvar) * 0.5
 
     # this is what we use to sample
     # norm_rv = lambda x: np.exp(-(x**2).sum()/2.)
 
-    while True:
+    with nogil:
+        while True:
 
-        # sample from the ball
+            # sample from the ball
 
-        docoord = 1
-        iperiod = iperiod + 1
-        ibias = ibias + 1
+            docoord = 1
+            iperiod = iperiod + 1
+            ibias = ibias + 1
 
-        if iperiod == invperiod: 
-            docoord = 0
-            iperiod = 0
-            dobias = 0
+            if iperiod == invperiod: 
+                docoord = 0
+                iperiod = 0
+                dobias = 0
 
-        if ibias == how_often:
-            docoord = 0
-            ibias = 0
-            dobias = 1
+            if ibias == how_often:
+                docoord = 0
+                ibias = 0
+                dobias = 1
         
-        # V is the current value of np.dot(direction, state)
-
-        if docoord == 1:
-            idx = random_idx_coord[iter_count  % (ndraw + burnin)]
-            V = state[idx]
-        else:
-            if not dobias:
-                idx = random_idx_dir[iter_count  % (ndraw + burnin)]
-            else:
-                idx = directions.shape[0]-1 # last row of directions is bias_direction
-            V = 0
-            for ivar in range(nvar):
-                V = V + directions[idx, ivar] * state[ivar]
-
-        # compute the slice in the chosen direction
+            # V is the current value of np.dot(direction, state)
 
-        lower_bound = -1e12
-        upper_bound = 1e12
-        for irow in range(nconstraint):
             if docoord == 1:
-                alpha = alphas_coord[irow,idx]
-                val = (-Astate[irow] + effective_offset[irow]) / alpha + V
-                if alpha > alphas_max_coord[idx] and (val < upper_bound):
-                    upper_bound = val
-                elif alpha < -alphas_max_coord[idx] and (val > lower_bound):
-                    lower_bound = val
+                idx = random_idx_coord[iter_count  % (ndraw + burnin)]
+                V = state[idx]
             else:
-                alpha = alphas_dir[irow,idx]
-                val = (-Astate[irow] + effective_offset[irow]) / alpha + V
-                if alpha > alphas_max_dir[idx] and (val < upper_bound):
-                    upper_bound = val
-                elif alpha < -alphas_max_dir[idx] and (val > lower_bound):
-                    lower_bound = val
-
-        if lower_bound > V:
-            lower_bound = V - tol 
-        elif upper_bound < V:
-            upper_bound = V + tol 
-
-        # intersect the line segment with the ball
-        # 
-        # below, discriminant is the square root of 
-        # the squared overall bound on the length
-        # minus the current norm of P_{\eta}^{\perp}y
-        # where eta is the current direction of movement
-
-        discriminant = sqrt(norm_state_bound_sq - (norm_state_sq - V*V))
-
-        if np.isnan(discriminant):
-            upper_bound = V
-            lower_bound = V
-        else:
-            if upper_bound > discriminant:
-                upper_bound = discriminant
-            if lower_bound < - discriminant:
-                lower_bound = - discriminant
-
-        # sample along segment by evaluating
-        # density along segment on a grid
-
-        norm_perp_proj_sq = norm_state_sq - V * V
-        norm_along_segment_sq = (norm_perp_proj_sq + np.power(lower_bound + grid * 
-                                 (upper_bound - lower_bound), 2))
-        density_along_segment = np.power(1. - norm_along_segment_sq / norm_state_bound_sq, 0.5 * (df_max - df_1) - 1)
-        sum_density = 0
-
-        for igrid in range(ngrid):
-            sum_density = sum_density + density_along_segment[igrid]
-        
-        unif = usample[iter_count] * sum_density
-        sum_density = 0
-
-        for igrid in range(ngrid):
-            if sum_density > unif:
-                tval = (lower_bound + (igrid - np.random.sample()) / ngrid * 
-                        (upper_bound - lower_bound))
-                break
-            sum_density = sum_density + density_along_segment[igrid]
-            if igrid == ngrid-1:
-                tval = upper_bound - np.random.sample() * (upper_bound - lower_bound) / ngrid
-
-        # update the state vector
-
-        if docoord == 1:
-            state[idx] = tval
-            dval = tval - V
+                if not dobias:
+                    idx = random_idx_dir[iter_count  % (ndraw + burnin)]
+                else:
+                    idx = ndir-1 # last row of directions is bias_direction
+                V = 0
+                for ivar in range(nvar):
+                    V = V + directions[idx, ivar] * state[ivar]
+
+            # compute the slice in the chosen direction
+
+            lower_bound = -1e12
+            upper_bound = 1e12
             for irow in range(nconstraint):
-                Astate[irow] = Astate[irow] + dval * A[irow, idx]
-        else:
-            dval = tval - V
-            for ivar in range(nvar):
-                state[ivar] = state[ivar] + dval * directions[idx,ivar]
-                for irow in range(nconstraint):
-                    Astate[irow] = (Astate[irow] + A[irow, ivar] * 
-                                    dval * directions[idx,ivar])
+                if docoord == 1:
+                    alpha = alphas_coord[irow,idx]
+                    val = (-Astate[irow] + effective_offset[irow]) / alpha + V
+                    if alpha > alphas_max_coord[idx] and (val < upper_bound):
+                        upper_bound = val
+                    elif alpha < -alphas_max_coord[idx] and (val > lower_bound):
+                        lower_bound = val
+                else:
+                    alpha = alphas_dir[irow,idx]
+                    val = (-Astate[irow] + effective_offset[irow]) / alpha + V
+                    if alpha > alphas_max_dir[idx] and (val < upper_bound):
+                        upper_bound = val
+                    elif alpha < -alphas_max_dir[idx] and (val > lower_bound):
+                        lower_bound = val
+
+            if lower_bound > V:
+                lower_bound = V - tol 
+            elif upper_bound < V:
+                upper_bound = V + tol 
+
+            # intersect the line segment with the ball
+            # 
+            # below, discriminant is the square root of 
+            # the squared overall bound on the length
+            # minus the current norm of P_{\eta}^{\perp}y
+            # where eta is the current direction of movement
 
-        if sample_count >= burnin:
-            for ivar in range(nvar):
-                trunc_sample[sample_count-burnin, ivar] = state[ivar] 
-            trunc_sample[sample_count-burnin, nvar] = RSS_1
+            discriminant = sqrt(norm_state_bound_sq - (norm_state_sq - V*V))
 
-        # compute squared norm of current state
+            if isnan(discriminant):
+                upper_bound = V
+                lower_bound = V
+            else:
+                if upper_bound > discriminant:
+                    upper_bound = discriminant
+                if lower_bound < - discriminant:
+                    lower_bound = - discriminant
+
+            # sample along segment by evaluating
+            # density along segment on a grid
+
+            norm_perp_proj_sq = norm_state_sq - V * V
+            sum_density = 0
+
+            for igrid in range(ngrid):
+                tval = lower_bound + grid[igrid] * (upper_bound - lower_bound)
+                norm_along_segment_sq[igrid] = norm_perp_proj_sq + tval * tval
+                density_along_segment[igrid] = pow(1. - norm_along_segment_sq[igrid] / norm_state_bound_sq, 
+                                                   0.5 * (df_max - df_1) - 1)
+                sum_density = sum_density + density_along_segment[igrid]
+        
+            unif = usample[iter_count] * sum_density
+            sum_density = 0
 
-        norm_state_sq = 0
-        for ivar in range(nvar):
-            norm_state_sq = norm_state_sq + state[ivar]*state[ivar]
+            for igrid in range(ngrid):
+                if sum_density > unif:
+                    tval = (lower_bound + (igrid - gsample[iter_count]) / ngrid * 
+                            (upper_bound - lower_bound))
+                    break
+                sum_density = sum_density + density_along_segment[igrid]
+                if igrid == ngrid-1:
+                    tval = upper_bound - gsample[iter_count] * (upper_bound - lower_bound) / ngrid
 
-        # weight is 1 because we "exactly" sampled
-        # from the appropriate density
+            # update the state vector
 
-        weight_sample[sample_count-burnin] = 1. 
+            if docoord == 1:
+                state[idx] = tval
+                dval = tval - V
+                for irow in range(nconstraint):
+                    Astate[irow] = Astate[irow] + dval * A[irow, idx]
+            else:
+                dval = tval - V
+                for ivar in range(nvar):
+                    state[ivar] = state[ivar] + dval * directions[idx,ivar]
+                    for irow in range(nconstraint):
+                        Astate[irow] = (Astate[irow] + A[irow, ivar] * 
+                                        dval * directions[idx,ivar])
 
-        if iter_count % 30 == 0:
-            # now we sample RSS_1
+            if sample_count >= burnin:
+                for ivar in range(nvar):
+                    trunc_sample[sample_count-burnin, ivar] = state[ivar] 
+                trunc_sample[sample_count-burnin, nvar] = RSS_1
 
-            lower_bound_RSS = 0.
-            upper_bound_RSS = np.inf
+            # compute squared norm of current state
 
-            for irow in range(nconstraint):
-                if RHS_offset[irow] > 0:
-                    RSS_bound_lhs = (Astate[irow] + LHS_offset[irow]) / RHS_offset[irow]
-                    if RSS_bound_lhs > lower_bound_RSS:
-                        lower_bound_RSS = RSS_bound_lhs
-                elif RHS_offset[irow] < 0:
-                    RSS_bound_lhs = (Astate[irow] + LHS_offset[irow]) / RHS_offset[irow]
-                    if RSS_bound_lhs < upper_bound_RSS:
-                        upper_bound_RSS = RSS_bound_lhs
-
-            if lower_bound_RSS > upper_bound_RSS:
-                raise ValueError('RSS inequalities not satisfied')
-
-            lower_bound_RSS = lower_bound_RSS**2
-            upper_bound_RSS = min(upper_bound_RSS**2, RSS_max - norm_state_sq)
-
-            # with the squared length of state at norm_state_sq
-            # RSS_1 is between 0 and RSS_max - norm_state_sq
-            # 
-            # we therefore draw from beta(df_1/2, (df_max-nvar)/2)
-            # truncated to [lower_bound_RSS, upper_bound_RSS]
+            norm_state_sq = 0
+            for ivar in range(nvar):
+                norm_state_sq = norm_state_sq + state[ivar]*state[ivar]
 
-            lower_bound_RSS = lower_bound_RSS / (RSS_max - norm_state_sq)
-            upper_bound_RSS = upper_bound_RSS / (RSS_max - norm_state_sq)
+            # weight is 1 because we "exactly" sampled
+            # from the appropriate density
 
-            cdfL = beta_1_rv.cdf(lower_bound_RSS)
-            cdfU = beta_1_rv.cdf(upper_bound_RSS)
-            unif = usample[iter_count] * (cdfU - cdfL) + cdfL
-            RSS_1 = beta_1_rv.ppf(unif) * (RSS_max - norm_state_sq)
+            weight_sample[sample_count-burnin] = 1. 
 
-            norm_state_bound_sq = RSS_max - RSS_1
+            if iter_count % 30 == 0:
+                # now we sample RSS_1
 
-        # check to see if we've drawn enough samples
+                lower_bound_RSS = 0.
+                upper_bound_RSS = INFINITY
 
-        sample_count = sample_count + 1
-        iter_count = iter_count + 1
-        if sample_count >= ndraw + burnin:
-            break
+                for irow in range(nconstraint):
+                    if RHS_offset[irow] > 0:
+                        RSS_bound_lhs = (Astate[irow] + LHS_offset[irow]) / RHS_offset[irow]
+                        if RSS_bound_lhs > lower_bound_RSS:
+                            lower_bound_RSS = RSS_bound_lhs
+                    elif RHS_offset[irow] < 0:
+                        RSS_bound_lhs = (Astate[irow] + LHS_offset[irow]) / RHS_offset[irow]
+                        if RSS_bound_lhs < upper_bound_RSS:
+                            upper_bound_RSS = RSS_bound_lhs
+
+                if lower_bound_RSS > upper_bound_RSS:
+                    with gil:
+                        raise ValueError('RSS inequalities not satisfied')
+
+                lower_bound_RSS = lower_bound_RSS**2
+                upper_bound_RSS = min(upper_bound_RSS**2, RSS_max - norm_state_sq)
+
+                # with the squared length of state at norm_state_sq
+                # RSS_1 is between 0 and RSS_max - norm_state_sq
+                # 
+                # we therefore draw from beta(df_1/2, (df_max-nvar)/2)
+                # truncated to [lower_bound_RSS, upper_bound_RSS]
+
+                lower_bound_RSS = lower_bound_RSS / (RSS_max - norm_state_sq)
+                upper_bound_RSS = upper_bound_RSS / (RSS_max - norm_state_sq)
+
+                if upper_bound_RSS > 1:
+                    upper_bound_RSS = 1.
+
+                cdfL = btdtr(beta_a, beta_b, lower_bound_RSS)
+                cdfU = btdtr(beta_a, beta_b, upper_bound_RSS)
+                unif = usample[iter_count] * (cdfU - cdfL) + cdfL
+                RSS_1 = btdtri(beta_a, beta_b, unif) * (RSS_max - norm_state_sq)
+
+                norm_state_bound_sq = RSS_max - RSS_1
+
+            # check to see if we've drawn enough samples
+
+            sample_count = sample_count + 1
+            iter_count = iter_count + 1
+            if sample_count >= ndraw + burnin:
+                break
 
 
     return trunc_sample, weight_sample
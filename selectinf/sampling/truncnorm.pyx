@@ -2,8 +2,8 @@ import warnings
 import numpy as np, cython
 cimport numpy as cnp
 
-from libc.math cimport pow, sqrt, log, exp # sin, cos, acos, asin, sqrt, fabs
-from scipy.special import ndtr, ndtri
+from libc.math cimport pow, sqrt, log, exp, fabs, isnan # sin, cos, acos, asin
+from scipy.special.cython_special cimport ndtr, ndtri
 
 class BoundViolation(ValueError):
     pass
@@ -34,6 +34,7 @@ def sample_truncnorm_white(cnp.ndarray[DTYPE_float_t, ndim=2] A,
                            int use_constraint_directions=1,
                            int use_random_directions=0,
                            int ignore_bound_violations=1,
+                           random_state=None,
                            ):
     """
     Sample from a truncated normal with covariance
@@ -82,6 +83,10 @@ def sample_truncnorm_white(cnp.ndarray[DTYPE_float_t, ndim=2] A,
         Use additional random directions in
         the Gibbs scheme?
 
+    random_state : np.random.RandomState (optional)
+        Source of the uniforms, directions and coordinate
+        orders drawn before sampling. Defaults to `np.random`.
+
     Returns
     -------
 
@@ -102,8 +107,11 @@ def sample_truncnorm_white(cnp.ndarray[DTYPE_float_t, ndim=2] A,
 
     cdef cnp.ndarray[DTYPE_float_t, ndim=1] U = np.dot(A, state) - b
 
+    if random_state is None:
+        random_state = np.random
+
     cdef cnp.ndarray[DTYPE_float_t, ndim=1] usample = \
-        np.random.sample(burnin + ndraw)
+        random_state.random_sample(burnin + ndraw)
 
     # directions not parallel to coordinate axes
 
@@ -112,7 +120,7 @@ def sample_truncnorm_white(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     else:
         _dirs = []
     if use_random_directions:
-        _dirs.append(np.random.standard_normal((int(nvar/5),nvar)))
+        _dirs.append(random_state.standard_normal((int(nvar/5),nvar)))
     _dirs.append(bias_direction.reshape((-1, nvar)))
 
     cdef cnp.ndarray[DTYPE_float_t, ndim=2] directions = \
@@ -136,10 +144,10 @@ def sample_truncnorm_white(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     # choose the order of sampling (randomly)
 
     cdef cnp.ndarray[DTYPE_intp_t, ndim=1] random_idx_dir = \
-        np.random.random_integers(0, ndir-1, size=(burnin+ndraw,)).astype(np.intp)
+        random_state.random_integers(0, ndir-1, size=(burnin+ndraw,)).astype(np.intp)
 
     cdef cnp.ndarray[DTYPE_intp_t, ndim=1] random_idx_coord = \
-        np.random.random_integers(0, nvar-1, size=(burnin+ndraw,)).astype(np.intp)
+        random_state.random_integers(0, nvar-1, size=(burnin+ndraw,)).astype(np.intp)
 
     # for switching between coordinate updates and
     # other directions
@@ -152,135 +160,340 @@ def sample_truncnorm_white(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     cdef int make_no_move = 0
     cdef int restart_idx = 0
 
-    for iter_count in range(ndraw + burnin):
+    with nogil:
+        for iter_count in range(ndraw + burnin):
 
-        make_no_move = 0
+            make_no_move = 0
 
-        docoord = 1
-        iperiod = iperiod + 1
-        ibias = ibias + 1
+            docoord = 1
+            iperiod = iperiod + 1
+            ibias = ibias + 1
 
-        if iperiod == invperiod: 
-            docoord = 0
-            iperiod = 0
-            dobias = 0
+            if iperiod == invperiod: 
+                docoord = 0
+                iperiod = 0
+                dobias = 0
 
-        if ibias == how_often:
-            docoord = 0
-            ibias = 0
-            dobias = 1
+            if ibias == how_often:
+                docoord = 0
+                ibias = 0
+                dobias = 1
         
-        if docoord == 1:
-            idx = random_idx_coord[iter_count]
-            V = state[idx]
-        else:
-            if not dobias:
-                idx = random_idx_dir[iter_count]
-            else:
-                idx = directions.shape[0]-1 # last row of directions is bias_direction
-            V = 0
-            for ivar in range(nvar):
-                V = V + directions[idx, ivar] * state[ivar]
-
-        lower_bound = -1e12
-        upper_bound = 1e12
-        for irow in range(nconstraint):
             if docoord == 1:
-                alpha = alphas_coord[irow,idx]
-                val = -U[irow] / alpha + V
-                if alpha > alphas_max_coord[idx] and (val < upper_bound):
-                    upper_bound = val
-                elif alpha < -alphas_max_coord[idx] and (val > lower_bound):
-                    lower_bound = val
-            else:
-                alpha = alphas_dir[irow,idx]
-                val = -U[irow] / alpha + V
-                if alpha > alphas_max_dir[idx] and (val < upper_bound):
-                    upper_bound = val
-                elif alpha < -alphas_max_dir[idx] and (val > lower_bound):
-                    lower_bound = val
-        if lower_bound > V:
-            lower_bound = V - tol * sigma
-        elif upper_bound < V:
-            upper_bound = V + tol * sigma
-
-        lower_bound = lower_bound / sigma
-        upper_bound = upper_bound / sigma
-
-        if lower_bound > upper_bound:
-            warnings.warn('bound violation')
-            if not ignore_bound_violations:
-                raise BoundViolation
-            else:
-                make_no_move = 1
-            if iter_count - burnin > 0:
-                restart_idx = iter_count - burnin / 2
-                for ivar in range(nvar):
-                    state[ivar] = trunc_sample[restart_idx, ivar] 
+                idx = random_idx_coord[iter_count]
+                V = state[idx]
             else:
+                if not dobias:
+                    idx = random_idx_dir[iter_count]
+                else:
+                    idx = ndir-1 # last row of directions is bias_direction
+                V = 0
                 for ivar in range(nvar):
-                    state[ivar] = initial[ivar]
-
-        if upper_bound < -10: # use Exp approximation
-            # the approximation is that
-            # Z | lower_bound < Z < upper_bound
-            # is fabs(upper_bound) * (upper_bound - Z) = E approx Exp(1)
-            # so Z = upper_bound - E / fabs(upper_bound)
-            # and the truncation of the exponential is
-            # E < fabs(upper_bound - lower_bound) * fabs(upper_bound) = D
-
-            # this has distribution function (1 - exp(-x)) / (1 - exp(-D))
-            # so to draw from this distribution
-            # we set E = - log(1 - U * (1 - exp(-D))) where U is Unif(0,1)
-            # and Z (= tnorm below) is as stated
-
-            unif = usample[iter_count] * (1 - exp(-np.fabs(
-                        (lower_bound - upper_bound) * upper_bound)))
-            tnorm = (upper_bound + log(1 - unif) / np.fabs(upper_bound)) * sigma
-        elif lower_bound > 10:
-
-            # here Z = lower_bound + E / fabs(lower_bound) (though lower_bound is positive)
-            # and D = fabs((upper_bound - lower_bound) * lower_bound)
-            unif = usample[iter_count] * (1 - exp(-np.fabs(
-                        (upper_bound - lower_bound) * lower_bound)))
-            tnorm = (lower_bound - log(1 - unif) / lower_bound) * sigma
-        elif lower_bound < 0:
-            cdfL = ndtr(lower_bound)
-            cdfU = ndtr(upper_bound)
-            unif = usample[iter_count] * (cdfU - cdfL) + cdfL
-            if unif < 0.5:
-                tnorm = ndtri(unif) * sigma
-            else:
-                tnorm = -ndtri(1-unif) * sigma
-        else:
-            cdfL = ndtr(-lower_bound)
-            cdfU = ndtr(-upper_bound)
-            unif = usample[iter_count] * (cdfL - cdfU) + cdfU
-            if unif < 0.5:
-                tnorm = -ndtri(unif) * sigma
+                    V = V + directions[idx, ivar] * state[ivar]
+
+            lower_bound = -1e12
+            upper_bound = 1e12
+            for irow in range(nconstraint):
+                if docoord == 1:
+                    alpha = alphas_coord[irow,idx]
+                    val = -U[irow] / alpha + V
+                    if alpha > alphas_max_coord[idx] and (val < upper_bound):
+                        upper_bound = val
+                    elif alpha < -alphas_max_coord[idx] and (val > lower_bound):
+                        lower_bound = val
+                else:
+                    alpha = alphas_dir[irow,idx]
+                    val = -U[irow] / alpha + V
+                    if alpha > alphas_max_dir[idx] and (val < upper_bound):
+                        upper_bound = val
+                    elif alpha < -alphas_max_dir[idx] and (val > lower_bound):
+                        lower_bound = val
+            if lower_bound > V:
+                lower_bound = V - tol * sigma
+            elif upper_bound < V:
+                upper_bound = V + tol * sigma
+
+            lower_bound = lower_bound / sigma
+            upper_bound = upper_bound / sigma
+
+            if lower_bound > upper_bound:
+                with gil:
+                    warnings.warn('bound violation')
+                    if not ignore_bound_violations:
+                        raise BoundViolation
+                make_no_move = 1
+                if iter_count - burnin > 0:
+                    restart_idx = iter_count - burnin / 2
+                    for ivar in range(nvar):
+                        state[ivar] = trunc_sample[restart_idx, ivar] 
+                else:
+                    for ivar in range(nvar):
+                        state[ivar] = initial[ivar]
+
+            if upper_bound < -10: # use Exp approximation
+                # the approximation is that
+                # Z | lower_bound < Z < upper_bound
+                # is fabs(upper_bound) * (upper_bound - Z) = E approx Exp(1)
+                # so Z = upper_bound - E / fabs(upper_bound)
+                # and the truncation of the exponential is
+                # E < fabs(upper_bound - lower_bound) * fabs(upper_bound) = D
+
+                # this has distribution function (1 - exp(-x)) / (1 - exp(-D))
+                # so to draw from this distribution
+                # we set E = - log(1 - U * (1 - exp(-D))) where U is Unif(0,1)
+                # and Z (= tnorm below) is as stated
+
+                unif = usample[iter_count] * (1 - exp(-fabs(
+                            (lower_bound - upper_bound) * upper_bound)))
+                tnorm = (upper_bound + log(1 - unif) / fabs(upper_bound)) * sigma
+            elif lower_bound > 10:
+
+                # here Z = lower_bound + E / fabs(lower_bound) (though lower_bound is positive)
+                # and D = fabs((upper_bound - lower_bound) * lower_bound)
+                unif = usample[iter_count] * (1 - exp(-fabs(
+                            (upper_bound - lower_bound) * lower_bound)))
+                tnorm = (lower_bound - log(1 - unif) / lower_bound) * sigma
+            elif lower_bound < 0:
+                cdfL = ndtr(lower_bound)
+                cdfU = ndtr(upper_bound)
+                unif = usample[iter_count] * (cdfU - cdfL) + cdfL
+                if unif < 0.5:
+                    tnorm = ndtri(unif) * sigma
+                else:
+                    tnorm = -ndtri(1-unif) * sigma
             else:
-                tnorm = ndtri(1-unif) * sigma
+                cdfL = ndtr(-lower_bound)
+                cdfU = ndtr(-upper_bound)
+                unif = usample[iter_count] * (cdfL - cdfU) + cdfU
+                if unif < 0.5:
+                    tnorm = -ndtri(unif) * sigma
+                else:
+                    tnorm = ndtri(1-unif) * sigma
             
-        if docoord == 1:
-            state[idx] = tnorm
-            tnorm = tnorm - V
-            for irow in range(nconstraint):
-                U[irow] = U[irow] + tnorm * A[irow, idx]
-        else:
-            tnorm = tnorm - V
-            for ivar in range(nvar):
-                state[ivar] = state[ivar] + tnorm * directions[idx,ivar]
+            if docoord == 1:
+                state[idx] = tnorm
+                tnorm = tnorm - V
                 for irow in range(nconstraint):
-                    U[irow] = (U[irow] + A[irow, ivar] * 
-                               tnorm * directions[idx,ivar])
+                    U[irow] = U[irow] + tnorm * A[irow, idx]
+            else:
+                tnorm = tnorm - V
+                for ivar in range(nvar):
+                    state[ivar] = state[ivar] + tnorm * directions[idx,ivar]
+                    for irow in range(nconstraint):
+                        U[irow] = (U[irow] + A[irow, ivar] * 
+                                   tnorm * directions[idx,ivar])
 
-        if iter_count >= burnin and not make_no_move:
-            for ivar in range(nvar):
-                trunc_sample[iter_count - burnin, ivar] = state[ivar]
+            if iter_count >= burnin and not make_no_move:
+                for ivar in range(nvar):
+                    trunc_sample[iter_count - burnin, ivar] = state[ivar]
         
     return trunc_sample
 
 
+@cython.boundscheck(False)
+@cython.cdivision(True)
+def sample_truncnorm_white_many(cnp.ndarray[DTYPE_float_t, ndim=2] A, 
+                                cnp.ndarray[DTYPE_float_t, ndim=1] b, 
+                                cnp.ndarray[DTYPE_float_t, ndim=1] initial, 
+                                DTYPE_int_t nsample=20,
+                                DTYPE_int_t nstep=100,
+                                DTYPE_float_t sigma=1.,
+                                int use_constraint_directions=1,
+                                random_state=None,
+                                ):
+    """
+    Run many independent copies of the Gibbs scheme of
+    `sample_truncnorm_white` from a common initial point,
+    returning the final state of each copy.
+
+    Constraint is $Ax \leq b$ where `A` has shape
+    `(q,n)` with `q` the number of constraints and
+    `n` the number of random variables.
+
+    Parameters
+    ----------
+
+    A : np.float((q,n))
+        Linear part of affine constraints.
+
+    b : np.float(q)
+        Offset part of affine constraints.
+
+    initial : np.float(n)
+        Initial point for every copy.
+        Assumed to satisfy the constraints.
+
+    nsample : int
+        How many copies should we run?
+
+    nstep : int
+        How many moves does each copy make?
+
+    sigma : float
+        Variance parameter.
+
+    use_constraint_directions : bool (optional)
+        Use the directions formed by the constraints as in
+        the Gibbs scheme?
+
+    random_state : np.random.RandomState (optional)
+        Source of the uniforms and directions drawn
+        before sampling. Defaults to `np.random`.
+
+    Returns
+    -------
+
+    trunc_sample : np.float((nsample, n))
+
+    Notes
+    -----
+
+    Each move is along a coordinate or, on average one time in 13,
+    along a row of `A`, chosen at random rather than on the fixed
+    schedule of `sample_truncnorm_white` so that every copy is
+    a reversible chain.
+
+    """
+
+    cdef int nvar = A.shape[1]
+    cdef int nconstraint = A.shape[0]
+    cdef cnp.ndarray[DTYPE_float_t, ndim=2] trunc_sample = \
+            np.empty((nsample, nvar), np.float)
+    cdef cnp.ndarray[DTYPE_float_t, ndim=1] U = np.empty(nconstraint, np.float)
+    cdef cnp.ndarray[DTYPE_float_t, ndim=1] U_initial = np.dot(A, initial) - b
+    cdef int idx, isample, istep, irow, ivar, docoord
+    cdef double lower_bound, upper_bound, V
+    cdef double cdfL, cdfU, unif, tnorm, val, alpha
+
+    cdef double tol = 1.e-7
+
+    if random_state is None:
+        random_state = np.random
+
+    cdef cnp.ndarray[DTYPE_float_t, ndim=2] usample = \
+        random_state.random_sample((nsample, nstep))
+
+    # directions not parallel to coordinate axes
+
+    if use_constraint_directions and nconstraint > 0:
+        directions = A / np.sqrt((A**2).sum(1))[:,None]
+    else:
+        directions = np.zeros((1, nvar))
+
+    cdef cnp.ndarray[DTYPE_float_t, ndim=2] directions_ = directions
+    cdef cnp.ndarray[DTYPE_float_t, ndim=2] alphas_dir = \
+        np.dot(A, directions.T)
+
+    cdef cnp.ndarray[DTYPE_float_t, ndim=2] alphas_coord = A
+        
+    cdef cnp.ndarray[DTYPE_float_t, ndim=1] alphas_max_dir = \
+        np.fabs(alphas_dir).max(0, initial=0) * tol    
+
+    cdef cnp.ndarray[DTYPE_float_t, ndim=1] alphas_max_coord = \
+        np.fabs(alphas_coord).max(0, initial=0) * tol 
+
+    # choose the direction of each move (randomly),
+    # indices past `nvar` are rows of `directions`
+
+    random_idx = random_state.randint(0, nvar, size=(nsample, nstep))
+    if use_constraint_directions and nconstraint > 0:
+        use_dir = random_state.random_sample((nsample, nstep)) < 1. / 13
+        random_idx[use_dir] = nvar + random_state.randint(0, nconstraint, 
+                                                          size=(use_dir.sum(),))
+    cdef cnp.ndarray[DTYPE_intp_t, ndim=2] random_idx_ = random_idx.astype(np.intp)
+
+    with nogil:
+        for isample in range(nsample):
+
+            for ivar in range(nvar):
+                trunc_sample[isample, ivar] = initial[ivar]
+            for irow in range(nconstraint):
+                U[irow] = U_initial[irow]
+
+            for istep in range(nstep):
+
+                idx = random_idx_[isample, istep]
+                docoord = idx < nvar
+
+                if docoord == 1:
+                    V = trunc_sample[isample, idx]
+                else:
+                    idx = idx - nvar
+                    V = 0
+                    for ivar in range(nvar):
+                        V = V + directions_[idx, ivar] * trunc_sample[isample, ivar]
+
+                lower_bound = -1e12
+                upper_bound = 1e12
+                for irow in range(nconstraint):
+                    if docoord == 1:
+                        alpha = alphas_coord[irow,idx]
+                        val = -U[irow] / alpha + V
+                        if alpha > alphas_max_coord[idx] and (val < upper_bound):
+                            upper_bound = val
+                        elif alpha < -alphas_max_coord[idx] and (val > lower_bound):
+                            lower_bound = val
+                    else:
+                        alpha = alphas_dir[irow,idx]
+                        val = -U[irow] / alpha + V
+                        if alpha > alphas_max_dir[idx] and (val < upper_bound):
+                            upper_bound = val
+                        elif alpha < -alphas_max_dir[idx] and (val > lower_bound):
+                            lower_bound = val
+                if lower_bound > V:
+                    lower_bound = V - tol * sigma
+                elif upper_bound < V:
+                    upper_bound = V + tol * sigma
+
+                lower_bound = lower_bound / sigma
+                upper_bound = upper_bound / sigma
+
+                # make no move on a bound violation
+
+                if lower_bound > upper_bound:
+                    continue
+
+                unif = usample[isample, istep]
+                if upper_bound < -10: # use Exp approximation as in `sample_truncnorm_white`
+                    unif = unif * (1 - exp(-fabs(
+                                (lower_bound - upper_bound) * upper_bound)))
+                    tnorm = (upper_bound + log(1 - unif) / fabs(upper_bound)) * sigma
+                elif lower_bound > 10:
+                    unif = unif * (1 - exp(-fabs(
+                                (upper_bound - lower_bound) * lower_bound)))
+                    tnorm = (lower_bound - log(1 - unif) / lower_bound) * sigma
+                elif lower_bound < 0:
+                    cdfL = ndtr(lower_bound)
+                    cdfU = ndtr(upper_bound)
+                    unif = unif * (cdfU - cdfL) + cdfL
+                    if unif < 0.5:
+                        tnorm = ndtri(unif) * sigma
+                    else:
+                        tnorm = -ndtri(1-unif) * sigma
+                else:
+                    cdfL = ndtr(-lower_bound)
+                    cdfU = ndtr(-upper_bound)
+                    unif = unif * (cdfL - cdfU) + cdfU
+                    if unif < 0.5:
+                        tnorm = -ndtri(unif) * sigma
+                    else:
+                        tnorm = ndtri(1-unif) * sigma
+
+                tnorm = tnorm - V
+                if docoord == 1:
+                    trunc_sample[isample, idx] = trunc_sample[isample, idx] + tnorm
+                    for irow in range(nconstraint):
+                        U[irow] = U[irow] + tnorm * A[irow, idx]
+                else:
+                    for ivar in range(nvar):
+                        trunc_sample[isample, ivar] = (trunc_sample[isample, ivar] + 
+                                                       tnorm * directions_[idx,ivar])
+                        for irow in range(nconstraint):
+                            U[irow] = (U[irow] + A[irow, ivar] * 
+                                       tnorm * directions_[idx,ivar])
+
+    return trunc_sample
+
 @cython.boundscheck(False)
 @cython.cdivision(True)
 def sample_truncnorm_white_sphere(cnp.ndarray[DTYPE_float_t, ndim=2] A, 
@@ -293,6 +506,7 @@ def sample_truncnorm_white_sphere(cnp.ndarray[DTYPE_float_t, ndim=2] A,
                                   int use_constraint_directions=1,
                                   int use_random_directions=0,
                                   int ignore_bound_violations=1,
+                                  random_state=None,
                                   ):
     """
     Sample from a sphere of radius `np.linalg.norm(initial)`
@@ -329,6 +543,10 @@ def sample_truncnorm_white_sphere(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     ndraw : int
         How many samples should we return?
 
+    random_state : np.random.RandomState (optional)
+        Source of the uniforms, directions and coordinate
+        orders drawn before sampling. Defaults to `np.random`.
+
     Returns
     -------
 
@@ -355,8 +573,11 @@ def sample_truncnorm_white_sphere(cnp.ndarray[DTYPE_float_t, ndim=2] A,
 
     cdef cnp.ndarray[DTYPE_float_t, ndim=1] Astate = np.dot(A, state) 
 
+    if random_state is None:
+        random_state = np.random
+
     cdef cnp.ndarray[DTYPE_float_t, ndim=1] usample = \
-        np.random.sample(burnin + ndraw)
+        random_state.random_sample(burnin + ndraw)
 
     # directions not parallel to coordinate axes
 
@@ -365,7 +586,7 @@ def sample_truncnorm_white_sphere(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     else:
         _dirs = []
     if use_random_directions:
-        _dirs.append(np.random.standard_normal((int(nvar/5),nvar)))
+        _dirs.append(random_state.standard_normal((int(nvar/5),nvar)))
     _dirs.append(bias_direction.reshape((-1, nvar)))
 
     cdef cnp.ndarray[DTYPE_float_t, ndim=2] directions = \
@@ -389,10 +610,10 @@ def sample_truncnorm_white_sphere(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     # choose the order of sampling (randomly)
 
     cdef cnp.ndarray[DTYPE_intp_t, ndim=1] random_idx_dir = \
-        np.random.random_integers(0, ndir-1, size=(burnin+ndraw,)).astype(np.intp)
+        random_state.random_integers(0, ndir-1, size=(burnin+ndraw,)).astype(np.intp)
 
     cdef cnp.ndarray[DTYPE_intp_t, ndim=1] random_idx_coord = \
-        np.random.random_integers(0, nvar-1, size=(burnin+ndraw,)).astype(np.intp)
+        random_state.random_integers(0, nvar-1, size=(burnin+ndraw,)).astype(np.intp)
 
     # for switching between coordinate updates and
     # other directions
@@ -410,196 +631,198 @@ def sample_truncnorm_white_sphere(cnp.ndarray[DTYPE_float_t, ndim=2] A,
 
     iter_count = 0
 
-    while True:
+    with nogil:
+        while True:
 
-        # sample from the ball
+            # sample from the ball
 
-        docoord = 1
-        iperiod = iperiod + 1
-        ibias = ibias + 1
+            docoord = 1
+            iperiod = iperiod + 1
+            ibias = ibias + 1
 
-        if iperiod == invperiod: 
-            docoord = 0
-            iperiod = 0
-            dobias = 0
+            if iperiod == invperiod: 
+                docoord = 0
+                iperiod = 0
+                dobias = 0
 
-        if ibias == how_often:
-            docoord = 0
-            ibias = 0
-            dobias = 1
+            if ibias == how_often:
+                docoord = 0
+                ibias = 0
+                dobias = 1
         
-        # V is the current value of np.dot(direction, state)
-
-        if docoord == 1:
-            idx = random_idx_coord[iter_count  % (ndraw + burnin)]
-            V = state[idx]
-        else:
-            if not dobias:
-                idx = random_idx_dir[iter_count  % (ndraw + burnin)]
+            # V is the current value of np.dot(direction, state)
+
+            if docoord == 1:
+                idx = random_idx_coord[iter_count  % (ndraw + burnin)]
+                V = state[idx]
             else:
-                idx = directions.shape[0]-1 # last row of directions is bias_direction
-            V = 0
-            for ivar in range(nvar):
-                V = V + directions[idx, ivar] * state[ivar]
+                if not dobias:
+                    idx = random_idx_dir[iter_count  % (ndraw + burnin)]
+                else:
+                    idx = ndir-1 # last row of directions is bias_direction
+                V = 0
+                for ivar in range(nvar):
+                    V = V + directions[idx, ivar] * state[ivar]
 
-        # compute the slice in the chosen direction
+            # compute the slice in the chosen direction
 
-        lower_bound = -1e12
-        upper_bound = 1e12
-        for irow in range(nconstraint):
-            if docoord == 1:
-                alpha = alphas_coord[irow,idx]
-                val = (-Astate[irow] + b[irow]) / alpha + V
-                if alpha > alphas_max_coord[idx] and (val < upper_bound):
-                    upper_bound = val
-                elif alpha < -alphas_max_coord[idx] and (val > lower_bound):
-                    lower_bound = val
+            lower_bound = -1e12
+            upper_bound = 1e12
+            for irow in range(nconstraint):
+                if docoord == 1:
+                    alpha = alphas_coord[irow,idx]
+                    val = (-Astate[irow] + b[irow]) / alpha + V
+                    if alpha > alphas_max_coord[idx] and (val < upper_bound):
+                        upper_bound = val
+                    elif alpha < -alphas_max_coord[idx] and (val > lower_bound):
+                        lower_bound = val
+                else:
+                    alpha = alphas_dir[irow,idx]
+                    val = (-Astate[irow] + b[irow]) / alpha + V
+                    if alpha > alphas_max_dir[idx] and (val < upper_bound):
+                        upper_bound = val
+                    elif alpha < -alphas_max_dir[idx] and (val > lower_bound):
+                        lower_bound = val
+
+            if lower_bound > V:
+                lower_bound = V - tol 
+            elif upper_bound < V:
+                upper_bound = V + tol 
+
+            # intersect the line segment with the ball
+            # 
+            # below, discriminant is the square root of 
+            # the squared overall bound on the length
+            # minus the current norm of P_{\eta}^{\perp}y
+            # where eta is the current direction of movement
+
+            discriminant = sqrt(norm_state_bound_sq - (norm_state_sq - V*V))
+
+            if isnan(discriminant):
+                upper_bound = V
+                lower_bound = V
             else:
-                alpha = alphas_dir[irow,idx]
-                val = (-Astate[irow] + b[irow]) / alpha + V
-                if alpha > alphas_max_dir[idx] and (val < upper_bound):
-                    upper_bound = val
-                elif alpha < -alphas_max_dir[idx] and (val > lower_bound):
-                    lower_bound = val
-
-        if lower_bound > V:
-            lower_bound = V - tol 
-        elif upper_bound < V:
-            upper_bound = V + tol 
-
-        # intersect the line segment with the ball
-        # 
-        # below, discriminant is the square root of 
-        # the squared overall bound on the length
-        # minus the current norm of P_{\eta}^{\perp}y
-        # where eta is the current direction of movement
-
-        discriminant = sqrt(norm_state_bound_sq - (norm_state_sq - V*V))
-
-        if np.isnan(discriminant):
-            upper_bound = V
-            lower_bound = V
-        else:
-            if upper_bound > discriminant:
-                upper_bound = discriminant
-            if lower_bound < - discriminant:
-                lower_bound = - discriminant
-
-        if lower_bound > upper_bound:
-            if not ignore_bound_violations:
-                raise BoundViolation
-
-        # sample from the line segment
-
-        tval = lower_bound + usample[iter_count % (ndraw + burnin)] * (upper_bound - lower_bound)
+                if upper_bound > discriminant:
+                    upper_bound = discriminant
+                if lower_bound < - discriminant:
+                    lower_bound = - discriminant
+
+            if lower_bound > upper_bound:
+                if not ignore_bound_violations:
+                    with gil:
+                        raise BoundViolation
+
+            # sample from the line segment
+
+            tval = lower_bound + usample[iter_count % (ndraw + burnin)] * (upper_bound - lower_bound)
             
-        # update the state vector
+            # update the state vector
 
-        if docoord == 1:
-            state[idx] = tval
-            dval = tval - V
-            for irow in range(nconstraint):
-                Astate[irow] = Astate[irow] + dval * A[irow, idx]
-        else:
-            dval = tval - V
-            for ivar in range(nvar):
-                state[ivar] = state[ivar] + dval * directions[idx,ivar]
+            if docoord == 1:
+                state[idx] = tval
+                dval = tval - V
                 for irow in range(nconstraint):
-                    Astate[irow] = (Astate[irow] + A[irow, ivar] * 
-                                    dval * directions[idx,ivar])
+                    Astate[irow] = Astate[irow] + dval * A[irow, idx]
+            else:
+                dval = tval - V
+                for ivar in range(nvar):
+                    state[ivar] = state[ivar] + dval * directions[idx,ivar]
+                    for irow in range(nconstraint):
+                        Astate[irow] = (Astate[irow] + A[irow, ivar] * 
+                                        dval * directions[idx,ivar])
 
-        # compute squared norm of current state
+            # compute squared norm of current state
 
-        norm_state_sq = 0
-        for ivar in range(nvar):
-            norm_state_sq = norm_state_sq + state[ivar]*state[ivar]
+            norm_state_sq = 0
+            for ivar in range(nvar):
+                norm_state_sq = norm_state_sq + state[ivar]*state[ivar]
 
-        # if it escapes somehow, pull it back by projection
+            # if it escapes somehow, pull it back by projection
 
-        if norm_state_sq > norm_state_bound_sq:
-            multiplier = np.sqrt(0.999 * norm_state_bound_sq / norm_state_sq)
-            for ivar in range(nvar):
-                state[ivar] = state[ivar] * multiplier
-            norm_state_sq = 0.999 * norm_state_bound_sq
+            if norm_state_sq > norm_state_bound_sq:
+                multiplier = sqrt(0.999 * norm_state_bound_sq / norm_state_sq)
+                for ivar in range(nvar):
+                    state[ivar] = state[ivar] * multiplier
+                norm_state_sq = 0.999 * norm_state_bound_sq
 
-        # check constraints
+            # check constraints
 
-        in_event = 1
-        multiplier = sqrt(norm_state_bound_sq / norm_state_sq)
-        for irow in range(nconstraint):
-            if Astate[irow] * multiplier > b[irow]:
-                in_event = 0
+            in_event = 1
+            multiplier = sqrt(norm_state_bound_sq / norm_state_sq)
+            for irow in range(nconstraint):
+                if Astate[irow] * multiplier > b[irow]:
+                    in_event = 0
 
-        if in_event == 1:
-            # store the sample
+            if in_event == 1:
+                # store the sample
 
-            if sample_count >= burnin:
-                for ivar in range(nvar):
-                    trunc_sample[sample_count-burnin, ivar] = state[ivar] * multiplier
+                if sample_count >= burnin:
+                    for ivar in range(nvar):
+                        trunc_sample[sample_count-burnin, ivar] = state[ivar] * multiplier
 
-                # now compute the smallest multiple M of state that is in the event
-                # this is done by looking at each row of the affine 
-                # inequalities and finding
+                    # now compute the smallest multiple M of state that is in the event
+                    # this is done by looking at each row of the affine 
+                    # inequalities and finding
 
-                # \{c \geq 0: c \cdot A[i]^T state \leq b_i \right\} \cap [0,1]
+                    # \{c \geq 0: c \cdot A[i]^T state \leq b_i \right\} \cap [0,1]
                 
-                # the upper bound is always one because state is in the
-                # event, so we need only find the lower bound,
-                # which is the smallest non-negative 
-                # multiple of `state` that still is in the event
+                    # the upper bound is always one because state is in the
+                    # event, so we need only find the lower bound,
+                    # which is the smallest non-negative 
+                    # multiple of `state` that still is in the event
             
-                min_multiple = 0.
-                for irow in range(nconstraint):
-
-                    # there are 4 cases in the signs of Astate[irow] and
-                    # b[irow], only this one gives a lower bound in [0,1]
-
-                    if Astate[irow] < 0: # and b[irow] < 0: this check is not
-                                         # actually necessary as this
-                                         # is the only case that matters
-
-                        val = b[irow] / Astate[irow] 
-                        if min_multiple <  val:
-                            min_multiple = val
-
-                # the weight for this sample is 1 / (1-M^n)
-                # because if you integrate over the ball
-                # in polar coordinates integrating the radius first,
-                # you get a factor of (1 - M^n) then there is the
-                # integral for the point projected to the 
-                # sphere
-
-                # $$
-                # \begin{aligned}
-                # \int_{B \cap K} (1 - M(p(x))^n)^{-1} f(p(x)) dx &= 
-                # \int_S \int_0^1 1_{\{(u,v): v \cdot u \in K\}}(y, r) 
-                # (1 - M(y))^{-n} r^{n-1} f(y) dy \\		
-                # &= \int_S \int_0^1 1_{\{r \in [M(y),1]\}} 
-                # (1 - M(y)^n)^{-1} r^{n-1} f(y) dy \\		
-                # &= \int_S \int_0^1 1_{\{r \in [M(y),1]\}} 
-                # (1 - M(y)^n)^{-1} r^{n-1} f(y) dy \\		
-                # \end{aligned}
-                # $$
-
-                # where $K$ is the convex set, 
-                # $dy$ is surface measure on the sphere $S$
-                # and $p(x)=x/\|x\|_2$
-
-                weight_sample[sample_count-burnin] = 1 / (1 - pow(min_multiple, nvar))
-
-            sample_count = sample_count + 1
-        else:
-            numout = numout + 1
+                    min_multiple = 0.
+                    for irow in range(nconstraint):
+
+                        # there are 4 cases in the signs of Astate[irow] and
+                        # b[irow], only this one gives a lower bound in [0,1]
+
+                        if Astate[irow] < 0: # and b[irow] < 0: this check is not
+                                             # actually necessary as this
+                                             # is the only case that matters
+
+                            val = b[irow] / Astate[irow] 
+                            if min_multiple <  val:
+                                min_multiple = val
+
+                    # the weight for this sample is 1 / (1-M^n)
+                    # because if you integrate over the ball
+                    # in polar coordinates integrating the radius first,
+                    # you get a factor of (1 - M^n) then there is the
+                    # integral for the point projected to the 
+                    # sphere
+
+                    # $$
+                    # \begin{aligned}
+                    # \int_{B \cap K} (1 - M(p(x))^n)^{-1} f(p(x)) dx &= 
+                    # \int_S \int_0^1 1_{\{(u,v): v \cdot u \in K\}}(y, r) 
+                    # (1 - M(y))^{-n} r^{n-1} f(y) dy \\		
+                    # &= \int_S \int_0^1 1_{\{r \in [M(y),1]\}} 
+                    # (1 - M(y)^n)^{-1} r^{n-1} f(y) dy \\		
+                    # &= \int_S \int_0^1 1_{\{r \in [M(y),1]\}} 
+                    # (1 - M(y)^n)^{-1} r^{n-1} f(y) dy \\		
+                    # \end{aligned}
+                    # $$
+
+                    # where $K$ is the convex set, 
+                    # $dy$ is surface measure on the sphere $S$
+                    # and $p(x)=x/\|x\|_2$
+
+                    weight_sample[sample_count-burnin] = 1 / (1 - pow(min_multiple, nvar))
+
+                sample_count = sample_count + 1
+            else:
+                numout = numout + 1
 
-        iter_count = iter_count + 1
+            iter_count = iter_count + 1
 
-        if sample_count >= ndraw + burnin:
-            break
+            if sample_count >= ndraw + burnin:
+                break
 
-        # update the bound on the radius
-        # this might be done by a sampler
+            # update the bound on the radius
+            # this might be done by a sampler
 
-        # norm_state_bound_sq = sample_radius_squared(state)
+            # norm_state_bound_sq = sample_radius_squared(state)
 
     return trunc_sample, weight_sample
 
@@ -613,6 +836,7 @@ def sample_truncnorm_white_ball(cnp.ndarray[DTYPE_float_t, ndim=2] A,
                                   DTYPE_int_t how_often=1000,
                                   DTYPE_int_t burnin=500,
                                   DTYPE_int_t ndraw=1000,
+                                  random_state=None,
                                   ):
     """
     Sample from the uniform
@@ -653,6 +877,10 @@ def sample_truncnorm_white_ball(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     ndraw : int
         How many samples should we return?
 
+    random_state : np.random.RandomState (optional)
+        Source of the uniforms, directions and coordinate
+        orders drawn before sampling. Defaults to `np.random`.
+
     Returns
     -------
 
@@ -676,14 +904,17 @@ def sample_truncnorm_white_ball(cnp.ndarray[DTYPE_float_t, ndim=2] A,
 
     cdef cnp.ndarray[DTYPE_float_t, ndim=1] Astate = np.dot(A, state) 
 
+    if random_state is None:
+        random_state = np.random
+
     cdef cnp.ndarray[DTYPE_float_t, ndim=1] usample = \
-        np.random.sample(burnin + ndraw)
+        random_state.random_sample(burnin + ndraw)
 
     # directions not parallel to coordinate axes
 
     cdef cnp.ndarray[DTYPE_float_t, ndim=2] directions = \
         np.vstack([A, 
-                   np.random.standard_normal((int(nvar/5),nvar))])
+                   random_state.standard_normal((int(nvar/5),nvar))])
     directions[-1][:] = bias_direction
 
     directions /= np.sqrt((directions**2).sum(1))[:,None]
@@ -704,10 +935,10 @@ def sample_truncnorm_white_ball(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     # choose the order of sampling (randomly)
 
     cdef cnp.ndarray[DTYPE_intp_t, ndim=1] random_idx_dir = \
-        np.random.random_integers(0, ndir-1, size=(burnin+ndraw,)).astype(np.intp)
+        random_state.random_integers(0, ndir-1, size=(burnin+ndraw,)).astype(np.intp)
 
     cdef cnp.ndarray[DTYPE_intp_t, ndim=1] random_idx_coord = \
-        np.random.random_integers(0, nvar-1, size=(burnin+ndraw,)).astype(np.intp)
+        random_state.random_integers(0, nvar-1, size=(burnin+ndraw,)).astype(np.intp)
 
     # for switching between coordinate updates and
     # other directions
@@ -723,115 +954,117 @@ def sample_truncnorm_white_ball(cnp.ndarray[DTYPE_float_t, ndim=2] A,
 
     iter_count = 0
 
-    while True:
+    with nogil:
+        while True:
 
-        norm_state_sq = 0.
-        for ivar in range(nvar):
-            norm_state_sq = norm_state_sq + state[ivar]*state[ivar]
+            norm_state_sq = 0.
+            for ivar in range(nvar):
+                norm_state_sq = norm_state_sq + state[ivar]*state[ivar]
 
-        # sample from the ball
+            # sample from the ball
 
-        docoord = 1
-        iperiod = iperiod + 1
-        ibias = ibias + 1
+            docoord = 1
+            iperiod = iperiod + 1
+            ibias = ibias + 1
 
-        # compute V = random_direction^T state
+            # compute V = random_direction^T state
 
-        if iperiod == invperiod: 
-            docoord = 0
-            iperiod = 0
-            dobias = 0
+            if iperiod == invperiod: 
+                docoord = 0
+                iperiod = 0
+                dobias = 0
 
-        if ibias == how_often:
-            docoord = 0
-            ibias = 0
-            dobias = 1
+            if ibias == how_often:
+                docoord = 0
+                ibias = 0
+                dobias = 1
         
-        if docoord == 1:
-            idx = random_idx_coord[iter_count  % (ndraw + burnin)]
-            V = state[idx]
-        else:
-            if not dobias:
-                idx = random_idx_dir[iter_count  % (ndraw + burnin)]
+            if docoord == 1:
+                idx = random_idx_coord[iter_count  % (ndraw + burnin)]
+                V = state[idx]
             else:
-                idx = directions.shape[0]-1 # last row of directions is bias_direction
-            V = 0
-            for ivar in range(nvar):
-                V = V + directions[idx, ivar] * state[ivar]
+                if not dobias:
+                    idx = random_idx_dir[iter_count  % (ndraw + burnin)]
+                else:
+                    idx = ndir-1 # last row of directions is bias_direction
+                V = 0
+                for ivar in range(nvar):
+                    V = V + directions[idx, ivar] * state[ivar]
 
-        # compute the slice in the chosen direction
+            # compute the slice in the chosen direction
 
-        lower_bound = -1e12
-        upper_bound = 1e12
-        for irow in range(nconstraint):
-            if docoord == 1:
-                alpha = alphas_coord[irow,idx]
-                val = (-Astate[irow] + b[irow]) / alpha + V
-                if alpha > alphas_max_coord[idx] and (val < upper_bound):
-                    upper_bound = val
-                elif alpha < -alphas_max_coord[idx] and (val > lower_bound):
-                    lower_bound = val
+            lower_bound = -1e12
+            upper_bound = 1e12
+            for irow in range(nconstraint):
+                if docoord == 1:
+                    alpha = alphas_coord[irow,idx]
+                    val = (-Astate[irow] + b[irow]) / alpha + V
+                    if alpha > alphas_max_coord[idx] and (val < upper_bound):
+                        upper_bound = val
+                    elif alpha < -alphas_max_coord[idx] and (val > lower_bound):
+                        lower_bound = val
+                else:
+                    alpha = alphas_dir[irow,idx]
+                    val = (-Astate[irow] + b[irow]) / alpha + V
+                    if alpha > alphas_max_dir[idx] and (val < upper_bound):
+                        upper_bound = val
+                    elif alpha < -alphas_max_dir[idx] and (val > lower_bound):
+                        lower_bound = val
+
+            if lower_bound > V:
+                lower_bound = V - tol 
+            elif upper_bound < V:
+                upper_bound = V + tol 
+
+            # intersect the line segment with the ball
+
+            discriminant = sqrt(V*V-(norm_state_sq-norm_state_bound_sq))
+            if isnan(discriminant):
+                upper_bound = V
+                lower_bound = V
             else:
-                alpha = alphas_dir[irow,idx]
-                val = (-Astate[irow] + b[irow]) / alpha + V
-                if alpha > alphas_max_dir[idx] and (val < upper_bound):
-                    upper_bound = val
-                elif alpha < -alphas_max_dir[idx] and (val > lower_bound):
-                    lower_bound = val
-
-        if lower_bound > V:
-            lower_bound = V - tol 
-        elif upper_bound < V:
-            upper_bound = V + tol 
-
-        # intersect the line segment with the ball
-
-        discriminant = sqrt(V*V-(norm_state_sq-norm_state_bound_sq))
-        if np.isnan(discriminant):
-            upper_bound = V
-            lower_bound = V
-        else:
-            if upper_bound > discriminant:
-                upper_bound = discriminant
-            if lower_bound < - discriminant:
-                lower_bound = - discriminant
-
-        # sample from the line segment
-
-        tval = lower_bound + usample[iter_count % (ndraw + burnin)] * (upper_bound - lower_bound)
+                if upper_bound > discriminant:
+                    upper_bound = discriminant
+                if lower_bound < - discriminant:
+                    lower_bound = - discriminant
+
+            # sample from the line segment
+
+            tval = lower_bound + usample[iter_count % (ndraw + burnin)] * (upper_bound - lower_bound)
             
-        # update the state and the vector dot(A, state)
+            # update the state and the vector dot(A, state)
 
-        if docoord == 1:
-            state[idx] = tval
-            tval = tval - V
-            for irow in range(nconstraint):
-                Astate[irow] = Astate[irow] + tval * A[irow, idx]
-        else:
-            tval = tval - V
-            for ivar in range(nvar):
-                state[ivar] = state[ivar] + tval * directions[idx,ivar]
+            if docoord == 1:
+                state[idx] = tval
+                tval = tval - V
                 for irow in range(nconstraint):
-                    Astate[irow] = (Astate[irow] + A[irow, ivar] * 
-                                    tval * directions[idx,ivar])
+                    Astate[irow] = Astate[irow] + tval * A[irow, idx]
+            else:
+                tval = tval - V
+                for ivar in range(nvar):
+                    state[ivar] = state[ivar] + tval * directions[idx,ivar]
+                    for irow in range(nconstraint):
+                        Astate[irow] = (Astate[irow] + A[irow, ivar] * 
+                                        tval * directions[idx,ivar])
 
-        # store the sample
+            # store the sample
 
-        if sample_count >= burnin:
-            for ivar in range(nvar):
-                trunc_sample[sample_count-burnin, ivar] = state[ivar] 
+            if sample_count >= burnin:
+                for ivar in range(nvar):
+                    trunc_sample[sample_count-burnin, ivar] = state[ivar] 
 
-        sample_count = sample_count + 1
+            sample_count = sample_count + 1
 
-        iter_count = iter_count + 1
+            iter_count = iter_count + 1
 
-        if sample_count >= ndraw + burnin:
-            break
+            if sample_count >= ndraw + burnin:
+                break
 
-        # update the bound on the radius
-        # this might be done by a sampler
+            # update the bound on the radius
+            # this might be done by a sampler
 
-        norm_state_bound_sq = sample_radius_squared(state)
+            with gil:
+                norm_state_bound_sq = sample_radius_squared(state)
 
     return trunc_sample
 
@@ -846,6 +1079,7 @@ def sample_truncnorm_white_ball_normal(cnp.ndarray[DTYPE_float_t, ndim=2] A,
                                       DTYPE_int_t how_often=1000,
                                       DTYPE_int_t burnin=500,
                                       DTYPE_int_t ndraw=1000,
+                                      random_state=None,
                                       ):
     """
     Sample from the centered isotropic Normal 
@@ -889,6 +1123,10 @@ def sample_truncnorm_white_ball_normal(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     ndraw : int
         How many samples should we return?
 
+    random_state : np.random.RandomState (optional)
+        Source of the uniforms, directions and coordinate
+        orders drawn before sampling. Defaults to `np.random`.
+
     Returns
     -------
 
@@ -912,14 +1150,17 @@ def sample_truncnorm_white_ball_normal(cnp.ndarray[DTYPE_float_t, ndim=2] A,
 
     cdef cnp.ndarray[DTYPE_float_t, ndim=1] Astate = np.dot(A, state) 
 
+    if random_state is None:
+        random_state = np.random
+
     cdef cnp.ndarray[DTYPE_float_t, ndim=1] usample = \
-        np.random.sample(burnin + ndraw)
+        random_state.random_sample(burnin + ndraw)
 
     # directions not parallel to coordinate axes
 
     cdef cnp.ndarray[DTYPE_float_t, ndim=2] directions = \
         np.vstack([A, 
-                   np.random.standard_normal((int(nvar/5),nvar))])
+                   random_state.standard_normal((int(nvar/5),nvar))])
     directions[-1][:] = bias_direction
 
     directions /= np.sqrt((directions**2).sum(1))[:,None]
@@ -940,10 +1181,10 @@ def sample_truncnorm_white_ball_normal(cnp.ndarray[DTYPE_float_t, ndim=2] A,
     # choose the order of sampling (randomly)
 
     cdef cnp.ndarray[DTYPE_intp_t, ndim=1] random_idx_dir = \
-        np.random.random_integers(0, ndir-1, size=(burnin+ndraw,)).astype(np.intp)
+        random_state.random_integers(0, ndir-1, size=(burnin+ndraw,)).astype(np.intp)
 
     cdef cnp.ndarray[DTYPE_intp_t, ndim=1] random_idx_coord = \
-        np.random.random_integers(0, nvar-1, size=(burnin+ndraw,)).astype(np.intp)
+        random_state.random_integers(0, nvar-1, size=(burnin+ndraw,)).astype(np.intp)
 
     # for switching between coordinate updates and
     # other directions
@@ -958,116 +1199,117 @@ def sample_truncnorm_white_ball_normal(cnp.ndarray[DTYPE_float_t, ndim=2] A,
 
     iter_count = 0
 
-    while True:
+    with nogil:
+        while True:
 
-        norm_state_sq = 0.
-        for ivar in range(nvar):
-            norm_state_sq = norm_state_sq + state[ivar]*state[ivar]
+            norm_state_sq = 0.
+            for ivar in range(nvar):
+                norm_state_sq = norm_state_sq + state[ivar]*state[ivar]
 
-        # sample from the ball
+            # sample from the ball
 
-        docoord = 1
-        iperiod = iperiod + 1
-        ibias = ibias + 1
+            docoord = 1
+            iperiod = iperiod + 1
+            ibias = ibias + 1
 
-        # compute V = random_direction^T state
+            # compute V = random_direction^T state
 
-        if iperiod == invperiod: 
-            docoord = 0
-            iperiod = 0
-            dobias = 0
+            if iperiod == invperiod: 
+                docoord = 0
+                iperiod = 0
+                dobias = 0
 
-        if ibias == how_often:
-            docoord = 0
-            ibias = 0
-            dobias = 1
+            if ibias == how_often:
+                docoord = 0
+                ibias = 0
+                dobias = 1
         
-        if docoord == 1:
-            idx = random_idx_coord[iter_count  % (ndraw + burnin)]
-            V = state[idx]
-        else:
-            if not dobias:
-                idx = random_idx_dir[iter_count  % (ndraw + burnin)]
+            if docoord == 1:
+                idx = random_idx_coord[iter_count  % (ndraw + burnin)]
+                V = state[idx]
             else:
-                idx = directions.shape[0]-1 # last row of directions is bias_direction
-            V = 0
-            for ivar in range(nvar):
-                V = V + directions[idx, ivar] * state[ivar]
+                if not dobias:
+                    idx = random_idx_dir[iter_count  % (ndraw + burnin)]
+                else:
+                    idx = ndir-1 # last row of directions is bias_direction
+                V = 0
+                for ivar in range(nvar):
+                    V = V + directions[idx, ivar] * state[ivar]
 
-        # compute the slice in the chosen direction
+            # compute the slice in the chosen direction
 
-        lower_bound = -1e12
-        upper_bound = 1e12
-        for irow in range(nconstraint):
-            if docoord == 1:
-                alpha = alphas_coord[irow,idx]
-                val = (-Astate[irow] + b[irow]) / alpha + V
-                if alpha > alphas_max_coord[idx] and (val < upper_bound):
-                    upper_bound = val
-                elif alpha < -alphas_max_coord[idx] and (val > lower_bound):
-                    lower_bound = val
+            lower_bound = -1e12
+            upper_bound = 1e12
+            for irow in range(nconstraint):
+                if docoord == 1:
+                    alpha = alphas_coord[irow,idx]
+                    val = (-Astate[irow] + b[irow]) / alpha + V
+                    if alpha > alphas_max_coord[idx] and (val < upper_bound):
+                        upper_bound = val
+                    elif alpha < -alphas_max_coord[idx] and (val > lower_bound):
+                        lower_bound = val
+                else:
+                    alpha = alphas_dir[irow,idx]
+                    val = (-Astate[irow] + b[irow]) / alpha + V
+                    if alpha > alphas_max_dir[idx] and (val < upper_bound):
+                        upper_bound = val
+                    elif alpha < -alphas_max_dir[idx] and (val > lower_bound):
+                        lower_bound = val
+
+            if lower_bound > V:
+                lower_bound = V - tol 
+            elif upper_bound < V:
+                upper_bound = V + tol 
+
+            # intersect the line segment with the ball
+
+            discriminant = sqrt(V*V-(norm_state_sq-radius*radius))
+            if isnan(discriminant):
+                upper_bound = V
+                lower_bound = V
             else:
-                alpha = alphas_dir[irow,idx]
-                val = (-Astate[irow] + b[irow]) / alpha + V
-                if alpha > alphas_max_dir[idx] and (val < upper_bound):
-                    upper_bound = val
-                elif alpha < -alphas_max_dir[idx] and (val > lower_bound):
-                    lower_bound = val
-
-        if lower_bound > V:
-            lower_bound = V - tol 
-        elif upper_bound < V:
-            upper_bound = V + tol 
-
-        # intersect the line segment with the ball
-
-        discriminant = sqrt(V*V-(norm_state_sq-radius*radius))
-        if np.isnan(discriminant):
-            upper_bound = V
-            lower_bound = V
-        else:
-            if upper_bound > discriminant:
-                upper_bound = discriminant
-            if lower_bound < - discriminant:
-                lower_bound = - discriminant
-
-        # sample along the slice
-
-        cdfL = ndtr(-lower_bound / sigma)
-        cdfU = ndtr(-upper_bound / sigma)
-        unif = usample[iter_count] * (cdfL - cdfU) + cdfU
-        if unif < 0.5:
-            tnorm = -ndtri(unif) * sigma
-        else:
-            tnorm = ndtri(1-unif) * sigma
-        tval = tnorm
+                if upper_bound > discriminant:
+                    upper_bound = discriminant
+                if lower_bound < - discriminant:
+                    lower_bound = - discriminant
+
+            # sample along the slice
+
+            cdfL = ndtr(-lower_bound / sigma)
+            cdfU = ndtr(-upper_bound / sigma)
+            unif = usample[iter_count] * (cdfL - cdfU) + cdfU
+            if unif < 0.5:
+                tnorm = -ndtri(unif) * sigma
+            else:
+                tnorm = ndtri(1-unif) * sigma
+            tval = tnorm
             
-        # update the state and the vector dot(A, state)
+            # update the state and the vector dot(A, state)
 
-        if docoord == 1:
-            state[idx] = tval
-            tval = tval - V
-            for irow in range(nconstraint):
-                Astate[irow] = Astate[irow] + tval * A[irow, idx]
-        else:
-            tval = tval - V
-            for ivar in range(nvar):
-                state[ivar] = state[ivar] + tval * directions[idx,ivar]
+            if docoord == 1:
+                state[idx] = tval
+                tval = tval - V
                 for irow in range(nconstraint):
-                    Astate[irow] = (Astate[irow] + A[irow, ivar] * 
-                                    tval * directions[idx,ivar])
+                    Astate[irow] = Astate[irow] + tval * A[irow, idx]
+            else:
+                tval = tval - V
+                for ivar in range(nvar):
+                    state[ivar] = state[ivar] + tval * directions[idx,ivar]
+                    for irow in range(nconstraint):
+                        Astate[irow] = (Astate[irow] + A[irow, ivar] * 
+                                        tval * directions[idx,ivar])
 
-        # store the sample
+            # store the sample
 
-        if sample_count >= burnin:
-            for ivar in range(nvar):
-                trunc_sample[sample_count-burnin, ivar] = state[ivar] 
+            if sample_count >= burnin:
+                for ivar in range(nvar):
+                    trunc_sample[sample_count-burnin, ivar] = state[ivar] 
 
-        sample_count = sample_count + 1
+            sample_count = sample_count + 1
 
-        iter_count = iter_count + 1
+            iter_count = iter_count + 1
 
-        if sample_count >= ndraw + burnin:
-            break
+            if sample_count >= ndraw + burnin:
+                break
 
     return trunc_sample
@@ -244,20 +244,23 @@ void HmcSampler::_getNextQuadraticHitTime(const VectorXd & a, const VectorXd & b
 
 double HmcSampler::_verifyConstraints(const VectorXd & b){
     double r =0;
+    bool first = true;
     
     for (int i=0; i != quadraticConstraints.size(); i++ ){       
         QuadraticConstraint qc = quadraticConstraints[i];
         double check = ((b.transpose())*(qc.A))*b + (qc.B).dot(b) + qc.C;
-        if (i==0 || check < r) {
+        if (first || check < r) {
             r = check;
+            first = false;
         }
     }
 
     for (int i=0; i != linearConstraints.size(); i++ ){       
     LinearConstraint lc = linearConstraints[i];
     double check = (lc.f).dot(b) + lc.g;
-    if (i==0 || check < r) {
+    if (first || check < r) {
         r = check;
+        first = false;
     }
     }
     
@@ -72,6 +72,25 @@ EXTS.append(Extension('selectinf.randomized.selective_MLE_utils',
                       libraries=[],
                       include_dirs=['C-software/src']))
 
+# Exact HMC sampler in selectinf/src_C, built only when the Eigen and
+# magnet (quartic solver from DynamO) headers can be found. Extra
+# include directories can be given in HMC_INCLUDE_DIRS.
+HMC_INCLUDE_DIRS = [d for d in os.environ.get('HMC_INCLUDE_DIRS', '').split(os.pathsep) if d]
+HMC_INCLUDE_DIRS += ['/usr/include/eigen3', '/usr/local/include/eigen3',
+                     '/usr/include', '/usr/local/include']
+
+def _have_header(header):
+    return any(exists(pjoin(d, header)) for d in HMC_INCLUDE_DIRS)
+
+if _have_header(pjoin('Eigen', 'Dense')) and _have_header(pjoin('magnet', 'math', 'quartic.hpp')):
+    EXTS.append(Extension('selectinf.sampling.hmc',
+                          ['selectinf/sampling/hmc.pyx',
+                           'selectinf/src_C/preparation_Eig_Vect.cpp',
+                           'selectinf/src_C/HmcSampler.cpp'],
+                          language='c++',
+                          libraries=[],
+                          include_dirs=['selectinf/src_C'] + HMC_INCLUDE_DIRS))
+
 # Cython is a dependency for building extensions, iff we don't have stamped
 # up pyx and c files.
 build_ext, need_cython = cyproc_exts(EXTS,